@@ -1,16 +1,20 @@
 import os
 import sqlite3
+from pathlib import Path
 
+import click
 import flask
 from flask_cors import CORS
 from flask_login import LoginManager
 from flask_openapi3 import Info, OpenAPI
 
+from .database import stocks_repository
 from .database.auth_repository import AuthRepository
 from .endpoints.auth import auth_bp
 from .endpoints.compare import compare_bp
 from .endpoints.stocks import cache, stocks_bp
 from .models import User
+from .services import stocks_service
 from .services.auth_service import UPLOAD_FOLDER
 
 info = Info(title="stocks API", version="1.0.0")
@@ -56,6 +60,12 @@ with sqlite3.connect("/database/database.db") as conn:
 UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 
 
+@app.before_request
+def start_search_warmer() -> None:
+    # Started by the first request served rather than at import, so CLI commands and tests don't run it
+    stocks_service.start_search_warmer()
+
+
 @login_manager.user_loader
 def load_user(user_id: str) -> User | None:
     user = auth_repository.get_user_by_id(int(user_id))
@@ -64,5 +74,13 @@ def load_user(user_id: str) -> User | None:
     return None
 
 
+@app.cli.command("import-symbols")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def import_symbols(file: Path) -> None:
+    """Import a CSV of symbols (Ticker, Name, and optional Type, Exchange, Currency) in the search directory."""
+    count = stocks_repository.import_symbols(file)
+    print(f"Imported {count} symbols")
+
+
 def create_app() -> flask.Flask:
     return app
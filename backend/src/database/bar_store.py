@@ -0,0 +1,151 @@
+"""Local on-disk OHLCV bar store.
+
+Bars are kept as one partitioned parquet file set per symbol and interval:
+
+    <root>/<SYMBOL>/<interval>/<year>.parquet
+    <root>/<SYMBOL>/<interval>/_meta.json
+
+Every partition holds an int64 ``timestamp`` column (nanoseconds, UTC) and float64
+``Open``/``High``/``Low``/``Close``/``Volume`` columns. ``_meta.json`` records which
+range has been fetched from upstream so callers only need to fetch the missing tail.
+Other files starting with an underscore hold data derived from the bars.
+"""
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MARKET_DATA_FOLDER = Path("/database/market_data")
+
+TIMESTAMP_COLUMN = "timestamp"
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+@dataclass
+class Coverage:
+    """Range of bars already fetched from upstream for one symbol and interval."""
+
+    # First instant requested from upstream (ns, UTC), None when the full history was fetched
+    start: int | None
+    # Timestamp of the last stored bar (ns, UTC)
+    last_bar: int
+    # Unix time of the last upstream fetch
+    fetched_at: float
+    # Exchange timezone of the bars
+    timezone: str = "UTC"
+
+    def covers(self, start: int | None) -> bool:
+        if self.start is None:
+            return True
+        return start is not None and start >= self.start
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+def empty_bars() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            TIMESTAMP_COLUMN: np.array([], dtype=np.int64),
+            **{column: np.array([], dtype=np.float64) for column in BAR_COLUMNS},
+        }
+    )
+
+
+class BarStore:
+    def __init__(self, root: Path = MARKET_DATA_FOLDER) -> None:
+        self.root = root
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def lock(self, symbol: str, interval: str) -> threading.Lock:
+        """Return the lock serializing writes for one symbol and interval."""
+        key = (symbol.upper(), interval)
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def folder(self, symbol: str, interval: str) -> Path:
+        return self.root / symbol.upper().replace("/", "_") / interval
+
+    def coverage(self, symbol: str, interval: str) -> Coverage | None:
+        meta_file = self.folder(symbol, interval) / "_meta.json"
+        try:
+            return Coverage(**json.loads(meta_file.read_text()))
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            return None
+
+    def read(self, symbol: str, interval: str, start: int | None = None, end: int | None = None) -> pd.DataFrame:
+        """Read the stored bars in [start, end], sorted by timestamp."""
+        folder = self.folder(symbol, interval)
+        if not folder.is_dir():
+            return empty_bars()
+        first_year = None if start is None else pd.Timestamp(start, unit="ns").year
+        last_year = None if end is None else pd.Timestamp(end, unit="ns").year
+        partitions = [
+            partition
+            for partition in sorted(folder.glob("[0-9]*.parquet"))
+            if (first_year is None or int(partition.stem) >= first_year)
+            and (last_year is None or int(partition.stem) <= last_year)
+        ]
+        if not partitions:
+            return empty_bars()
+        bars = pd.concat([pd.read_parquet(partition) for partition in partitions], ignore_index=True)
+        timestamps = bars[TIMESTAMP_COLUMN].to_numpy()
+        mask = np.ones(len(bars), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        return bars[mask].reset_index(drop=True)
+
+    def clear(self, symbol: str, interval: str) -> None:
+        """Drop the stored bars, keeping the coverage, before writing bars that replace them all."""
+        for partition in self.folder(symbol, interval).glob("[0-9]*.parquet"):
+            partition.unlink()
+
+    def write(
+        self,
+        symbol: str,
+        interval: str,
+        bars: pd.DataFrame,
+        start: int | None,
+        timezone: str = "UTC",
+    ) -> Coverage:
+        """Merge ``bars`` into the store and extend the recorded coverage.
+
+        ``start`` is the first instant that was requested from upstream (None for the full history).
+        Bars sharing a timestamp with stored ones replace them, so re-fetching a partial last bar is safe.
+        """
+        folder = self.folder(symbol, interval)
+        folder.mkdir(parents=True, exist_ok=True)
+        bars = bars[[TIMESTAMP_COLUMN, *BAR_COLUMNS]].astype(
+            {TIMESTAMP_COLUMN: np.int64, **dict.fromkeys(BAR_COLUMNS, np.float64)}
+        )
+
+        years = pd.to_datetime(bars[TIMESTAMP_COLUMN], unit="ns").dt.year
+        for year, new_bars in bars.groupby(years.to_numpy()):
+            partition = folder / f"{year}.parquet"
+            if partition.exists():
+                new_bars = pd.concat([pd.read_parquet(partition), new_bars], ignore_index=True)
+            new_bars = new_bars.drop_duplicates(TIMESTAMP_COLUMN, keep="last").sort_values(TIMESTAMP_COLUMN)
+            tmp = partition.with_suffix(".tmp")
+            new_bars.to_parquet(tmp, index=False)
+            tmp.replace(partition)
+
+        previous = self.coverage(symbol, interval)
+        last_bar = int(bars[TIMESTAMP_COLUMN].max()) if not bars.empty else -1
+        if previous is not None:
+            last_bar = max(last_bar, previous.last_bar)
+            if previous.start is None or (start is not None and previous.start < start):
+                start = previous.start
+        coverage = Coverage(start=start, last_bar=last_bar, fetched_at=time.time(), timezone=timezone)
+        meta_file = folder / "_meta.json"
+        tmp = meta_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(coverage)))
+        tmp.replace(meta_file)
+        return coverage
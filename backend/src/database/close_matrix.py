@@ -0,0 +1,151 @@
+"""Aligned daily close-price matrices of symbol sets.
+
+A matrix holds the daily closes of a set of symbols over their full stored history, one row per
+date (union of the symbols' dates, NaN where a symbol did not trade) and one column per symbol.
+Matrices are kept in memory and on disk next to the bar store:
+
+    <root>/_matrices/<key>.parquet
+    <root>/_matrices/<key>.json
+
+and are extended with the new trading days only, instead of being rebuilt, unless the closes of
+their last complete day changed upstream.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.database.bar_store import TIMESTAMP_COLUMN
+
+MAX_MATRICES_IN_MEMORY = 32
+
+
+@dataclass
+class CloseMatrix:
+    # Row dates (ns, local date at midnight like daily bar store keys)
+    dates: np.ndarray
+    # Column symbols, sorted
+    tickers: list[str]
+    # Closes, one row per date and one column per ticker
+    closes: np.ndarray
+    # Unix time of the last refresh
+    refreshed_at: float
+
+    def age(self) -> float:
+        return time.time() - self.refreshed_at
+
+
+def matrix_key(ticker_names: list[str]) -> str:
+    symbols = ",".join(sorted({ticker_name.upper() for ticker_name in ticker_names}))
+    return hashlib.sha256(symbols.encode()).hexdigest()[:32]
+
+
+def build(columns: dict[str, pd.DataFrame], previous: CloseMatrix | None = None) -> CloseMatrix:
+    """Build a matrix from the bars of every symbol, keeping the rows of ``previous`` older than the new bars.
+
+    The bars of each symbol start at the last date of ``previous`` when it is given.
+    """
+    if columns:
+        closes = pd.concat(
+            {ticker: bars.set_index(TIMESTAMP_COLUMN)["Close"] for ticker, bars in columns.items()}, axis=1
+        ).sort_index()
+        dates = closes.index.to_numpy(dtype=np.int64)
+        values = closes.to_numpy(dtype=np.float64)
+    else:
+        dates = np.array([], dtype=np.int64)
+        values = np.empty((0, 0))
+    if previous is not None and len(previous.dates):
+        kept = previous.dates < (dates[0] if len(dates) else np.iinfo(np.int64).max)
+        dates = np.r_[previous.dates[kept], dates]
+        values = np.vstack([previous.closes[kept], values])
+    return CloseMatrix(dates=dates, tickers=list(columns), closes=values, refreshed_at=time.time())
+
+
+def matches(matrix: CloseMatrix, columns: dict[str, pd.DataFrame], date: int) -> bool:
+    """Tell whether the bars of every symbol still hold the matrix closes of ``date``.
+
+    Upstream closes are adjusted for splits and dividends: a new adjustment rescales the past closes,
+    and the matrix then needs rebuilding.
+    """
+    row = np.flatnonzero(matrix.dates == date)
+    if not len(row):
+        return False
+    for column, ticker in enumerate(matrix.tickers):
+        bars = columns[ticker]
+        closes = bars.loc[bars[TIMESTAMP_COLUMN] == date, "Close"].to_numpy()
+        close = closes[0] if len(closes) else np.nan
+        if not np.isclose(close, matrix.closes[row[0], column], rtol=1e-9, atol=0, equal_nan=True):
+            return False
+    return True
+
+
+class CloseMatrixCache:
+    """In-memory LRU of close matrices, backed by their on-disk copies."""
+
+    def __init__(self, max_entries: int = MAX_MATRICES_IN_MEMORY) -> None:
+        self.max_entries = max_entries
+        self._matrices: OrderedDict[tuple[Path, str], CloseMatrix] = OrderedDict()
+        self._locks: dict[tuple[Path, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def lock(self, root: Path, key: str) -> threading.Lock:
+        """Return the lock serializing the refreshes of one matrix."""
+        with self._lock:
+            return self._locks.setdefault((root, key), threading.Lock())
+
+    def get(self, root: Path, key: str) -> CloseMatrix | None:
+        with self._lock:
+            matrix = self._matrices.get((root, key))
+            if matrix is not None:
+                self._matrices.move_to_end((root, key))
+                return matrix
+        matrix = _read(root, key)
+        if matrix is not None:
+            self._remember(root, key, matrix)
+        return matrix
+
+    def put(self, root: Path, key: str, matrix: CloseMatrix) -> None:
+        _write(root, key, matrix)
+        self._remember(root, key, matrix)
+
+    def _remember(self, root: Path, key: str, matrix: CloseMatrix) -> None:
+        with self._lock:
+            self._matrices[(root, key)] = matrix
+            self._matrices.move_to_end((root, key))
+            while len(self._matrices) > self.max_entries:
+                self._matrices.popitem(last=False)
+
+
+def _read(root: Path, key: str) -> CloseMatrix | None:
+    folder = root / "_matrices"
+    try:
+        meta = json.loads((folder / f"{key}.json").read_text())
+        frame = pd.read_parquet(folder / f"{key}.parquet")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return CloseMatrix(
+        dates=frame[TIMESTAMP_COLUMN].to_numpy(dtype=np.int64),
+        tickers=meta["tickers"],
+        closes=frame[meta["tickers"]].to_numpy(dtype=np.float64),
+        refreshed_at=meta["refreshed_at"],
+    )
+
+
+def _write(root: Path, key: str, matrix: CloseMatrix) -> None:
+    folder = root / "_matrices"
+    folder.mkdir(parents=True, exist_ok=True)
+    frame = pd.DataFrame(matrix.closes, columns=matrix.tickers)
+    frame.insert(0, TIMESTAMP_COLUMN, matrix.dates)
+    tmp = folder / f"{key}.parquet.tmp"
+    frame.to_parquet(tmp, index=False)
+    tmp.replace(folder / f"{key}.parquet")
+    tmp = folder / f"{key}.json.tmp"
+    tmp.write_text(json.dumps({"tickers": matrix.tickers, "refreshed_at": matrix.refreshed_at}))
+    tmp.replace(folder / f"{key}.json")
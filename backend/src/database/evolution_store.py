@@ -0,0 +1,122 @@
+"""Last computed portfolio evolution of every eToro account.
+
+A newer statement of an account repeats the activity of the previous one and adds the latest
+rows, so its evolution only needs recomputing from the first day that differs. The store keeps
+the daily evolution values of the last statement analyzed for each account, with a hash of every
+account activity row to find that day. Accounts are keyed by the caller, e.g. by upload folder and
+username so that the users of the app never share checkpoints:
+
+    <root>/<sha256 of the account key>/evolution.parquet
+    <root>/<sha256 of the account key>/activity.parquet
+    <root>/<sha256 of the account key>/meta.json
+
+It also keeps the evolution result of every statement, with the symbols it was valued with and
+the date of their last bar, so a repeat request is answered without recomputing until new bars
+arrive:
+
+    <root>/results/<sha256 of the workbook>.json
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+EVOLUTIONS_FOLDER = Path("/database/evolutions")
+
+
+@dataclass
+class EvolutionCheckpoint:
+    # Evolution values, one row per day (DatetimeIndex) and one column per part
+    frame: pd.DataFrame
+    # Hash and date of every account activity row, in statement order
+    activity_hashes: np.ndarray
+    activity_dates: np.ndarray
+    # Version of the evolution computation the values were computed with
+    version: int
+
+
+@dataclass
+class EvolutionResult:
+    # Evolution response, as dumped by the model
+    evolution: dict
+    # Symbols the evolution was valued with, and the date of their last bar then
+    symbols: list[str]
+    market_date: str | None
+    # Version of the evolution computation the result was computed with
+    version: int
+
+
+def activity_hashes(activity: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(activity, index=False).to_numpy()
+
+
+class EvolutionStore:
+    def __init__(self, root: Path = EVOLUTIONS_FOLDER) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _folder(self, account: str) -> Path:
+        return self.root / hashlib.sha256(account.encode()).hexdigest()
+
+    def load(self, account: str) -> EvolutionCheckpoint | None:
+        folder = self._folder(account)
+        with self._lock:
+            if not (folder / "meta.json").is_file():
+                return None
+            try:
+                meta = json.loads((folder / "meta.json").read_text())
+                frame = pd.read_parquet(folder / "evolution.parquet")
+                activity = pd.read_parquet(folder / "activity.parquet")
+            except (OSError, ValueError) as e:
+                print(f"Reading the evolution of {account} failed: {e}")
+                return None
+        return EvolutionCheckpoint(
+            frame=frame,
+            activity_hashes=activity["hash"].to_numpy(),
+            activity_dates=activity["Date"].to_numpy(),
+            version=meta["version"],
+        )
+
+    def save(self, account: str, checkpoint: EvolutionCheckpoint) -> None:
+        folder = self._folder(account)
+        activity = pd.DataFrame({"hash": checkpoint.activity_hashes, "Date": checkpoint.activity_dates})
+        try:
+            with self._lock:
+                folder.mkdir(parents=True, exist_ok=True)
+                # meta.json is written last: a checkpoint without it is ignored
+                (folder / "meta.json").unlink(missing_ok=True)
+                checkpoint.frame.to_parquet(folder / "evolution.parquet")
+                activity.to_parquet(folder / "activity.parquet", index=False)
+                (folder / "meta.json").write_text(json.dumps({"version": checkpoint.version}))
+        except OSError as e:
+            print(f"Saving the evolution of {account} failed: {e}")
+
+    def load_result(self, digest: str) -> EvolutionResult | None:
+        path = self.root / "results" / f"{digest}.json"
+        try:
+            stored = json.loads(path.read_text())
+            return EvolutionResult(**stored)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Reading the evolution result {digest} failed: {e}")
+            return None
+
+    def save_result(self, digest: str, result: EvolutionResult) -> None:
+        path = self.root / "results" / f"{digest}.json"
+        try:
+            with self._lock:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(asdict(result)))
+                tmp.replace(path)
+        except OSError as e:
+            print(f"Saving the evolution result {digest} failed: {e}")
+
+
+evolution_store = EvolutionStore()
@@ -0,0 +1,106 @@
+"""Running indicator state kept next to the stored bars.
+
+    <root>/<SYMBOL>/<interval>/_indicators.parquet
+    <root>/<SYMBOL>/<interval>/_indicators.json
+
+The parquet file holds, for every stored bar, its close, the running sum of the closes and the
+EMAs computed so far. The JSON file records the bar store fetch it was built from: while it is
+current the state is served as is, otherwise it is extended from the first bar that changed
+instead of being recomputed over the full history. The running sum and the EMAs are continued
+from their values on the last unchanged bar.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.database.bar_store import TIMESTAMP_COLUMN, BarStore
+
+SUM_COLUMN = "sum"
+
+
+def running_sum(values: np.ndarray, initial: float = 0.0) -> np.ndarray:
+    return initial + np.cumsum(values, dtype=np.float64)
+
+
+def ema(values: np.ndarray, window: int, previous: float | None = None) -> np.ndarray:
+    """Exponential moving average with smoothing ``2 / (window + 1)``, continued from ``previous`` when given."""
+    alpha = 2 / (window + 1)
+    if previous is None:
+        return pd.Series(values, dtype=np.float64).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    continued = pd.Series(np.r_[previous, values], dtype=np.float64).ewm(alpha=alpha, adjust=False).mean()
+    return continued.to_numpy()[1:]
+
+
+def ema_column(window: int) -> str:
+    return f"ema_{window}"
+
+
+def _extend(previous: pd.DataFrame | None, bars: pd.DataFrame, ema_windows: set[int]) -> pd.DataFrame:
+    timestamps = bars[TIMESTAMP_COLUMN].to_numpy()
+    closes = bars["Close"].to_numpy(dtype=np.float64)
+
+    # Number of leading bars unchanged since the previous state
+    kept = 0
+    if previous is not None:
+        n = min(len(previous), len(bars))
+        same = (previous[TIMESTAMP_COLUMN].to_numpy()[:n] == timestamps[:n]) & (
+            previous["Close"].to_numpy()[:n] == closes[:n]
+        )
+        kept = n if same.all() else int(np.argmin(same))
+        ema_windows |= {int(column[4:]) for column in previous.columns if column.startswith("ema_")}
+    head = previous.iloc[:kept] if previous is not None and kept else None
+
+    state = pd.DataFrame({TIMESTAMP_COLUMN: timestamps, "Close": closes})
+    if head is None:
+        state[SUM_COLUMN] = running_sum(closes)
+    else:
+        tail = running_sum(closes[kept:], head[SUM_COLUMN].iloc[-1])
+        state[SUM_COLUMN] = np.r_[head[SUM_COLUMN].to_numpy(), tail]
+    for window in sorted(ema_windows):
+        column = ema_column(window)
+        if head is None or column not in head:
+            state[column] = ema(closes, window)
+        else:
+            tail = ema(closes[kept:], window, head[column].iloc[-1])
+            state[column] = np.r_[head[column].to_numpy(), tail]
+    return state
+
+
+def load_state(store: BarStore, symbol: str, interval: str, ema_windows: list[int]) -> pd.DataFrame:
+    """Return the indicator state over every stored bar, with at least the requested EMA windows."""
+    coverage = store.coverage(symbol, interval)
+    if coverage is None:
+        return pd.DataFrame()
+    folder = store.folder(symbol, interval)
+    state_file = folder / "_indicators.parquet"
+    meta_file = folder / "_indicators.json"
+
+    def read_state() -> tuple[pd.DataFrame | None, float | None]:
+        try:
+            fetched_at = json.loads(meta_file.read_text())["fetched_at"]
+            return pd.read_parquet(state_file), fetched_at
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None, None
+
+    state, fetched_at = read_state()
+    if (
+        state is not None
+        and fetched_at == coverage.fetched_at
+        and all(ema_column(window) in state for window in ema_windows)
+    ):
+        return state
+
+    with store.lock(symbol, interval):
+        coverage = store.coverage(symbol, interval)
+        assert coverage is not None
+        state, _ = read_state()
+        state = _extend(state, store.read(symbol, interval), set(ema_windows))
+        tmp = state_file.with_suffix(".tmp")
+        state.to_parquet(tmp, index=False)
+        tmp.replace(state_file)
+        tmp = meta_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fetched_at": coverage.fetched_at}))
+        tmp.replace(meta_file)
+    return state
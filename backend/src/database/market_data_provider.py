@@ -0,0 +1,106 @@
+"""Market data providers.
+
+Every upstream market-data call of the backend goes through a ``MarketDataProvider`` so the
+source can be swapped without touching the services (see ``stocks_repository.create_provider``).
+"""
+
+import threading
+from typing import Protocol
+
+import pandas as pd
+import yfinance as yf
+import yfinance_cache as yfc
+
+
+class MarketDataProvider(Protocol):
+    def history(
+        self, ticker_name: str, interval: str, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None
+    ) -> pd.DataFrame:
+        """Return OHLCV bars indexed by date, like ``yf.Ticker.history``. ``start=None`` means the full history."""
+        ...
+
+    def bulk_history(
+        self,
+        ticker_names: list[str],
+        interval: str,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        """Return the bars of several tickers at once, omitting tickers without data."""
+        ...
+
+    def info(self, ticker_name: str) -> dict:
+        """Return the quote summary of a ticker (empty when unknown)."""
+        ...
+
+    def analyst_price_targets(self, ticker_name: str) -> dict:
+        """Return current/high/low/mean/median analyst price targets (empty when unknown)."""
+        ...
+
+    def search(self, query: str) -> list[dict]:
+        """Return raw search quotes, like ``yf.Search(query).quotes``."""
+        ...
+
+    def fx_rate(self, currency: str, to_currency: str = "USD") -> float:
+        """Return the latest exchange rate from ``currency`` to ``to_currency``."""
+        ...
+
+
+def _history_kwargs(interval: str, start: pd.Timestamp | None, end: pd.Timestamp | None) -> dict:
+    kwargs: dict = {"interval": interval}
+    if start is None:
+        kwargs["period"] = "max"
+    else:
+        kwargs["start"] = start.strftime("%Y-%m-%d")
+    if end is not None:
+        kwargs["end"] = end.strftime("%Y-%m-%d")
+    return kwargs
+
+
+# yf.Tickers(...).history downloads through yfinance's module-wide result globals
+# (shared._DFS, shared._ERRORS): concurrent bulk downloads mix or lose each other's results
+bulk_download_lock = threading.Lock()
+
+
+class YahooProvider:
+    def history(
+        self, ticker_name: str, interval: str, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None
+    ) -> pd.DataFrame:
+        return yf.Ticker(ticker_name).history(**_history_kwargs(interval, start, end))
+
+    def bulk_history(
+        self,
+        ticker_names: list[str],
+        interval: str,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        if len(ticker_names) == 1:
+            history = self.history(ticker_names[0], interval, start, end)
+            return {} if history.empty else {ticker_names[0]: history}
+        with bulk_download_lock:
+            bulk = yf.Tickers(ticker_names).history(**_history_kwargs(interval, start, end))
+        histories = {}
+        for ticker_name in ticker_names:
+            try:
+                history = bulk.xs(ticker_name.upper(), level=1, axis=1)
+            except KeyError:
+                continue
+            history = history.dropna(subset=["Close"])
+            if not history.empty:
+                histories[ticker_name] = history
+        return histories
+
+    def info(self, ticker_name: str) -> dict:
+        return yfc.Ticker(ticker_name).info
+
+    def analyst_price_targets(self, ticker_name: str) -> dict:
+        return yf.Ticker(ticker_name).analyst_price_targets
+
+    def search(self, query: str) -> list[dict]:
+        return yf.Search(query).quotes
+
+    def fx_rate(self, currency: str, to_currency: str = "USD") -> float:
+        if currency == to_currency:
+            return 1.0
+        return yfc.Ticker(f"{currency}{to_currency}=X").fast_info["lastPrice"]
@@ -0,0 +1,351 @@
+"""Offline market data provider serving recorded or synthetic data from disk.
+
+Layout of the offline folder (every file is optional):
+
+    symbols.csv                       Ticker,Name,Exchange,Type,Currency of the known universe
+    history/<SYMBOL>/<interval>.csv   recorded OHLCV bars (first column is the date)
+    info/<SYMBOL>.json                recorded ``info`` dicts
+    analyst/<SYMBOL>.json             recorded analyst price targets
+    search/<query>.json               recorded raw search quotes
+    fx.json                           recorded latest FX rates, e.g. {"EURUSD": 1.08}
+
+Anything not recorded is synthesized deterministically from the symbol and the bar timestamp, so
+the same request always returns the same data and different ranges or intervals agree with each
+other. When ``symbols.csv`` is missing every symbol is considered known. Ticker names outside
+``TICKER_PATTERN`` are never joined into a path: they have no data and are not recorded.
+"""
+
+import json
+import math
+import re
+import threading
+import zlib
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from src.database.market_data_provider import MarketDataProvider
+from src.services.intervals import interval_to_duration, is_intraday
+
+SYNTHETIC_START = pd.Timestamp("1990-01-02")
+# Yahoo only serves a limited intraday history
+INTRADAY_HISTORY = pd.Timedelta(days=60)
+MINUTE_HISTORY = pd.Timedelta(days=7)
+
+FX_BASES = {
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "CHF": 1.12,
+    "HKD": 0.128,
+    "SEK": 0.095,
+    "AUD": 0.66,
+    "NOK": 0.094,
+    "DKK": 0.145,
+    "JPY": 0.0067,
+    "SGD": 0.74,
+}
+
+COARSE_FREQUENCIES = {"1d": "B", "5d": "5B", "1wk": "W-MON", "1mo": "MS", "3mo": "QS"}
+
+# Yahoo symbols, e.g. "BRK-B", "^GSPC", "EURUSD=X" or "0700.HK"
+TICKER_PATTERN = re.compile(r"[A-Za-z0-9.^=-]+")
+
+
+def is_valid_ticker(ticker_name: str) -> bool:
+    # Dots alone would name the folder itself or its parent
+    return TICKER_PATTERN.fullmatch(ticker_name) is not None and ticker_name.strip(".") != ""
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode())
+
+
+def _noise(seconds: np.ndarray, seed: int) -> np.ndarray:
+    """Deterministic pseudo-random values in [-0.5, 0.5) for each timestamp."""
+    mixed = (seconds.astype(np.uint64) * np.uint64(2654435761) + np.uint64(seed)) % np.uint64(2**32)
+    mixed = (mixed ^ (mixed >> np.uint64(13))) * np.uint64(1274126177) % np.uint64(2**32)
+    return mixed.astype(np.float64) / 2**32 - 0.5
+
+
+def _synthetic_dates(symbol: str, interval: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+    is_crypto = symbol.upper().endswith("-USD")
+    if not is_intraday(interval):
+        frequency = COARSE_FREQUENCIES.get(interval, "B")
+        if is_crypto and frequency == "B":
+            frequency = "D"
+        dates = pd.date_range(start.normalize(), end.normalize(), freq=frequency)
+        return dates.tz_localize("UTC" if is_crypto else "America/New_York")
+
+    step = pd.Timedelta(interval_to_duration(interval))
+    dates = pd.date_range(start.floor(f"{int(step.total_seconds())}s"), end, freq=step, tz="UTC")
+    if is_crypto:
+        return dates
+    local = dates.tz_convert("America/New_York")
+    minutes = local.hour * 60 + local.minute
+    session = (local.dayofweek < 5) & (minutes >= 9 * 60 + 30) & (minutes < 16 * 60)  # noqa: PLR2004
+    return local[session]
+
+
+def synthetic_history(
+    symbol: str, interval: str, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None
+) -> pd.DataFrame:
+    """Build deterministic OHLCV bars for any symbol, interval and range."""
+    seed = _seed(symbol)
+    now = pd.Timestamp.now()
+    end = now if end is None else min(end, now)
+    listing = SYNTHETIC_START + pd.Timedelta(days=seed % 7000)
+    first_trade = listing
+    if is_intraday(interval):
+        first_trade = max(first_trade, now - (MINUTE_HISTORY if interval == "1m" else INTRADAY_HISTORY))
+    start = first_trade if start is None else max(start.tz_localize(None) if start.tzinfo else start, first_trade)
+
+    dates = _synthetic_dates(symbol, interval, start, end)
+    utc_dates = dates if dates.tz is None else dates.tz_convert("UTC").tz_localize(None)
+    seconds = utc_dates.as_unit("s").to_numpy().view(np.int64)
+    years = (seconds - listing.value // 10**9) / (365.25 * 86400)
+
+    if symbol.upper().endswith("=X"):
+        base = FX_BASES.get(symbol.upper()[:3], 1.0)
+        trend = np.ones_like(years)
+        volatility = 0.004
+    else:
+        base = 10 + seed % 190
+        trend = np.exp((0.02 + (seed % 9) / 100) * years)
+        volatility = 0.015
+    cycle = 1 + 0.2 * np.sin(2 * math.pi * years / (1.5 + seed % 4) + seed % 7)
+    close = base * trend * cycle * (1 + volatility * _noise(seconds, seed))
+    open_ = close * (1 + volatility * _noise(seconds + 1, seed))
+    wick = volatility * np.abs(_noise(seconds + 2, seed))
+    history = pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick),
+            "Low": np.minimum(open_, close) * (1 - wick),
+            "Close": close,
+            "Volume": np.round(1e6 * (1.5 + _noise(seconds + 3, seed))),
+        },
+        index=dates,
+    )
+    history.index.name = "Datetime" if is_intraday(interval) else "Date"
+    return history
+
+
+class OfflineProvider:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        symbols_file = root / "symbols.csv"
+        self.symbols: pd.DataFrame | None = None
+        if symbols_file.is_file():
+            self.symbols = pd.read_csv(symbols_file, keep_default_na=False).set_index("Ticker", drop=False)
+
+    def _recorded_history(self, ticker_name: str, interval: str) -> pd.DataFrame | None:
+        if not is_valid_ticker(ticker_name):
+            return None
+        history_file = self.root / "history" / ticker_name.upper() / f"{interval}.csv"
+        if not history_file.is_file():
+            return None
+        history = pd.read_csv(history_file, index_col=0, float_precision="round_trip")
+        history.index = pd.to_datetime(history.index, utc=True)
+        return history
+
+    def _recorded_json(self, *parts: str) -> dict | list | None:
+        json_file = self.root.joinpath(*parts)
+        if not json_file.is_file():
+            return None
+        return json.loads(json_file.read_text())
+
+    def _symbol(self, ticker_name: str) -> dict | None:
+        if not is_valid_ticker(ticker_name):
+            return None
+        if self.symbols is None:
+            return {"Ticker": ticker_name.upper(), "Name": ticker_name.upper(), "Exchange": "NMS", "Type": "EQUITY"}
+        if ticker_name.upper() not in self.symbols.index:
+            return None
+        return self.symbols.loc[ticker_name.upper()].to_dict()
+
+    def history(
+        self, ticker_name: str, interval: str, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None
+    ) -> pd.DataFrame:
+        recorded = self._recorded_history(ticker_name, interval)
+        if recorded is not None:
+            mask = np.ones(len(recorded), dtype=bool)
+            if start is not None:
+                mask &= recorded.index >= (start.tz_localize("UTC") if start.tzinfo is None else start)
+            if end is not None:
+                mask &= recorded.index < (end.tz_localize("UTC") if end.tzinfo is None else end)
+            return recorded.loc[mask]
+        if self._symbol(ticker_name) is None:
+            return pd.DataFrame()
+        return synthetic_history(ticker_name, interval, start, end)
+
+    def bulk_history(
+        self,
+        ticker_names: list[str],
+        interval: str,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        histories = {ticker_name: self.history(ticker_name, interval, start, end) for ticker_name in ticker_names}
+        return {ticker_name: history for ticker_name, history in histories.items() if not history.empty}
+
+    def info(self, ticker_name: str) -> dict:
+        if not is_valid_ticker(ticker_name):
+            return {}
+        recorded = self._recorded_json("info", f"{ticker_name.upper()}.json")
+        if isinstance(recorded, dict):
+            return recorded
+        symbol = self._symbol(ticker_name)
+        if symbol is None:
+            return {}
+        daily = synthetic_history(ticker_name, "1d", pd.Timestamp.now() - pd.Timedelta(days=10))
+        last = daily.iloc[-1]
+        info = {
+            "symbol": symbol["Ticker"],
+            "shortName": symbol["Name"],
+            "longName": symbol["Name"],
+            "exchange": symbol["Exchange"],
+            "quoteType": symbol["Type"],
+            "currency": symbol.get("Currency") or "USD",
+            "currentPrice": float(last["Close"]),
+            "regularMarketPrice": float(last["Close"]),
+            "open": float(last["Open"]),
+            "dayHigh": float(last["High"]),
+            "dayLow": float(last["Low"]),
+            "previousClose": float(daily.iloc[-2]["Close"]),
+            "volume": int(last["Volume"]),
+        }
+        if symbol["Type"] in ("EQUITY", "ETF"):
+            info["marketCap"] = float(last["Close"]) * 1e9
+            info["freeCashflow"] = float(last["Close"]) * 4e7
+            info["website"] = f"https://www.{symbol['Ticker'].split('.')[0].lower()}.example"
+        return info
+
+    def analyst_price_targets(self, ticker_name: str) -> dict:
+        if not is_valid_ticker(ticker_name):
+            return {}
+        recorded = self._recorded_json("analyst", f"{ticker_name.upper()}.json")
+        if isinstance(recorded, dict):
+            return recorded
+        info = self.info(ticker_name)
+        current = info.get("currentPrice")
+        if current is None:
+            return {}
+        return {
+            "current": current,
+            "high": current * 1.3,
+            "low": current * 0.8,
+            "mean": current * 1.1,
+            "median": current * 1.08,
+        }
+
+    def search(self, query: str) -> list[dict]:
+        recorded = self._recorded_json("search", f"{quote(query.lower(), safe='')}.json")
+        if isinstance(recorded, list):
+            return recorded
+        if self.symbols is None:
+            return []
+        needle = query.lower()
+        matches = self.symbols[
+            self.symbols["Ticker"].str.lower().str.contains(needle, regex=False)
+            | self.symbols["Name"].str.lower().str.contains(needle, regex=False)
+        ]
+        return [
+            {
+                "exchange": row["Exchange"],
+                "exchDisp": row["Exchange"],
+                "index": "quotes",
+                "isYahooFinance": True,
+                "longname": row["Name"],
+                "shortname": row["Name"],
+                "quoteType": row["Type"],
+                "typeDisp": row["Type"].title(),
+                "score": 100000 - rank,
+                "symbol": row["Ticker"],
+            }
+            for rank, row in enumerate(matches.head(8).to_dict("records"))
+        ]
+
+    def fx_rate(self, currency: str, to_currency: str = "USD") -> float:
+        if currency == to_currency:
+            return 1.0
+        recorded = self._recorded_json("fx.json")
+        if isinstance(recorded, dict) and f"{currency}{to_currency}" in recorded:
+            return float(recorded[f"{currency}{to_currency}"])
+        history = self.history(f"{currency}{to_currency}=X", "1d", pd.Timestamp.now() - pd.Timedelta(days=10))
+        return float(history["Close"].iloc[-1])
+
+
+class RecordingProvider:
+    """Forward every call to another provider and record its answers in the offline folder layout."""
+
+    def __init__(self, inner: MarketDataProvider, root: Path) -> None:
+        self.inner = inner
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _write_json(self, data: dict | list, *parts: str) -> None:
+        json_file = self.root.joinpath(*parts)
+        json_file.parent.mkdir(parents=True, exist_ok=True)
+        json_file.write_text(json.dumps(data, default=str, indent=1))
+
+    def _record_history(self, ticker_name: str, interval: str, history: pd.DataFrame) -> None:
+        if history.empty or not is_valid_ticker(ticker_name):
+            return
+        history_file = self.root / "history" / ticker_name.upper() / f"{interval}.csv"
+        history_file.parent.mkdir(parents=True, exist_ok=True)
+        history = history.copy()
+        history.index = pd.to_datetime(history.index, utc=True)
+        with self._lock:
+            if history_file.is_file():
+                recorded = pd.read_csv(history_file, index_col=0, float_precision="round_trip")
+                recorded.index = pd.to_datetime(recorded.index, utc=True)
+                history = pd.concat([recorded, history])
+                history = history[~history.index.duplicated(keep="last")].sort_index()
+            history.to_csv(history_file)
+
+    def history(
+        self, ticker_name: str, interval: str, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None
+    ) -> pd.DataFrame:
+        history = self.inner.history(ticker_name, interval, start, end)
+        self._record_history(ticker_name, interval, history)
+        return history
+
+    def bulk_history(
+        self,
+        ticker_names: list[str],
+        interval: str,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        histories = self.inner.bulk_history(ticker_names, interval, start, end)
+        for ticker_name, history in histories.items():
+            self._record_history(ticker_name, interval, history)
+        return histories
+
+    def info(self, ticker_name: str) -> dict:
+        info = self.inner.info(ticker_name)
+        if info and is_valid_ticker(ticker_name):
+            self._write_json(info, "info", f"{ticker_name.upper()}.json")
+        return info
+
+    def analyst_price_targets(self, ticker_name: str) -> dict:
+        targets = self.inner.analyst_price_targets(ticker_name)
+        if targets and is_valid_ticker(ticker_name):
+            self._write_json(targets, "analyst", f"{ticker_name.upper()}.json")
+        return targets
+
+    def search(self, query: str) -> list[dict]:
+        quotes = self.inner.search(query)
+        self._write_json(quotes, "search", f"{quote(query.lower(), safe='')}.json")
+        return quotes
+
+    def fx_rate(self, currency: str, to_currency: str = "USD") -> float:
+        rate = self.inner.fx_rate(currency, to_currency)
+        with self._lock:
+            fx_file = self.root / "fx.json"
+            rates = json.loads(fx_file.read_text()) if fx_file.is_file() else {}
+            rates[f"{currency}{to_currency}"] = rate
+            self._write_json(rates, "fx.json")
+        return rate
@@ -0,0 +1,47 @@
+"""Persisted hot set of the popular search queries.
+
+    /database/popular_searches.json
+
+The file holds the decayed count of every tracked query and the precomputed quotes of the hot
+queries (as dumped by the model), so that they are served right after a restart.
+"""
+
+import json
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+POPULAR_SEARCHES_FILE = Path("/database/popular_searches.json")
+
+
+@dataclass
+class PopularSearchSnapshot:
+    counts: dict[str, float]
+    # Quotes of the hot queries
+    responses: dict[str, list[dict]]
+
+
+class PopularSearchStore:
+    def __init__(self, path: Path = POPULAR_SEARCHES_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> PopularSearchSnapshot | None:
+        try:
+            saved = json.loads(self.path.read_text())
+            return PopularSearchSnapshot(**saved)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Reading the popular searches failed: {e}")
+            return None
+
+    def save(self, snapshot: PopularSearchSnapshot) -> None:
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(asdict(snapshot)))
+                tmp.replace(self.path)
+        except OSError as e:
+            print(f"Saving the popular searches failed: {e}")
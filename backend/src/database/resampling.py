@@ -0,0 +1,140 @@
+"""Resampling of stored bars into coarser intervals.
+
+Coarse intervals are derived locally from a finer stored interval instead of being fetched
+upstream on their own: weekly/monthly/quarterly bars from daily bars, ``4h`` bars from hourly
+bars, and any intraday interval from a finer intraday interval that divides it.
+
+Bars use the bar store layout (int64 ``timestamp`` column, OHLCV float columns, sorted).
+Intraday buckets are anchored on the first bar of each exchange-local session, like Yahoo's
+own intraday intervals, so a ``4h`` bar of a US equity covers 09:30-13:30 and 13:30-16:00.
+"""
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from src.database.bar_store import BAR_COLUMNS, TIMESTAMP_COLUMN
+from src.services.intervals import interval_to_duration, is_intraday
+
+DAY_NS = 86_400 * 10**9
+# 1970-01-01 was a Thursday, weeks start on Monday
+WEEK_OFFSET_DAYS = 3
+
+# Intervals always derived from a base interval, never requested upstream ("4h" is not even a Yahoo interval)
+BASE_INTERVALS = {
+    "4h": "1h",
+    "60m": "1h",
+    "5d": "1d",
+    "1wk": "1d",
+    "1mo": "1d",
+    "3mo": "1d",
+}
+
+# Intraday intervals a coarser intraday interval can be derived from, finest first
+INTRADAY_SOURCES = ["1m", "2m", "5m", "15m", "30m", "1h"]
+
+# How far back upstream serves each intraday interval
+UPSTREAM_HISTORY = {
+    "1m": dt.timedelta(days=7),
+    "2m": dt.timedelta(days=60),
+    "5m": dt.timedelta(days=60),
+    "15m": dt.timedelta(days=60),
+    "30m": dt.timedelta(days=60),
+    "90m": dt.timedelta(days=60),
+    "60m": dt.timedelta(days=730),
+    "1h": dt.timedelta(days=730),
+}
+
+
+def finer_intervals(interval: str, start: pd.Timestamp | None) -> list[str]:
+    """Return the intraday intervals ``interval`` can be derived from over ``[start, now]``, finest first."""
+    if not is_intraday(interval) or start is None:
+        return []
+    duration = interval_to_duration(interval)
+    oldest = pd.Timestamp.now() - (start.tz_localize(None) if start.tzinfo is not None else start)
+    return [
+        finer
+        for finer in INTRADAY_SOURCES
+        if interval_to_duration(finer) < duration
+        and duration % interval_to_duration(finer) == dt.timedelta(0)
+        and oldest <= UPSTREAM_HISTORY[finer]
+    ]
+
+
+def period_start(start: pd.Timestamp, interval: str) -> pd.Timestamp:
+    """Return the start of the ``interval`` bucket holding ``start``, so the first resampled bar is complete."""
+    start = start.tz_localize(None) if start.tzinfo is not None else start
+    if is_intraday(interval):
+        return start.normalize()
+    if interval in ("1wk", "5d"):
+        return start.normalize() - pd.Timedelta(days=start.dayofweek)
+    if interval == "1mo":
+        return pd.Timestamp(year=start.year, month=start.month, day=1)
+    if interval == "3mo":
+        return pd.Timestamp(year=start.year, month=start.month - (start.month - 1) % 3, day=1)
+    return start.normalize()
+
+
+def _local_ns(timestamps: np.ndarray, timezone: str) -> np.ndarray:
+    local = pd.DatetimeIndex(timestamps.astype("datetime64[ns]")).tz_localize("UTC").tz_convert(timezone)
+    return local.tz_localize(None).as_unit("ns").to_numpy().view(np.int64)
+
+
+def _session_buckets(timestamps: np.ndarray, interval: str, timezone: str) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket intraday bars by session, anchored on each session's first bar. Returns bucket keys and starts."""
+    bucket_ns = int(interval_to_duration(interval).total_seconds()) * 10**9
+    local = _local_ns(timestamps, timezone)
+    days = local // DAY_NS
+    _, first_bars, session = np.unique(days, return_index=True, return_inverse=True)
+    since_open = local - local[first_bars][session]
+    offsets = since_open // bucket_ns
+    # Bucket start in UTC: the bar instant minus its distance to the local bucket start
+    starts = timestamps - (since_open - offsets * bucket_ns)
+    return days * (DAY_NS // bucket_ns + 1) + offsets, starts
+
+
+def _calendar_buckets(timestamps: np.ndarray, interval: str) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket daily bars (keyed by local date) into weeks, months or quarters.
+
+    ``5d`` bars hold the five sessions of each week: like weeks, they are counted from the epoch
+    rather than from the first bar read, so a session falls in the same bar whatever range is read.
+    """
+    if interval in ("1wk", "5d"):
+        keys = (timestamps // DAY_NS + WEEK_OFFSET_DAYS) // 7
+        return keys, (keys * 7 - WEEK_OFFSET_DAYS) * DAY_NS
+    months = timestamps.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+    if interval == "3mo":
+        months -= months % 3
+    elif interval != "1mo":
+        msg = f"Cannot resample daily bars to {interval}"
+        raise ValueError(msg)
+    return months, months.astype("datetime64[M]").astype("datetime64[ns]").astype(np.int64)
+
+
+def resample(bars: pd.DataFrame, interval: str, timezone: str = "UTC") -> pd.DataFrame:
+    """Aggregate sorted bars into ``interval`` bars.
+
+    Each bar takes the first open, highest high, lowest low, last close and summed volume of its bucket.
+    """
+    if bars.empty:
+        return bars
+    timestamps = bars[TIMESTAMP_COLUMN].to_numpy(dtype=np.int64)
+    if is_intraday(interval):
+        keys, bucket_starts = _session_buckets(timestamps, interval, timezone)
+    else:
+        keys, bucket_starts = _calendar_buckets(timestamps, interval)
+
+    firsts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    lasts = np.r_[firsts[1:], len(keys)] - 1
+    values = {column: bars[column].to_numpy(dtype=np.float64) for column in BAR_COLUMNS}
+    return pd.DataFrame(
+        {
+            TIMESTAMP_COLUMN: bucket_starts[firsts],
+            "Open": values["Open"][firsts],
+            "High": np.fmax.reduceat(values["High"], firsts),
+            "Low": np.fmin.reduceat(values["Low"], firsts),
+            "Close": values["Close"][lasts],
+            "Volume": np.add.reduceat(np.nan_to_num(values["Volume"]), firsts),
+        }
+    )
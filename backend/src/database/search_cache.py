@@ -0,0 +1,76 @@
+"""Prefix-aware cache of upstream search results.
+
+While a query is typed, every keystroke is a new query extending the previous one. A match of
+the longer query also matches its prefix as a substring, so the cached quotes of the longest
+cached prefix are refined locally instead of asking upstream again. Upstream is only asked when
+the refined set is too small to be a useful answer, unless the prefix results were already
+complete (fewer quotes than an upstream page).
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+MAX_SEARCH_ENTRIES = 1024
+# Upstream returns at most this many quotes per query
+UPSTREAM_PAGE_SIZE = 8
+# Refined result sets smaller than this are completed by upstream
+MIN_REFINED_RESULTS = 3
+# Shorter prefixes match too broadly to be refined
+MIN_PREFIX = 2
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _matches(quote: dict, query: str) -> bool:
+    return any(query in normalize(str(quote.get(field) or "")) for field in ("symbol", "longname", "shortname"))
+
+
+class SearchCache:
+    def __init__(self, max_entries: int = MAX_SEARCH_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "prefix_hits": 0, "misses": 0}
+
+    def get(self, query: str, load: Callable[[str], list[dict]]) -> list[dict]:
+        """Return the quotes of ``query``, from the cache when possible, otherwise from ``load``."""
+        key = normalize(query)
+        with self._lock:
+            quotes = self._entries.get(key)
+            if quotes is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return quotes
+            refined = self._refine(key)
+            if refined is not None:
+                self._counters["prefix_hits"] += 1
+                return refined
+            self._counters["misses"] += 1
+
+        quotes = load(query)
+        with self._lock:
+            self._entries[key] = quotes
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return quotes
+
+    def _refine(self, key: str) -> list[dict] | None:
+        for length in range(len(key) - 1, MIN_PREFIX - 1, -1):
+            quotes = self._entries.get(key[:length])
+            if quotes is None:
+                continue
+            self._entries.move_to_end(key[:length])
+            refined = [quote for quote in quotes if _matches(quote, key)]
+            if len(refined) >= MIN_REFINED_RESULTS or len(quotes) < UPSTREAM_PAGE_SIZE:
+                return refined
+            # The longest cached prefix is the most selective one, shorter ones cannot do better
+            return None
+        return None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
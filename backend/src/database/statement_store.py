@@ -0,0 +1,175 @@
+"""Parsed eToro statements, cached by content.
+
+Parsing a statement workbook is by far the slowest step of its analyses, so each statement is
+parsed once into typed columns (dates parsed, amounts as floats) stored as parquet files:
+
+    <root>/<sha256 of the workbook>/closed_positions.parquet
+    <root>/<sha256 of the workbook>/account_activity.parquet
+    <root>/<sha256 of the workbook>/account.json
+
+Re-uploading the same statement under another name reuses the same parsed sheets.
+
+Workbooks are streamed with ``XlsxReader``: only the cells of the analyzed sheets and columns are
+decoded, and rows are converted to typed arrays by chunks, so memory stays bounded by the kept
+columns rather than by the whole workbook.
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.database.xlsx_reader import XlsxReader
+
+STATEMENTS_FOLDER = Path("/database/statements")
+CLOSED_POSITIONS = "Closed Positions"
+ACCOUNT_ACTIVITY = "Account Activity"
+ACCOUNT_SUMMARY = "Account Summary"
+DATE = "date"
+NUMBER = "number"
+TEXT = "text"
+# Parsed sheets: file name and the type of every analyzed column
+SHEETS = {
+    CLOSED_POSITIONS: ("closed_positions", {"Open Date": DATE, "Close Date": DATE, "Profit(USD)": NUMBER}),
+    ACCOUNT_ACTIVITY: (
+        "account_activity",
+        {
+            "Date": DATE,
+            "Type": TEXT,
+            "Details": TEXT,
+            "Amount": NUMBER,
+            "Units / Contracts": NUMBER,
+            "Position ID": TEXT,
+            "Asset type": TEXT,
+        },
+    ),
+}
+CHUNK_ROWS = 10_000
+
+
+def column_date_to_timestamp(column: pd.Series) -> pd.Series:
+    return pd.to_datetime(column, format="%d/%m/%Y %H:%M:%S")
+
+
+@dataclass
+class Statement:
+    # SHA-256 of the workbook
+    digest: str
+    closed_positions: pd.DataFrame
+    account_activity: pd.DataFrame
+    # Username of the account, None when the statement has no account summary
+    account: str | None = None
+
+
+def file_digest(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _typed(values: tuple, kind: str) -> pd.Series:
+    if kind == DATE:
+        series = pd.Series(values, dtype=object)
+        # Dates are written as text, or read as datetimes when typed as dates in Excel
+        texts = series.map(lambda value: isinstance(value, str)).astype(bool)
+        if texts.all():
+            return column_date_to_timestamp(series)
+        dates = column_date_to_timestamp(series.where(texts))
+        return dates.where(texts, pd.to_datetime(series.where(~texts)))
+    if kind == NUMBER:
+        # eToro writes "-" for missing values
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype(np.float64)
+    return pd.Series([None if value is None else str(value) for value in values], dtype=object)
+
+
+def _read_sheet(reader: XlsxReader, name: str, columns: dict[str, str]) -> pd.DataFrame:
+    header = {str(column): i for i, column in enumerate(reader.header(name)) if column is not None}
+    missing_columns = set(columns) - set(header)
+    if missing_columns:
+        msg = f"Not an eToro statement, missing {name} columns: {', '.join(sorted(missing_columns))}"
+        raise ValueError(msg)
+
+    chunks = []
+    chunk: list[tuple] = []
+
+    def flush() -> None:
+        picked = list(zip(*chunk, strict=True)) or [() for _ in columns]
+        typed = {column: _typed(values, kind) for (column, kind), values in zip(columns.items(), picked, strict=True)}
+        chunks.append(pd.DataFrame(typed))
+        chunk.clear()
+
+    for values in reader.rows(name, [header[column] for column in columns]):
+        if all(value is None for value in values):
+            continue
+        chunk.append(values)
+        if len(chunk) == CHUNK_ROWS:
+            flush()
+    if chunk or not chunks:
+        flush()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def read_statement(path: Path) -> dict[str, pd.DataFrame]:
+    """Parse the analyzed sheets and columns of a statement workbook into typed columns.
+
+    Raises ValueError when the workbook does not have the sheets and columns of an eToro statement.
+    """
+    with XlsxReader(path) as reader:
+        missing_sheets = set(SHEETS) - set(reader.sheet_names)
+        if missing_sheets:
+            msg = f"Not an eToro statement, missing sheets: {', '.join(sorted(missing_sheets))}"
+            raise ValueError(msg)
+        return {name: _read_sheet(reader, name, columns) for name, (_, columns) in SHEETS.items()}
+
+
+def read_account(path: Path) -> str | None:
+    """Return the username of the "Account Summary" sheet, whose rows are (name, value) pairs."""
+    with XlsxReader(path) as reader:
+        if ACCOUNT_SUMMARY not in reader.sheet_names:
+            return None
+        for name, value in reader.rows(ACCOUNT_SUMMARY, [0, 1]):
+            if name == "Username" and value is not None:
+                return str(value)
+    return None
+
+
+class StatementStore:
+    def __init__(self, root: Path = STATEMENTS_FOLDER) -> None:
+        self.root = root
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, digest: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(digest, threading.Lock())
+
+    def load(self, path: Path) -> Statement:
+        """Return the parsed sheets of the statement at ``path``, parsing it on its first load only."""
+        digest = file_digest(path)
+        folder = self.root / digest
+        files = {name: folder / f"{file}.parquet" for name, (file, _) in SHEETS.items()}
+        account_file = folder / "account.json"
+        with self._lock(digest):
+            if not all(file.is_file() for file in files.values()):
+                sheets = read_statement(path)
+                folder.mkdir(parents=True, exist_ok=True)
+                for name, file in files.items():
+                    tmp = file.with_suffix(".tmp")
+                    sheets[name].to_parquet(tmp, index=False)
+                    tmp.replace(file)
+            if not account_file.is_file():
+                tmp = account_file.with_suffix(".tmp")
+                tmp.write_text(json.dumps({"account": read_account(path)}))
+                tmp.replace(account_file)
+        return Statement(
+            digest=digest,
+            closed_positions=pd.read_parquet(files[CLOSED_POSITIONS], columns=list(SHEETS[CLOSED_POSITIONS][1])),
+            account_activity=pd.read_parquet(files[ACCOUNT_ACTIVITY], columns=list(SHEETS[ACCOUNT_ACTIVITY][1])),
+            account=json.loads(account_file.read_text())["account"],
+        )
+
+
+statement_store = StatementStore()
@@ -1,36 +1,470 @@
+import datetime as dt
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
-import yfinance_cache as yfc
+
+from src.database import close_matrix, indicator_store, resampling
+from src.database.bar_store import BAR_COLUMNS, TIMESTAMP_COLUMN, BarStore, Coverage, empty_bars
+from src.database.market_data_provider import MarketDataProvider, YahooProvider
+from src.database.offline_provider import OfflineProvider, RecordingProvider
+from src.database.search_cache import SearchCache
+from src.database.single_flight import SingleFlight
+from src.database.swr_cache import StaleWhileRevalidateCache
+from src.database.symbol_directory import SymbolDirectory
+from src.database.symbol_index import SymbolEntry, default_entries, read_symbols_file
+from src.services.intervals import interval_to_duration, is_intraday
+
+OFFLINE_FOLDER = Path("data/offline")
+
+
+def create_provider() -> MarketDataProvider:
+    """Create the market data provider selected by the ``MARKET_DATA_PROVIDER`` environment variable.
+
+    * ``yahoo`` (default): live data from yfinance / yfinance_cache
+    * ``offline``: recorded or synthetic data from ``MARKET_DATA_OFFLINE_FOLDER``, without network access
+    * ``record``: live data from yfinance, also recorded to ``MARKET_DATA_OFFLINE_FOLDER``
+    """
+    kind = os.environ.get("MARKET_DATA_PROVIDER", "yahoo")
+    offline_folder = Path(os.environ.get("MARKET_DATA_OFFLINE_FOLDER", OFFLINE_FOLDER))
+    if kind == "yahoo":
+        return YahooProvider()
+    if kind == "offline":
+        return OfflineProvider(offline_folder)
+    if kind == "record":
+        return RecordingProvider(YahooProvider(), offline_folder)
+    msg = f"Unknown market data provider: {kind}"
+    raise ValueError(msg)
+
+
+provider = create_provider()
+bar_store = BarStore()
+upstream_flights = SingleFlight()
+close_matrices = close_matrix.CloseMatrixCache()
+
+# Quote summaries carry the current price, analyst targets change at most daily
+INFO_TTL = dt.timedelta(minutes=30)
+ANALYST_TARGETS_TTL = dt.timedelta(hours=24)
+info_cache = StaleWhileRevalidateCache(INFO_TTL.total_seconds())
+analyst_targets_cache = StaleWhileRevalidateCache(ANALYST_TARGETS_TTL.total_seconds())
+
+# Upstream search quotes, refined locally while a query is typed
+search_cache = SearchCache()
+
+# Local symbol directory, searched before upstream, opened and seeded with the static lists on first use
+symbol_directory = SymbolDirectory(seed=default_entries)
+
+# Bounded pool loading the info of several tickers concurrently
+INFO_WORKERS = 8
+info_pool = ThreadPoolExecutor(max_workers=INFO_WORKERS)
+info_batch_stats = {"requested": 0, "timed_out": 0, "failed": 0}
+info_batch_stats_lock = threading.Lock()
+
+# Stored bars younger than this are served without asking upstream for a new tail
+MAX_TAIL_AGE = dt.timedelta(minutes=15)
+MIN_TAIL_AGE = dt.timedelta(minutes=1)
+# Relative difference of a re-fetched bar from the stored one beyond which upstream adjusted its prices
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def _tail_age(interval: str) -> float:
+    return min(max(interval_to_duration(interval), MIN_TAIL_AGE), MAX_TAIL_AGE).total_seconds()
+
+
+def _to_key(moment: pd.Timestamp, interval: str) -> int:
+    """Convert a timestamp to the store's int64 key.
+
+    Intraday bars are keyed by their UTC instant. Daily and coarser bars are keyed by their
+    exchange-local calendar date at midnight UTC, so bulk (tz-naive) and single-ticker (tz-aware)
+    upstream answers land on the same key.
+    """
+    if is_intraday(interval):
+        moment = moment.tz_localize("UTC") if moment.tzinfo is None else moment.tz_convert("UTC")
+    else:
+        moment = moment.tz_localize(None) if moment.tzinfo is not None else moment
+        moment = moment.normalize()
+    return int(moment.as_unit("ns").value)
+
+
+def _to_bars(history: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Convert a yfinance history frame (indexed by date) to the store's columnar layout."""
+    history = history.dropna(subset=["Close"])
+    index = pd.DatetimeIndex(history.index)
+    if is_intraday(interval):
+        index = index if index.tz is None else index.tz_convert("UTC").tz_localize(None)
+    else:
+        index = (index if index.tz is None else index.tz_localize(None)).normalize()
+    bars = pd.DataFrame({TIMESTAMP_COLUMN: index.as_unit("ns").to_numpy().view(np.int64)})
+    for column in BAR_COLUMNS:
+        bars[column] = history[column].to_numpy(dtype=np.float64) if column in history else np.nan
+    return bars
+
+
+def _to_history(bars: pd.DataFrame, interval: str, timezone: str) -> pd.DataFrame:
+    """Convert stored bars back to the shape returned by ``yf.Ticker.history(...).reset_index()``."""
+    dates = pd.to_datetime(bars[TIMESTAMP_COLUMN].to_numpy(), unit="ns")
+    if is_intraday(interval):
+        history = pd.DataFrame({"Datetime": dates.tz_localize("UTC").tz_convert(timezone)})
+    else:
+        history = pd.DataFrame({"Date": dates})
+    for column in BAR_COLUMNS:
+        history[column] = bars[column].to_numpy()
+    return history
+
+
+def _fetch_upstream(
+    ticker_names: list[str], interval: str, start: pd.Timestamp | None
+) -> dict[str, tuple[pd.DataFrame, str]]:
+    """Fetch bars from the provider, in one bulk request when there are several tickers.
+
+    Returns the bars and exchange timezone of every ticker that has data.
+    """
+    fetched = {}
+    for ticker_name, history in provider.bulk_history(ticker_names, interval, start).items():
+        bars = _to_bars(history, interval)
+        if not bars.empty:
+            timezone = getattr(history.index, "tz", None)
+            fetched[ticker_name] = (bars, "UTC" if timezone is None else str(timezone))
+    return fetched
+
+
+def _refresh(ticker_names: list[str], interval: str, start: pd.Timestamp | None) -> dict[str, Coverage]:
+    """Make sure the bar store holds [start, now] for every ticker, fetching only what is missing.
+
+    Tickers never seen (or seen with a later start) are fetched in one bulk request from ``start``,
+    tickers whose tail is older than the interval allows are fetched from their last stored bar.
+    """
+    start_key = None if start is None else _to_key(start, interval)
+    coverages: dict[str, Coverage] = {}
+    cold: list[str] = []
+    stale: list[str] = []
+    for ticker_name in ticker_names:
+        coverage = bar_store.coverage(ticker_name, interval)
+        if coverage is None or not coverage.covers(start_key):
+            cold.append(ticker_name)
+        elif coverage.age() > _tail_age(interval):
+            stale.append(ticker_name)
+            coverages[ticker_name] = coverage
+        else:
+            coverages[ticker_name] = coverage
+
+    fetches: list[tuple[list[str], pd.Timestamp | None, int | None]] = []
+    if cold:
+        fetches.append((cold, start, start_key))
+    if stale:
+        tail_start = pd.Timestamp(min(coverages[t].last_bar for t in stale), unit="ns")
+        fetches.append((stale, tail_start, _to_key(tail_start, interval)))
+
+    for names, fetch_start, fetch_start_key in fetches:
+        # Identical concurrent requests (same tickers, interval and range) share one upstream fetch
+        key = (tuple(names), interval, fetch_start_key)
+        fetch = partial(_fetch_and_store, names, interval, fetch_start, fetch_start_key, dict(coverages))
+        coverages.update(upstream_flights.do(key, fetch))
+    return coverages
+
+
+def _rescaled(ticker_name: str, interval: str, bars: pd.DataFrame, coverage: Coverage) -> bool:
+    """Tell whether upstream adjusted its prices since the stored bars were fetched.
+
+    Upstream prices are adjusted for splits and dividends, so a new adjustment rescales all the past
+    bars. The re-fetched last stored bar is compared on its Open, which does not change while the
+    bar is still forming.
+    """
+    stored = bar_store.read(ticker_name, interval, start=coverage.last_bar, end=coverage.last_bar)
+    fetched = bars[bars[TIMESTAMP_COLUMN] == coverage.last_bar]
+    if stored.empty or fetched.empty:
+        return False
+    return not np.isclose(
+        fetched["Open"].iloc[0], stored["Open"].iloc[0], rtol=ADJUSTMENT_TOLERANCE, atol=0, equal_nan=True
+    )
+
+
+def _fetch_and_store(
+    ticker_names: list[str],
+    interval: str,
+    start: pd.Timestamp | None,
+    start_key: int | None,
+    previous: dict[str, Coverage],
+) -> dict[str, Coverage]:
+    fetched = _fetch_upstream(ticker_names, interval, start)
+
+    # Rescaled tickers are fetched again over their whole covered range, which replaces the stored bars
+    rescaled: dict[int | None, list[str]] = {}
+    for ticker_name, (bars, _) in fetched.items():
+        if ticker_name in previous and _rescaled(ticker_name, interval, bars, previous[ticker_name]):
+            rescaled.setdefault(previous[ticker_name].start, []).append(ticker_name)
+    replaced: set[str] = set()
+    for covered_start, names in rescaled.items():
+        refetch_start = None if covered_start is None else pd.Timestamp(covered_start, unit="ns")
+        refetched = _fetch_upstream(names, interval, refetch_start)
+        fetched.update(refetched)
+        replaced.update(refetched)
+
+    coverages = {}
+    for ticker_name in ticker_names:
+        if ticker_name in fetched:
+            bars, timezone = fetched[ticker_name]
+        elif ticker_name in previous:
+            # Nothing new upstream, remember we asked so the tail is not re-fetched right away
+            bars, timezone = empty_bars(), previous[ticker_name].timezone
+        else:
+            continue
+        with bar_store.lock(ticker_name, interval):
+            if ticker_name in replaced:
+                bar_store.clear(ticker_name, interval)
+            coverages[ticker_name] = bar_store.write(ticker_name, interval, bars, start_key, timezone)
+    return coverages
+
+
+def get_upstream_stats() -> dict[str, int]:
+    return upstream_flights.stats()
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    with info_batch_stats_lock:
+        batches = dict(info_batch_stats)
+    return {
+        "info_cache": info_cache.stats(),
+        "analyst_targets_cache": analyst_targets_cache.stats(),
+        "info_batches": batches,
+        "search_cache": search_cache.stats(),
+    }
+
+
+def _source_interval(ticker_names: list[str], interval: str, start: pd.Timestamp | None) -> str:
+    """Pick the stored interval ``interval`` is read from.
+
+    Coarse intervals are always resampled from their base interval. Other intraday intervals are
+    resampled from the finest interval already stored over the range, and only fetched as such
+    when there is none.
+    """
+    if interval in resampling.BASE_INTERVALS:
+        return resampling.BASE_INTERVALS[interval]
+    for finer in resampling.finer_intervals(interval, start):
+        start_key = None if start is None else _to_key(resampling.period_start(start, interval), finer)
+        coverages = [bar_store.coverage(ticker_name, finer) for ticker_name in ticker_names]
+        if all(coverage is not None and coverage.covers(start_key) for coverage in coverages):
+            return finer
+    return interval
+
+
+def _read_history(
+    ticker_name: str, interval: str, source: str, start: pd.Timestamp | None, timezone: str
+) -> pd.DataFrame:
+    start_key = None if start is None else _to_key(start, source)
+    bars = bar_store.read(ticker_name, source, start=start_key)
+    if source != interval:
+        bars = resampling.resample(bars, interval, timezone)
+    return _to_history(bars, interval, timezone)
+
+
+def _load_history(ticker_name: str, interval: str, start: pd.Timestamp | None) -> pd.DataFrame:
+    source = _source_interval([ticker_name], interval, start)
+    if source != interval and start is not None:
+        start = resampling.period_start(start, interval)
+    coverage = _refresh([ticker_name], source, start).get(ticker_name)
+    if coverage is None:
+        return pd.DataFrame()
+    return _read_history(ticker_name, interval, source, start, coverage.timezone)
 
 
 def get_ticker_history(ticker_name: str, period: str, interval: str) -> pd.DataFrame:
-    dat = yf.Ticker(ticker_name)
-    return dat.history(period=period, interval=interval).reset_index()
+    start = None if period == "max" else pd.Timestamp.now() - interval_to_duration(period)
+    return _load_history(ticker_name, interval, start)
 
 
 def get_ticker_history_from_start(ticker_name: str, start: str, interval: str) -> pd.DataFrame:
-    dat = yf.Ticker(ticker_name)
-    return dat.history(start=start, interval=interval).reset_index()
+    return _load_history(ticker_name, interval, pd.Timestamp(start))
+
+
+def get_close_matrix(ticker_names: list[str]) -> close_matrix.CloseMatrix:
+    """Return the aligned daily closes of the tickers that have data, over their full history.
+
+    The matrix is cached per symbol set and only extended with the bars stored since its last refresh,
+    or rebuilt when upstream adjusted the past closes.
+    """
+    key = close_matrix.matrix_key(ticker_names)
+    matrix = close_matrices.get(bar_store.root, key)
+    if matrix is not None and matrix.age() <= _tail_age("1d"):
+        return matrix
+
+    with close_matrices.lock(bar_store.root, key):
+        matrix = close_matrices.get(bar_store.root, key)
+        if matrix is not None and matrix.age() <= _tail_age("1d"):
+            return matrix
+        coverages = _refresh(ticker_names, "1d", None)
+        tickers = sorted({ticker_name for ticker_name in ticker_names if ticker_name in coverages})
+        if matrix is None or matrix.tickers != tickers:
+            matrix = None
+        # The last date may have been a partial bar, the one before it is compared to detect adjusted closes
+        since = int(matrix.dates[-2]) if matrix is not None and len(matrix.dates) > 1 else None
+        columns = {ticker_name: bar_store.read(ticker_name, "1d", start=since) for ticker_name in tickers}
+        if matrix is not None and (since is None or not close_matrix.matches(matrix, columns, since)):
+            matrix = None
+            columns = {ticker_name: bar_store.read(ticker_name, "1d") for ticker_name in tickers}
+        matrix = close_matrix.build(columns, matrix)
+        close_matrices.put(bar_store.root, key, matrix)
+    return matrix
+
+
+def prefetch_history(ticker_names: list[str], interval: str, start: pd.Timestamp | None) -> list[str]:
+    """Make sure the store holds the history of every ticker, fetching the missing ones in one bulk request.
+
+    Returns the tickers that have data.
+    """
+    source = _source_interval(ticker_names, interval, start)
+    if source != interval and start is not None:
+        start = resampling.period_start(start, interval)
+    return list(_refresh(ticker_names, source, start))
+
+
+def get_tickers_history_from_start(ticker_names: list[str], start: str, interval: str) -> dict[str, pd.DataFrame]:
+    """Return the history of every ticker that has data, fetching the missing ones in one bulk request."""
+    start_timestamp = pd.Timestamp(start)
+    source = _source_interval(ticker_names, interval, start_timestamp)
+    if source != interval:
+        start_timestamp = resampling.period_start(start_timestamp, interval)
+    coverages = _refresh(ticker_names, source, start_timestamp)
+    return {
+        ticker_name: _read_history(ticker_name, interval, source, start_timestamp, coverage.timezone)
+        for ticker_name, coverage in coverages.items()
+    }
+
+
+def get_last_bar_date(ticker_names: list[str], interval: str = "1d") -> str | None:
+    """Return the date of the latest stored bar of the tickers, once their stale tails are refreshed.
 
+    Tickers missing from the store are not fetched. Returns None when none of them is stored.
+    """
+    stored = {name: coverage for name in ticker_names if (coverage := bar_store.coverage(name, interval)) is not None}
+    if not stored:
+        return None
+    starts = [coverage.start for coverage in stored.values() if coverage.start is not None]
+    # Every stored ticker covers the latest of their starts, so only stale tails are fetched
+    start = pd.Timestamp(max(starts), unit="ns") if starts else None
+    coverages = _refresh(list(stored), interval, start)
+    return pd.Timestamp(max(coverage.last_bar for coverage in coverages.values()), unit="ns").strftime("%Y-%m-%d")
 
-def get_tickers_history(ticker_names: list[str], period: str) -> pd.DataFrame:
-    dat = yf.Tickers(ticker_names)
-    return dat.history(period=period).dropna()
 
+def get_indicator_state(ticker_name: str, interval: str, ema_windows: list[int]) -> pd.DataFrame:
+    """Return the running indicator state over the stored bars, with a "Date" column like ``_to_history``."""
+    state = indicator_store.load_state(bar_store, ticker_name, interval, ema_windows)
+    if state.empty:
+        return state
+    dates = pd.to_datetime(state.pop(TIMESTAMP_COLUMN).to_numpy(), unit="ns")
+    state.insert(0, "Datetime" if is_intraday(interval) else "Date", dates)
+    return state
 
-def get_ticker_info(ticker_name: str) -> pd.DataFrame:
-    dat = yfc.Ticker(ticker_name)
-    return dat.info
 
+def get_ticker_info(ticker_name: str) -> dict:
+    return info_cache.get(ticker_name.upper(), partial(provider.info, ticker_name))
 
-def get_ticker_analyst_price_targets(ticker_name: str) -> pd.DataFrame:
-    dat = yf.Ticker(ticker_name)
-    return dat.analyst_price_targets
+
+def get_ticker_analyst_price_targets(ticker_name: str) -> dict:
+    return analyst_targets_cache.get(ticker_name.upper(), partial(provider.analyst_price_targets, ticker_name))
 
 
 def search(query: str) -> list:
-    return yf.Search(query).quotes
+    return search_cache.get(query, provider.search)
+
+
+def search_symbols(query: str, limit: int, fuzzy: bool = True) -> list[SymbolEntry]:
+    return symbol_directory.search(query, limit, fuzzy=fuzzy)
+
+
+def _quote_entry(quote: dict) -> SymbolEntry | None:
+    name = quote.get("longname") or quote.get("shortname")
+    if not quote.get("symbol") or not name:
+        return None
+    return SymbolEntry(
+        symbol=quote["symbol"],
+        name=name,
+        kind=quote.get("quoteType") or "equity",
+        exchange=quote.get("exchDisp") or quote.get("exchange"),
+    )
+
+
+def _discover_symbols(query: str) -> list[dict]:
+    quotes = search(query)
+    symbol_directory.add_many(entry for entry in map(_quote_entry, quotes) if entry is not None)
+    return quotes
+
+
+def discover_symbols(query: str, timeout: float | None = None) -> list[dict] | None:
+    """Return the upstream search quotes of ``query``, storing their symbols in the directory.
+
+    Returns None when upstream failed or did not answer within ``timeout`` seconds.
+    """
+    future = info_pool.submit(_discover_symbols, query)
+    done, _ = wait([future], timeout=timeout)
+    if future not in done:
+        return None
+    if future.exception() is not None:
+        print(f"Searching {query!r} upstream failed: {future.exception()}")
+        return None
+    return future.result()
+
+
+def _remember_symbol(ticker_name: str) -> None:
+    try:
+        info = get_ticker_info(ticker_name)
+    except Exception as e:
+        print(f"Adding {ticker_name} to the symbol directory failed: {e}")
+        return
+    name = info.get("longName") or info.get("shortName")
+    if not name:
+        return
+    symbol_directory.add(
+        SymbolEntry(
+            symbol=info.get("symbol") or ticker_name,
+            name=name,
+            kind=info.get("quoteType") or "equity",
+            exchange=info.get("exchange"),
+            currency=info.get("currency"),
+        )
+    )
+
+
+def remember_symbol(ticker_name: str) -> None:
+    """Add a viewed symbol to the directory in the background, if it is not there yet."""
+    if ticker_name not in symbol_directory:
+        info_pool.submit(_remember_symbol, ticker_name)
+
+
+def import_symbols(path: Path) -> int:
+    """Store the symbols of a CSV file in the directory, replacing the stored ones. Returns their count."""
+    return symbol_directory.add_many(read_symbols_file(path), replace=True)
+
+
+def get_tickers_info(ticker_names: list[str], timeout: float | None = None) -> dict[str, dict | None]:
+    """Return the info of every ticker, loaded concurrently from the info cache.
+
+    Tickers whose info failed or is not available within ``timeout`` seconds map to None. Their
+    load keeps running in the background and fills the cache for the next request.
+    """
+    futures = {ticker_name: info_pool.submit(get_ticker_info, ticker_name) for ticker_name in ticker_names}
+    done, _ = wait(futures.values(), timeout=timeout)
+    infos: dict[str, dict | None] = {}
+    timed_out = failed = 0
+    for ticker_name, future in futures.items():
+        if future not in done:
+            timed_out += 1
+            infos[ticker_name] = None
+        elif future.exception() is not None:
+            failed += 1
+            infos[ticker_name] = None
+        else:
+            infos[ticker_name] = future.result()
+    with info_batch_stats_lock:
+        info_batch_stats["requested"] += len(futures)
+        info_batch_stats["timed_out"] += timed_out
+        info_batch_stats["failed"] += failed
+    return infos
 
 
-def get_tickers(ticker_names: list[str]) -> dict[str, pd.DataFrame]:
-    return yf.Tickers(ticker_names).tickers
+def get_fx_rate(currency: str, to_currency: str = "USD") -> float:
+    return provider.fx_rate(currency, to_currency)
@@ -0,0 +1,85 @@
+"""Stale-while-revalidate cache.
+
+Entries older than the TTL are still served right away, while one background refresh per key
+fetches a new value. Upstream is therefore asked at most once per key and TTL, and callers only
+wait on upstream the first time a key is requested. The least recently used entries are evicted
+past ``max_entries``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from src.database.single_flight import SingleFlight
+
+REFRESH_WORKERS = 4
+MAX_SWR_ENTRIES = 4096
+
+
+@dataclass
+class _Entry:
+    value: Any
+    # Unix time of the last refresh attempt, successful or not
+    checked_at: float
+    refreshing: bool = False
+
+
+class StaleWhileRevalidateCache:
+    def __init__(
+        self, ttl: float, executor: ThreadPoolExecutor | None = None, max_entries: int = MAX_SWR_ENTRIES
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._executor = executor or ThreadPoolExecutor(max_workers=REFRESH_WORKERS)
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def get[T](self, key: Hashable, load: Callable[[], T]) -> T:
+        """Return the cached value of ``key``, loading it on the first request and refreshing it once stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                stale = time.time() - entry.checked_at > self.ttl
+                self._counters["stale_hits" if stale else "hits"] += 1
+                if stale and not entry.refreshing:
+                    entry.refreshing = True
+                    self._executor.submit(self._refresh, key, load)
+                return entry.value
+            self._counters["misses"] += 1
+
+        value = self._flights.do(key, load)
+        with self._lock:
+            self._entries.setdefault(key, _Entry(value=value, checked_at=time.time()))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _refresh(self, key: Hashable, load: Callable[[], Any]) -> None:
+        try:
+            value = load()
+        except Exception:
+            # Keep serving the stale value, and wait for another TTL before retrying
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.checked_at = time.time()
+                    entry.refreshing = False
+            return
+        with self._lock:
+            self._counters["refreshes"] += 1
+            # Entries evicted meanwhile are not brought back
+            if key in self._entries:
+                self._entries[key] = _Entry(value=value, checked_at=time.time())
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
@@ -0,0 +1,196 @@
+"""Local symbol directory, searched before upstream.
+
+Symbols (name, kind, exchange, currency) are stored in SQLite, with an FTS5 trigram index on the
+symbol, the name and extra keywords. The directory is seeded with the static lists of
+``data/search`` on first use, and grows with the symbols discovered by upstream searches, the
+symbols users view and bulk imports (``flask import-symbols FILE``).
+
+Searches are answered by an in-memory ``SymbolIndex`` of the stored symbols, loaded on first use
+and kept in step with the additions: exact symbol/name, symbol prefix, name word prefix, then
+substring. When nothing contains the query and ``fuzzy`` is set, the FTS index returns the entries
+sharing most trigrams with the query instead, so that typos still find the symbol.
+"""
+
+import sqlite3
+import threading
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from src.database.symbol_index import SymbolEntry, SymbolIndex, normalize
+
+SYMBOL_DIRECTORY_FILE = Path("/database/symbols.db")
+NGRAM = 3
+# Fuzzy matches share at least this fraction of the query trigrams
+MIN_SIMILARITY = 0.5
+# Fuzzy candidates ranked by bm25 before the similarity filter, per requested result
+FUZZY_CANDIDATES = 5
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    icon_url TEXT,
+    keywords TEXT NOT NULL DEFAULT '',
+    exchange TEXT,
+    currency TEXT
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(lower(name));
+CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+    symbol, name, keywords, content='symbols', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS symbols_insert AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbols_fts(rowid, symbol, name, keywords) VALUES (new.rowid, new.symbol, new.name, new.keywords);
+END;
+CREATE TRIGGER IF NOT EXISTS symbols_delete AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, symbol, name, keywords)
+    VALUES ('delete', old.rowid, old.symbol, old.name, old.keywords);
+END;
+CREATE TRIGGER IF NOT EXISTS symbols_update AFTER UPDATE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, symbol, name, keywords)
+    VALUES ('delete', old.rowid, old.symbol, old.name, old.keywords);
+    INSERT INTO symbols_fts(rowid, symbol, name, keywords) VALUES (new.rowid, new.symbol, new.name, new.keywords);
+END;
+"""
+
+COLUMNS = "s.symbol, s.name, s.kind, s.icon_url, s.keywords, s.exchange, s.currency"
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _word_ngrams(text: str) -> set[str]:
+    return {ngram for word in text.split() for ngram in _ngrams(f"  {word} ")}
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+class SymbolDirectory:
+    def __init__(
+        self, path: Path = SYMBOL_DIRECTORY_FILE, seed: Callable[[], Iterable[SymbolEntry]] | None = None
+    ) -> None:
+        self.path = path
+        self._seed = seed
+        self._conn: sqlite3.Connection | None = None
+        self._index: SymbolIndex | None = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the directory connection, opening (and seeding) the database on first use. Holds ``_lock``."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            with conn:
+                conn.executescript(SCHEMA)
+            self._conn = conn
+            if self._seed is not None:
+                self._insert(self._seed(), replace=False)
+        return self._conn
+
+    def _loaded_index(self) -> SymbolIndex:
+        """Return the in-memory index of the stored symbols, in storage order. Holds ``_lock``."""
+        if self._index is None:
+            rows = self._connection().execute(f"SELECT {COLUMNS} FROM symbols s ORDER BY s.rowid").fetchall()  # noqa: S608
+            self._index = SymbolIndex(SymbolEntry(*row) for row in rows)
+        return self._index
+
+    def index(self) -> SymbolIndex:
+        with self._lock:
+            return self._loaded_index()
+
+    def __len__(self) -> int:
+        return len(self.index())
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index()
+
+    def add(self, entry: SymbolEntry) -> bool:
+        """Store ``entry``, unless its symbol is already stored. Returns whether it was added."""
+        return self.add_many([entry]) == 1
+
+    def add_many(self, entries: Iterable[SymbolEntry], replace: bool = False) -> int:
+        """Store ``entries`` in one transaction, replacing the stored ones if ``replace``. Returns the count written."""
+        with self._lock:
+            self._connection()
+            return self._insert(entries, replace)
+
+    def _insert(self, entries: Iterable[SymbolEntry], replace: bool) -> int:
+        entries = [
+            SymbolEntry(
+                entry.symbol.upper(),
+                entry.name,
+                entry.kind.lower(),
+                entry.icon_url,
+                entry.keywords,
+                entry.exchange,
+                entry.currency,
+            )
+            for entry in entries
+        ]
+        # In the column order of the table
+        rows = [
+            (entry.symbol, entry.name, entry.kind, entry.icon_url, entry.keywords, entry.exchange, entry.currency)
+            for entry in entries
+        ]
+        conflict = (
+            """ON CONFLICT(symbol) DO UPDATE SET name = excluded.name, kind = excluded.kind,
+            icon_url = coalesce(excluded.icon_url, icon_url), keywords = excluded.keywords,
+            exchange = coalesce(excluded.exchange, exchange), currency = coalesce(excluded.currency, currency)"""
+            if replace
+            else "ON CONFLICT(symbol) DO NOTHING"
+        )
+        assert self._conn is not None
+        with self._conn as conn:
+            before = conn.execute("SELECT count(*) FROM symbols").fetchone()[0]
+            insert = f"INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?) {conflict}"  # noqa: S608
+            conn.executemany(insert, rows)
+            added = conn.execute("SELECT count(*) FROM symbols").fetchone()[0] - before
+        if replace:
+            # Replaced entries keep stale postings: the index is reloaded on its next use
+            self._index = None
+            return len(rows)
+        if self._index is not None:
+            for entry in entries:
+                self._index.add(entry)
+        return added
+
+    def search(
+        self, query: str, limit: int = 10, kinds: set[str] | None = None, fuzzy: bool = True
+    ) -> list[SymbolEntry]:
+        """Return up to ``limit`` entries matching ``query``, best matches first."""
+        found = self.index().search(query, limit, kinds)
+        q = normalize(query)
+        if found or not fuzzy or len(q) < NGRAM or limit <= 0:
+            return found
+
+        params: dict = {"limit": limit}
+        kind_filter = ""
+        if kinds is not None:
+            params.update({f"kind{i}": kind for i, kind in enumerate(sorted(kinds))})
+            kind_filter = f"AND s.kind IN ({', '.join(f':kind{i}' for i in range(len(kinds)))})"
+        fts = "FROM symbols_fts JOIN symbols s ON s.rowid = symbols_fts.rowid WHERE symbols_fts MATCH :match"
+        with self._lock:
+            rows = (
+                self._connection()
+                .execute(
+                    f"SELECT {COLUMNS} {fts} {kind_filter} ORDER BY bm25(symbols_fts) LIMIT :candidates",
+                    {
+                        **params,
+                        "match": " OR ".join(map(_phrase, sorted(_ngrams(q)))),
+                        "candidates": limit * FUZZY_CANDIDATES,
+                    },
+                )
+                .fetchall()
+            )
+
+        # Similarity on the trigrams of the space padded words, so that word boundaries count too
+        padded = _word_ngrams(q)
+
+        def similarity(row: tuple) -> float:
+            return len(padded & _word_ngrams(normalize(f"{row[0]} {row[1]} {row[4]}"))) / len(padded)
+
+        scored = sorted(((similarity(row), i, row) for i, row in enumerate(rows)), key=lambda item: (-item[0], item[1]))
+        return [SymbolEntry(*row) for score, _, row in scored[:limit] if score >= MIN_SIMILARITY]
@@ -0,0 +1,171 @@
+"""In-memory symbol search index.
+
+Entries are indexed once with prefix postings (symbol and name words) and trigram postings
+(symbol and name), so a lookup only touches the postings of the query instead of scanning every
+row. Results are ranked by match kind: exact symbol/name, symbol prefix, name word prefix, then
+substring. Within a kind, entries keep their insertion order (the order of the source files).
+"""
+
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+SEARCH_FOLDER = Path("data/search")
+MAX_PREFIX = 12
+NGRAM = 3
+WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+@dataclass(frozen=True)
+class SymbolEntry:
+    symbol: str
+    name: str
+    # "equity", "etf", "crypto", "index"... (lowercase upstream quote type)
+    kind: str
+    icon_url: str | None = None
+    # Extra words the entry can be found by (e.g. the country of an index)
+    keywords: str = ""
+    exchange: str | None = None
+    currency: str | None = None
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class SymbolIndex:
+    def __init__(self, entries: Iterable[SymbolEntry] = ()) -> None:
+        self.entries: list[SymbolEntry] = []
+        self._symbols: dict[str, int] = {}
+        self._haystacks: list[tuple[str, str]] = []
+        self._exact: dict[str, list[int]] = {}
+        self._symbol_prefixes: dict[str, list[int]] = {}
+        self._word_prefixes: dict[str, list[int]] = {}
+        self._ngrams: dict[str, list[int]] = {}
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._symbols
+
+    def add(self, entry: SymbolEntry) -> bool:
+        """Index ``entry``, unless its symbol is already indexed. Returns whether it was added."""
+        if entry.symbol.upper() in self._symbols:
+            return False
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self._symbols[entry.symbol.upper()] = entry_id
+        symbol = entry.symbol.lower()
+        name = normalize(f"{entry.name} {entry.keywords}")
+        self._haystacks.append((symbol, name))
+
+        def post(postings: dict[str, list[int]], keys: Iterable[str]) -> None:
+            for key in keys:
+                ids = postings.setdefault(key, [])
+                if not ids or ids[-1] != entry_id:
+                    ids.append(entry_id)
+
+        post(self._exact, {symbol, normalize(entry.name)})
+        post(self._symbol_prefixes, (symbol[:i] for i in range(1, min(len(symbol), MAX_PREFIX) + 1)))
+        words = [word for word in WORD_SPLIT.split(name) if word]
+        post(self._word_prefixes, (word[:i] for word in words for i in range(1, min(len(word), MAX_PREFIX) + 1)))
+        post(self._ngrams, sorted(_ngrams(symbol) | _ngrams(name)))
+        return True
+
+    def search(self, query: str, limit: int = 10, kinds: set[str] | None = None) -> list[SymbolEntry]:
+        """Return up to ``limit`` entries matching ``query``, best matches first."""
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        found: list[int] = []
+        seen: set[int] = set()
+
+        def collect(ids: Iterable[int], matches: Callable[[str, str], bool]) -> bool:
+            for entry_id in ids:
+                if entry_id in seen or (kinds is not None and self.entries[entry_id].kind not in kinds):
+                    continue
+                if matches(*self._haystacks[entry_id]):
+                    seen.add(entry_id)
+                    found.append(entry_id)
+                    if len(found) >= limit:
+                        return True
+            return False
+
+        # Every word of the query is a word prefix of a match: scanning the rarest posting is enough
+        words = [word for word in WORD_SPLIT.split(q) if word]
+        word_postings: list[list[int]] = [self._word_prefixes.get(word[:MAX_PREFIX], []) for word in words]
+        word_candidates = min(word_postings, key=len) if word_postings else []
+        padded = f" {q}"
+        stages: list[tuple[Iterable[int], Callable[[str, str], bool]]] = [
+            (self._exact.get(q, []), lambda *_: True),
+            (self._symbol_prefixes.get(q[:MAX_PREFIX], []), lambda symbol, _: symbol.startswith(q)),
+            (
+                word_candidates,
+                lambda _, name: name.startswith(q) or padded in f" {name}",
+            ),
+        ]
+        if len(q) >= NGRAM:
+            stages.append((self._substring_candidates(q), lambda symbol, name: q in symbol or q in name))
+        for ids, matches in stages:
+            if collect(ids, matches):
+                break
+        return [self.entries[entry_id] for entry_id in found]
+
+    def _substring_candidates(self, q: str) -> list[int]:
+        # Every match holds every trigram of the query: scanning the rarest posting is enough
+        postings: list[list[int]] = [self._ngrams.get(ngram, []) for ngram in _ngrams(q)]
+        return min(postings, key=len)
+
+
+def read_symbols_file(
+    path: Path,
+    kind: str | None = None,
+    icon_url: Callable[[dict], str | None] | None = None,
+    keywords: list[str] | None = None,
+) -> Iterator[SymbolEntry]:
+    """Read a CSV with ``Ticker`` and ``Name`` columns, and optional ``Type``, ``Exchange`` and ``Currency`` ones."""
+    rows = pd.read_csv(path, keep_default_na=False)
+    for row in rows.to_dict("records"):
+        yield SymbolEntry(
+            symbol=row["Ticker"],
+            name=row["Name"],
+            kind=kind or row.get("Type") or "equity",
+            icon_url=icon_url(row) if icon_url is not None else None,
+            keywords=" ".join(str(row[column]) for column in keywords or []),
+            exchange=row.get("Exchange") or None,
+            currency=row.get("Currency") or None,
+        )
+
+
+def default_entries() -> Iterator[SymbolEntry]:
+    """Entries of the static cryptocurrency, index and equity lists of ``data/search``."""
+    yield from read_symbols_file(
+        SEARCH_FOLDER / "top_cryptos.csv",
+        "crypto",
+        lambda row: f"https://financialmodelingprep.com/image-stock/{row['Ticker'].removesuffix('-USD')}.png",
+    )
+    yield from read_symbols_file(
+        SEARCH_FOLDER / "top_indexes.csv",
+        "index",
+        lambda row: f"https://flagcdn.com/{row['CountryCode']}.svg",
+        keywords=["CountryName", "Currency"],
+    )
+    yield from read_symbols_file(
+        SEARCH_FOLDER / "top_equities.csv",
+        icon_url=lambda row: f"https://financialmodelingprep.com/image-stock/{row['Ticker']}.png",
+    )
+
+
+def load_default_index() -> SymbolIndex:
+    """Index the static cryptocurrency, index and equity lists of ``data/search``."""
+    return SymbolIndex(default_entries())
@@ -0,0 +1,62 @@
+"""Streaming reader for selected columns of xlsx sheets.
+
+Sheets are read with openpyxl in read-only mode, which parses the sheet XML lazily instead of
+loading the whole workbook. Rows are read over the span of the requested columns only, so time and
+memory scale with the requested columns rather than with the whole workbook. openpyxl parses with
+defusedxml when it is installed (it is a dependency), so uploaded workbooks declaring XML entities
+are rejected.
+
+Cell values are returned as str, int, float, bool, datetime or None: cells typed as dates in Excel
+are read as datetimes.
+"""
+
+import datetime as dt
+from collections.abc import Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+import openpyxl
+
+type CellValue = str | int | float | bool | dt.datetime | None
+
+
+class XlsxReader:
+    def __init__(self, path: Path) -> None:
+        self._workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._workbook.close()
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return list(self._workbook.sheetnames)
+
+    def header(self, sheet: str) -> list[CellValue]:
+        """Return the values of the first row of ``sheet``."""
+        for row in self._workbook[sheet].iter_rows(max_row=1, values_only=True):
+            return list(row)
+        return []
+
+    def rows(self, sheet: str, columns: list[int]) -> Iterator[tuple[CellValue, ...]]:
+        """Yield the values of the given columns (0-based indices) for every row of ``sheet`` after the first.
+
+        Rows without any value in the span of the given columns are skipped.
+        """
+        first, last = min(columns), max(columns)
+        offsets = [index - first for index in columns]
+        # openpyxl fills the gaps between the rows of the sheet with empty rows, and some workbooks
+        # (eToro's) have a few rows at the very bottom of the grid
+        empty = (None,) * (last - first + 1)
+        rows = self._workbook[sheet].iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True)
+        for row in rows:
+            if row != empty:
+                yield tuple(row[offset] for offset in offsets)
@@ -2,10 +2,10 @@
 from pathlib import Path
 
 from flask import current_app
-from flask_login import current_user
+from flask_login import current_user, login_required
 from flask_openapi3 import APIBlueprint, Tag
 
-from src.models import BadRequestResponse, CompareToIndexQuery, CompareToIndexResponse, NotFoundResponse
+from src.models import CompareToIndexQuery, NotFoundResponse, TaskStartResponse
 from src.services.compare_to_index_service import CompareToIndexService
 
 compare_bp = APIBlueprint(
@@ -18,34 +18,20 @@ compare_bp = APIBlueprint(
 
 @compare_bp.post(
     "/compare_to_index",
-    summary="Compare eToro portfolio to index",
+    summary="Compare eToro portfolio to indexes",
     responses={
-        200: CompareToIndexResponse,
-        400: BadRequestResponse,
+        200: TaskStartResponse,
         404: NotFoundResponse,
     },
 )
+@login_required
 def compare_to_index(query: CompareToIndexQuery):
     """
-    Compare eToro portfolio performance to a selected index.
+    Start the comparison of the eToro portfolio deposits invested in each selected index.
     """
-    try:
-        filename = query.filename
-        index_ticker = query.index_ticker
-        if not filename or not index_ticker:
-            return BadRequestResponse(error="Missing filename or index_ticker").dict(), 400
+    file_path = Path(current_app.config["UPLOAD_FOLDER"]) / current_user.email / query.filename
+    if not file_path.exists():
+        return NotFoundResponse(message="File not found").dict(), 404
 
-        user_email = current_user.email
-        upload_folder = Path(current_app.config["UPLOAD_FOLDER"]) / user_email
-        file_path = upload_folder / filename
-        if not file_path.exists():
-            return NotFoundResponse(message="File not found").dict(), 404
-
-        dates, deposits = CompareToIndexService.extract_etoro_data(file_path)
-        index_prices = CompareToIndexService.get_index_prices(index_ticker, dates)
-        index_values = CompareToIndexService.simulate_index_investment(dates, deposits, index_prices)
-
-        return CompareToIndexResponse(dates=dates, index_values=index_values, query=query).dict()
-
-    except Exception as e:
-        return BadRequestResponse(error=f"Processing error: {e!s}").dict(), 400
+    task_id = CompareToIndexService.compare_async(query, file_path)
+    return TaskStartResponse(task_id=task_id).dict(), 200
@@ -25,6 +25,15 @@ def get_ticker(query: models.TickerQuery):
     return result.dict(), 200
 
 
+@stocks_bp.get("/tickers/", tags=[stocks_tag], responses={200: models.TickersResponse, 400: models.BadRequestResponse})
+def get_tickers(query: models.TickersQuery):
+    try:
+        result = stocks_service.get_tickers(query)
+    except ValueError as e:
+        return models.BadRequestResponse(error=str(e)).model_dump(), 400
+    return result.dict(), 200
+
+
 @stocks_bp.get("/compare_growth/", tags=[stocks_tag], responses={200: models.CompareGrowthResponse})
 def get_compare_growth(query: models.CompareGrowthQuery):
     result = stocks_service.get_compare_growth(query)
@@ -50,19 +59,24 @@ def get_historical_kpis(query: models.KPIQuery):
 
 
 @stocks_bp.get("/search/", tags=[stocks_tag], responses={200: models.SearchResponse})
-@cache.memoize()
 def search_ticker(query: models.SearchQuery):
     result = stocks_service.search_ticker(query)
     return result.dict(), 200
 
 
-@stocks_bp.post("/etoro/upload_report", tags=[stocks_tag])
+@stocks_bp.get("/metrics/", tags=[stocks_tag], responses={200: models.MetricsResponse})
+def get_metrics():
+    result = stocks_service.get_metrics()
+    return result.dict(), 200
+
+
+@stocks_bp.post("/etoro/upload_report", tags=[stocks_tag], responses={200: models.EtoroUploadResponse})
 @login_required
 def upload_etoro_report(form: models.EtoroForm) -> tuple[dict, int]:
     if isinstance(form.file, str) or form.file.filename is None:
         return {"error": "Invalid file"}, 400
-    stocks_service.create_etoro_excel(form, current_user.email)
-    return {"result": "OK"}, 200
+    task_id = stocks_service.create_etoro_excel(form, current_user.email)
+    return models.EtoroUploadResponse(task_id=task_id).model_dump(), 200
 
 
 @stocks_bp.get("/etoro/reports", tags=[stocks_tag], responses={200: models.EtoroReportsResponse})
@@ -92,7 +106,6 @@ def analyze_etoro_excel_by_name(query: models.EtoroTradeCountQuery):
     tags=[stocks_tag],
     responses={200: models.TaskStartResponse, 404: models.NotFoundResponse},
 )
-@cache.memoize()  # FIXME: is this a good idea?
 @login_required
 def analyze_etoro_evolution_by_name(query: models.EtoroEvolutionQuery):
     try:
@@ -135,7 +148,11 @@ def get_task_result(path: models.TaskIdPath):
     if task.status.value != "completed":
         return models.BadRequestResponse(error="Task not completed").model_dump(), 400
 
-    result_data = task.result.model_dump() if isinstance(task.result, models.EtoroEvolutionResponse) else task.result
+    result_data = (
+        task.result.model_dump()
+        if isinstance(task.result, (models.EtoroEvolutionResponse, models.CompareToIndexResponse))
+        else task.result
+    )
 
     response = models.TaskResultResponse(result=result_data)
     return response.model_dump(), 200
@@ -4,10 +4,13 @@ from enum import Enum
 
 from flask_login import UserMixin
 from flask_openapi3 import FileStorage
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, PositiveInt
 
 from src.services import task_manager
 
+# Smallest point budget a time-series response can be downsampled to
+MIN_MAX_POINTS = 10
+
 
 class User(UserMixin):
     def __init__(self, id: int, email: str, profile_picture: str | None = None) -> None:
@@ -315,6 +318,8 @@ class SearchResponse(BaseModel):
 class CompareGrowthQuery(BaseModel):
     ticker_names: list[str]
     period: str = "ytd"
+    # Downsample the response to at most this many dates, keeping the extremes
+    max_points: int | None = Field(None, ge=MIN_MAX_POINTS)
 
 
 class CompareGrowthResponse(BaseModel):
@@ -338,6 +343,11 @@ class TickerQuery(BaseModel):
     # defaults to "auto"
     interval: str | None = None
     period: str = "ytd"  # FIXME: this is not specific enough
+    # Windows (in days) of the moving averages to compute
+    smas: list[PositiveInt] = Field([30, 100], max_length=10)
+    emas: list[PositiveInt] = Field([], max_length=10)
+    # Downsample the response to at most this many candles, keeping the extremes
+    max_points: int | None = Field(None, ge=MIN_MAX_POINTS)
 
 
 class TickerResponse(BaseModel):
@@ -347,6 +357,25 @@ class TickerResponse(BaseModel):
     delta: float
     # Point size sma
     smas: dict[int, list[float]]
+    emas: dict[int, list[float]] = {}
+
+
+class TickersQuery(BaseModel):
+    # Comma separated list accepted
+    ticker_names: list[str]
+    # Shared by every ticker, defaults to "auto"
+    interval: str | None = None
+    period: str = "ytd"
+    smas: list[PositiveInt] = Field([30, 100], max_length=10)
+    emas: list[PositiveInt] = Field([], max_length=10)
+    max_points: int | None = Field(None, ge=MIN_MAX_POINTS)
+
+
+class TickersResponse(BaseModel):
+    query: TickersQuery
+    tickers: dict[str, TickerResponse]
+    # Error message of every ticker that could not be loaded
+    errors: dict[str, str]
 
 
 class NotFoundResponse(BaseModel):
@@ -360,6 +389,14 @@ class BadRequestResponse(BaseModel):
     error: str
 
 
+#############
+#  METRICS  #
+#############
+class MetricsResponse(BaseModel):
+    # Counters per component, e.g. {"upstream_history": {"calls": 10, "coalesced": 7, ...}}
+    counters: dict[str, dict[str, int]]
+
+
 #########################
 #  HISTORICALKPI QUERY  #
 #########################
@@ -409,12 +446,20 @@ class EtoroTradeCountQuery(BaseModel):
 
 class EtoroEvolutionQuery(BaseModel):
     filename: str
+    # Downsample the evolution to at most this many dates, keeping the extremes of the totals
+    max_points: int | None = Field(None, ge=MIN_MAX_POINTS)
 
 
 class EtoroReportsResponse(BaseModel):
     reports: list[str]
 
 
+class EtoroUploadResponse(BaseModel):
+    result: str = "OK"
+    # Task preparing the analyses of the statement, see ``etoro_data.ingest_statement``
+    task_id: str
+
+
 class EtoroEvolutionInner(BaseModel):
     parts: dict[str, list[float]]
     dates: list[str]
@@ -519,12 +564,17 @@ def task_progress_to_response(progress: task_manager.TaskProgress | None) -> Tas
     )
 
 
+# S&P 500, NASDAQ-100 and MSCI World (iShares MSCI World ETF)
+DEFAULT_INDEX_TICKERS = ["^GSPC", "^NDX", "URTH"]
+
+
 class CompareToIndexQuery(BaseModel):
     filename: str
-    index_ticker: str
+    index_tickers: list[str] = Field(DEFAULT_INDEX_TICKERS, min_length=1, max_length=10)
 
 
 class CompareToIndexResponse(BaseModel):
     query: CompareToIndexQuery
     dates: list[str]
-    index_values: list[float]
+    # Daily value of the deposits invested in each index, by index ticker
+    index_values: dict[str, list[float]]
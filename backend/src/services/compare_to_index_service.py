@@ -1,81 +1,88 @@
+from collections.abc import Callable
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-import yfinance as yf
 
+from src.database import stocks_repository
+from src.models import CompareToIndexQuery, CompareToIndexResponse
 from src.services import etoro_data
+from src.services.task_manager import TaskProgress, task_manager
 
 
 class CompareToIndexService:
     @staticmethod
-    def extract_etoro_data(file_path: Path) -> tuple[list[str], list[float]]:
-        """Extract portfolio evolution dates and deposits from eToro report."""
-        evolution = etoro_data.extract_portfolio_evolution(file_path, lambda _progress: None)
-        dates = evolution.dates
+    def get_deposits(
+        file_path: Path, progress_callback: Callable[[TaskProgress], None]
+    ) -> tuple[list[str], np.ndarray]:
+        """Return the portfolio evolution dates and cumulative deposits of the eToro report.
+
+        The evolution stored for the report is used when no bar arrived since it was valued, else it is extended.
+        """
+        evolution = etoro_data.stored_portfolio_evolution(file_path)
+        if evolution is None:
+            evolution = etoro_data.extract_portfolio_evolution(file_path, progress_callback)
         deposits = evolution.parts.get("Deposits")
         if not deposits:
             msg = "No deposit data found"
             raise ValueError(msg)
-        return dates, deposits
+        return evolution.dates, np.asarray(deposits, dtype=np.float64)
+
+    @staticmethod
+    def get_index_prices(index_tickers: list[str], dates: list[str]) -> dict[str, np.ndarray]:
+        """Return the close of every index with data on each of ``dates``, carried over the days without one."""
+        histories = stocks_repository.get_tickers_history_from_start(index_tickers, dates[0], "1d")
+        prices = {}
+        for index_ticker in index_tickers:
+            history = histories.get(index_ticker)
+            if history is None or history.empty:
+                print(f"No index data found for {index_ticker}")
+                continue
+            closes = pd.Series(history["Close"].to_numpy(), index=history["Date"].dt.strftime("%Y-%m-%d"))
+            closes = closes.groupby(closes.index).last()
+            prices[index_ticker] = closes.reindex(dates).ffill().bfill().to_numpy(dtype=np.float64)
+        return prices
 
     @staticmethod
-    def get_index_prices(index_ticker: str, dates: list[str]) -> pd.Series:
-        # yfinance end is exclusive; extend by one day to cover the last date
-        index_data = yf.download(
-            index_ticker, start=dates[0], end=pd.to_datetime(dates[-1]) + pd.Timedelta(days=1)
-        )
-        if getattr(index_data, "empty", True):
+    def simulate_index_investment(deposits: np.ndarray, index_prices: np.ndarray) -> np.ndarray:
+        """Return the daily value of the deposits invested in the index on their day, withdrawals being ignored."""
+        daily_deposits = np.clip(np.diff(deposits, prepend=0.0), 0.0, None)
+        units = np.cumsum(daily_deposits / index_prices)
+        return units * index_prices
+
+    @staticmethod
+    def compare(
+        query: CompareToIndexQuery, file_path: Path, progress_callback: Callable[[TaskProgress], None]
+    ) -> CompareToIndexResponse:
+        total_steps = 2
+
+        def evolution_progress(progress: TaskProgress) -> None:
+            progress_callback(TaskProgress("Computing portfolio evolution", 1, total_steps, progress))
+
+        progress_callback(TaskProgress("Computing portfolio evolution", 1, total_steps))
+        dates, deposits = CompareToIndexService.get_deposits(file_path, evolution_progress)
+
+        progress_callback(TaskProgress("Simulating index investments", 2, total_steps))
+        index_prices = CompareToIndexService.get_index_prices(query.index_tickers, dates)
+        if not index_prices:
             msg = "No index data found"
             raise ValueError(msg)
-        if isinstance(index_data, pd.Series):
-            index_prices = index_data
-        elif isinstance(index_data, pd.DataFrame):
-            cols = index_data.columns
-            if isinstance(cols, pd.MultiIndex):
-                try:
-                    sub = index_data.xs("Adj Close", axis=1, level=0)
-                except Exception:
-                    try:
-                        sub = index_data.xs("Close", axis=1, level=0)
-                    except Exception as e:
-                        msg = "No close price column in index data (multiindex)"
-                        raise ValueError(msg) from e
-                index_prices = sub.iloc[:, 0] if isinstance(sub, pd.DataFrame) else sub
-            else:
-                price_col = None
-                for col in ["Adj Close", "Close", "adjclose", "close", "AdjClose"]:
-                    if col in cols:
-                        price_col = col
-                        break
-                if price_col is None:
-                    msg = "No close price column in index data"
-                    raise ValueError(msg)
-                index_prices = index_data[price_col]
-        else:
-            msg = "Unexpected index data format"
-            raise TypeError(msg)
-        index_prices = pd.to_numeric(index_prices, errors="coerce")
-        index_prices.index = pd.to_datetime(index_prices.index).tz_localize(None).strftime("%Y-%m-%d")
-        index_prices = index_prices.groupby(index_prices.index).last()
-        return index_prices.reindex(dates).ffill().bfill()
+        index_values = {
+            index_ticker: CompareToIndexService.simulate_index_investment(deposits, prices).tolist()
+            for index_ticker, prices in index_prices.items()
+        }
+        return CompareToIndexResponse(query=query, dates=dates, index_values=index_values)
 
     @staticmethod
-    def simulate_index_investment(
-        dates: list[str], deposits: list[float], index_prices: pd.Series
-    ) -> list[float]:
-        units = 0.0
-        units_history = []
-        daily_deposits = [max(0.0, float(deposits[0]))]
-        for i in range(1, len(deposits)):
-            daily = float(deposits[i]) - float(deposits[i - 1])
-            daily_deposits.append(max(0.0, daily))
-        for i, date in enumerate(dates):
-            deposit = daily_deposits[i]
-            price = float(index_prices.loc[date]) if date in index_prices.index else None
-            if price and deposit > 0:
-                units += deposit / price
-            units_history.append(units)
-        return [
-            float(u) * float(index_prices.loc[date]) if date in index_prices.index else 0.0
-            for u, date in zip(units_history, dates, strict=False)
-        ]
+    def compare_async(query: CompareToIndexQuery, file_path: Path) -> str:
+        """Start the comparison of the eToro report to the indexes and return the task ID."""
+        task_id = task_manager.create_task()
+
+        def _run_comparison(task_id: str) -> CompareToIndexResponse:
+            def progress_callback(new_progress: TaskProgress) -> None:
+                task_manager.update_progress(task_id, new_progress)
+
+            return CompareToIndexService.compare(query, file_path, progress_callback)
+
+        task_manager.run_task(task_id, _run_comparison)
+        return task_id
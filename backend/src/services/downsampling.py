@@ -0,0 +1,41 @@
+"""Point-budget downsampling of time series sharing the same dates.
+
+Min/max bucketing: the points are split into equal buckets and, in each bucket, the points
+holding the minimum and the maximum of every series are kept, along with the first and last
+points. Spikes and drops stay visible however long the history is.
+"""
+
+import numpy as np
+
+
+def downsample_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Return the sorted indices of the points to keep, at most ``max_points`` of them.
+
+    ``values`` has one row per series and one column per point.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n_series, n_points = values.shape
+    if n_points <= max_points:
+        return np.arange(n_points)
+
+    # Every bucket keeps up to two points per series, the first and last points are always kept
+    n_buckets = max(1, (max_points - 2) // (2 * n_series))
+    bucket_size = -(-n_points // n_buckets)
+    n_buckets = -(-n_points // bucket_size)
+    padded = np.full((n_series, n_buckets * bucket_size), np.nan)
+    padded[:, :n_points] = values
+    buckets = padded.reshape(n_series, n_buckets, bucket_size)
+
+    offsets = np.arange(n_buckets)[None, :] * bucket_size
+    lows = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=2) + offsets
+    highs = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=2) + offsets
+    kept = np.unique(np.concatenate([[0, n_points - 1], lows.ravel(), highs.ravel()]))
+    kept = kept[kept < n_points]
+    if len(kept) > max_points:
+        # More series than the budget can hold extremes for
+        kept = kept[np.linspace(0, len(kept) - 1, max_points).round().astype(np.int64)]
+    return kept
+
+
+def take(items: list, indices: np.ndarray) -> list:
+    return np.asarray(items)[indices].tolist()
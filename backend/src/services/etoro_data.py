@@ -3,58 +3,74 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import yfinance_cache as yfc
 
 from src import models
+from src.database import stocks_repository
+from src.database.evolution_store import EvolutionCheckpoint, EvolutionResult, activity_hashes, evolution_store
+from src.database.statement_store import file_digest, statement_store
+from src.services import fx_rates, history_planner
+from src.services.holdings import build_holdings, parse_splits
 from src.services.task_manager import TaskProgress
 
+# Account activity rows changing the units held
+POSITION_TYPES = ["Open Position", "Position closed"]
+# Version of the evolution computation, evolutions saved by other versions are recomputed
+EVOLUTION_VERSION = 1
+# Days of FX rates loaded before the start of an extended evolution, to convert its first prices
+FX_LOOKBACK = pd.Timedelta(days=10)
+# Evolution parts following the instrument ones
+SUMMARY_COLUMNS = ["Closed Positions", "Total", "Deposits", "P&L"]
 
-def column_date_to_timestamp(column: pd.Series) -> pd.Series:
-    return pd.to_datetime(column, format="%d/%m/%Y %H:%M:%S")
 
-
-def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[str | None, float]:
+def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[str | None, str, float]:
     """Map eToro ticker details to Yahoo Finance ticker symbol.
 
     Returns:
-        tuple: (yahoo_ticker, scale_factor) or (None, 1) if unsupported
+        tuple: (yahoo_ticker, currency, scale_factor) or (None, currency, scale_factor) if unsupported.
+        Yahoo Finance prices times the scale factor are in the currency.
     """
     [ticker, market] = details.split("/")
     ticker = ticker.removesuffix(".US").removesuffix(".EXT")
-    scale = 1
+    currency = "USD"
+    scale = 1.0
 
     if is_crypto:
-        return f"{ticker}-{market}", scale
+        return f"{ticker}-{market}", currency, scale
     if ticker == "BRK.B":
         return (
             "BRK-B",
+            currency,
             scale,
         )
     if ticker == "NSDQ100":
         return (
             "^NDX",
+            currency,
             scale,
         )
     if ticker == "SPX500":
         return (
             "^SPX",
+            currency,
             scale,
         )
     # MHFI (McGraw Hill Financial) changed its ticker to SPGI (S&P Global Inc.) after a corporate rebranding.
     if ticker == "MHFI":
         return (
             "SPGI",
+            currency,
             scale,
         )
     if market != "USD":
         if market == "GBX":
-            scale = yfc.Ticker("GBPUSD=X").fast_info["lastPrice"] / 100
+            currency = "GBP"
+            # Prices are in pence
+            scale = 0.01
             match ticker:
                 case "BT.l":
                     ticker = "BT-A.L"
         elif market == "EUR":
-            scale = yfc.Ticker("EURUSD=X").fast_info["lastPrice"]
+            currency = "EUR"
             match ticker:
                 case "ACA" | "BNP" | "ENGI":
                     ticker += ".PA"
@@ -139,13 +155,14 @@ def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[s
                 case _:
                     return (
                         None,
+                        currency,
                         scale,
                     )
         elif market == "HKD":
-            scale = yfc.Ticker("HKDUSD=X").fast_info["lastPrice"]
+            currency = "HKD"
             ticker = ticker[-7:]  # remove eToro's prefix
         elif market == "SEK":
-            scale = yfc.Ticker("SEKUSD=X").fast_info["lastPrice"]
+            currency = "SEK"
             match ticker:
                 case "NDA_SE.ST":
                     ticker = "0N4T.IL"  # Nordea Bank via LSE
@@ -154,10 +171,11 @@ def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[s
                 case _:
                     return (
                         None,
+                        currency,
                         scale,
                     )
         elif market == "CHF":
-            scale = yfc.Ticker("CHFUSD=X").fast_info["lastPrice"]
+            currency = "CHF"
             match ticker:
                 case "BAER":
                     ticker = "BAER.SW"
@@ -165,14 +183,15 @@ def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[s
                     ticker = "CLN.SW"
                 case "USD":
                     ticker = "CHFUSD=X"
-                    scale = 1
+                    currency = "USD"
                 case _:
                     return (
                         None,
+                        currency,
                         scale,
                     )
         elif market == "AUD":
-            scale = yfc.Ticker("AUDUSD=X").fast_info["lastPrice"]
+            currency = "AUD"
             match ticker:
                 case "CLW.ASX":
                     ticker = "CLW.AX"
@@ -181,10 +200,11 @@ def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[s
                 case _:
                     return (
                         None,
+                        currency,
                         scale,
                     )
         elif market == "NOK":
-            scale = yfc.Ticker("NOKUSD=X").fast_info["lastPrice"]
+            currency = "NOK"
             match ticker:
                 case "NAS":
                     ticker = "NAS.OL"
@@ -195,10 +215,11 @@ def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[s
                 case _:
                     return (
                         None,
+                        currency,
                         scale,
                     )
         elif market == "DKK":
-            scale = yfc.Ticker("DKKUSD=X").fast_info["lastPrice"]
+            currency = "DKK"
             match ticker:
                 case "ISS":
                     ticker = "ISS.CO"
@@ -207,48 +228,122 @@ def _map_etoro_ticker_to_yahoo(details: str, is_crypto: bool = False) -> tuple[s
                 case _:
                     return (
                         None,
+                        currency,
                         scale,
                     )
         elif market == "JPY":
-            scale = yfc.Ticker("JPYUSD=X").fast_info["lastPrice"]
+            currency = "JPY"
             # No JPY tickers in your list except CAD/USD placeholders
         elif market == "SGD":
-            scale = yfc.Ticker("SGDUSD=X").fast_info["lastPrice"]
+            currency = "SGD"
             if ticker == "USD":
                 ticker = "SGDUSD=X"
         else:
             return (
                 None,
+                currency,
                 scale,
             )
 
     return (
         ticker,
+        currency,
         scale,
     )
 
 
+def resolve_tickers(positions: pd.DataFrame) -> dict[str, dict]:
+    """Map the eToro instruments of the position activity (indexed by date) to their Yahoo Finance metadata.
+
+    Instruments without a Yahoo Finance equivalent are left out.
+    """
+    ticker_metadata = {}
+    for details, rows in positions.groupby("Details", sort=False):
+        is_crypto = rows["Asset type"].iloc[0] == "Crypto"
+        yahoo_ticker, currency, scale = _map_etoro_ticker_to_yahoo(str(details), is_crypto=is_crypto)
+        if yahoo_ticker is not None:
+            ticker_metadata[str(details)] = {
+                "yahoo_symbol": yahoo_ticker,
+                "currency": currency,
+                "scale": scale,
+                "is_crypto": is_crypto,
+                "first_open_date": rows.index.min(),
+            }
+    return ticker_metadata
+
+
+def _history_start(ticker_metadata: dict[str, dict]) -> str:
+    earliest_date = min(meta["first_open_date"] for meta in ticker_metadata.values())
+    return f"{earliest_date.year}-01-01"
+
+
+def _load_market_data(
+    ticker_metadata: dict[str, dict],
+    step: TaskProgress,
+    progress_callback: Callable[[TaskProgress], None],
+    since: pd.Timestamp | None = None,
+) -> tuple[dict[str, pd.DataFrame], dict[str, pd.Series]]:
+    """Load the daily history of every resolved ticker from its first open date, and the USD rates of their currencies.
+
+    With ``since``, histories are only loaded from that day. Returns the histories by upper-case
+    Yahoo Finance symbol, and the rates by currency. The loading of each symbol is reported as a
+    sub-task of ``step``.
+    """
+    if not ticker_metadata:
+        return {}, {}
+    starts: dict[str, pd.Timestamp] = {}
+    for meta in ticker_metadata.values():
+        symbol = meta["yahoo_symbol"]
+        start = meta["first_open_date"] if since is None else max(meta["first_open_date"], since)
+        starts[symbol] = min(starts.get(symbol, start), start)
+
+    def symbol_progress(symbol: str, loaded: int, count: int) -> None:
+        progress_callback(
+            TaskProgress(step.step_name, step.step_number, step.step_count, TaskProgress(symbol, loaded, count))
+        )
+
+    histories = history_planner.load_daily_histories(starts, symbol_progress)
+    rates_start = _history_start(ticker_metadata) if since is None else (since - FX_LOOKBACK).strftime("%Y-%m-%d")
+    usd_rates = fx_rates.get_usd_rates([meta["currency"] for meta in ticker_metadata.values()], rates_start)
+    return {symbol.upper(): history for symbol, history in histories.items()}, usd_rates
+
+
+def ingest_statement(etoro_statement_file: Path, progress_callback: Callable[[TaskProgress], None]) -> dict:
+    """Prepare the analyses of a freshly uploaded statement: parse it, resolve its tickers and prefetch their prices."""
+    total_steps = 3
+
+    progress_callback(TaskProgress("Reading statement", 1, total_steps))
+    statement = statement_store.load(etoro_statement_file)
+
+    progress_callback(TaskProgress("Resolving tickers", 2, total_steps))
+    activity = statement.account_activity.set_index("Date")
+    positions = activity[activity["Type"].isin(POSITION_TYPES)]
+    ticker_metadata = resolve_tickers(positions)
+
+    step = TaskProgress("Fetching market data", 3, total_steps)
+    progress_callback(step)
+    histories, usd_rates = _load_market_data(ticker_metadata, step, progress_callback)
+
+    return {
+        "digest": statement.digest,
+        "instruments": int(positions["Details"].nunique()),
+        "unresolved": sorted(set(positions["Details"].unique()) - set(ticker_metadata)),
+        "currencies": sorted(usd_rates),
+        "prefetched": len(histories) + len(usd_rates),
+    }
+
+
 def extract_closed_position(
     etoro_statement_file: Path, time_unit: str, progress_callback: Callable[[str, int, int], None]
 ) -> dict[str, list[str]]:
     """Extract closed positions with optional progress reporting."""
-    total_steps = 4
-
-    progress_callback("Reading Excel file", 1, total_steps)
+    total_steps = 3
 
-    excel = pd.read_excel(etoro_statement_file, sheet_name=None)
-    closed_positions_df = excel["Closed Positions"]
+    progress_callback("Reading statement", 1, total_steps)
 
-    progress_callback("Processing dates", 2, total_steps)
+    closed_positions_df = statement_store.load(etoro_statement_file).closed_positions
 
-    closed_positions_df["Close Date"] = column_date_to_timestamp(
-        closed_positions_df["Close Date"],
-    )
-    closed_positions_df["Open Date"] = column_date_to_timestamp(
-        closed_positions_df["Open Date"],
-    )
-
-    progress_callback("Calculating gains", 3, total_steps)
+    progress_callback("Calculating gains", 2, total_steps)
 
     gains_graphs_columns = {
         "Close Date": "close_date",
@@ -267,248 +362,203 @@ def extract_closed_position(
     gains["close_date"] = gains["close_date"].dt.to_timestamp()
     gains["close_date"] = gains["close_date"].dt.strftime("%Y-%m-%dT%H:%M:%S")
 
-    progress_callback("Finalizing results", 4, total_steps)
+    progress_callback("Finalizing results", 3, total_steps)
 
     return {column: gains[column].tolist() for column in gains.columns}
 
 
-def extract_portfolio_evolution(
-    etoro_statement_file: Path, progress_callback: Callable[[TaskProgress], None]
-) -> models.EtoroEvolutionInner:
-    """Extract portfolio evolution with optional progress reporting."""
-    total_steps = 6
-
-    progress_callback(TaskProgress("Reading Excel file", 1, total_steps))
-
-    excel = pd.read_excel(etoro_statement_file, sheet_name=None)
-
-    progress_callback(TaskProgress("Processing closed positions", 2, total_steps))
-
-    closed = excel["Closed Positions"]
-    closed["Close Date"] = column_date_to_timestamp(closed["Close Date"])
-    closed = closed.sort_values(by="Close Date")
-    closed = closed.set_index(closed["Close Date"])
-    closed["Profit(USD)"] = closed["Profit(USD)"].astype(np.float32)
-    closed = closed.resample("D").agg({"Profit(USD)": "sum"}).fillna(0)
-    closed["Cumulative Profit"] = closed["Profit(USD)"].cumsum()
+def _cumulative_closed_profit(closed_positions: pd.DataFrame) -> pd.Series:
+    # Stable, so that the same closed positions always sum to the same float32 profits
+    closed = closed_positions.sort_values(by="Close Date", kind="stable")
+    profits = closed["Profit(USD)"].astype(np.float32).set_axis(closed["Close Date"]).resample("D").sum()
+    return profits.cumsum().rename("Closed Positions")
 
-    progress_callback(TaskProgress("Processing open positions", 3, total_steps))
 
-    activity = excel["Account Activity"]
-    activity["Date"] = column_date_to_timestamp(activity["Date"])
-    activity = activity.set_index("Date")
-
-    # Extract and process stock splits
-    splits = activity[activity["Type"] == "corp action: Split"].copy()
-    if not splits.empty:
-        splits = splits.groupby(["Date", "Details"]).last()
-        # Extract split factor from Details column (format like "Split 10:1" or "NVDA/USD Split 10:1")
-        details_series = splits.index.get_level_values("Details")
-        split_factors = []
-        for detail in details_series:
-            parts = detail.split(" ")
-            if "Split" in parts:
-                split_idx = parts.index("Split")
-                if split_idx + 1 < len(parts):
-                    split_ratio = parts[split_idx + 1]  # '10:1'
-                    split_factor = float(split_ratio.split(":")[0])
-                    split_factors.append(split_factor)
-                else:
-                    split_factors.append(1.0)
-            else:
-                # Fallback: try original parsing for "Split 10:1" format
-                try:
-                    split_factor = float(parts[1].split(":")[0]) if len(parts) > 1 else 1.0
-                    split_factors.append(split_factor)
-                except (ValueError, IndexError):
-                    split_factors.append(1.0)
-
-        splits["Factor"] = split_factors
-        splits = splits.reset_index().set_index("Date")
-    else:
-        splits = pd.DataFrame(columns=["Details", "Factor"]).set_index(pd.DatetimeIndex([], name="Date"))
-
-    activity[activity["Type"] == "Open Position"]
-    closed_positions = activity[activity["Type"] == "Position closed"]
-    closed_positions["Position ID"].dropna().astype(str)
-    still_open = activity[activity["Type"].isin(["Open Position", "Position closed"])].copy()
-    still_open["Units / Contracts"] = still_open["Units / Contracts"].astype(np.float32)
-    still_open.loc[still_open["Type"] == "Position closed", "Units / Contracts"] = (
-        still_open.loc[still_open["Type"] == "Position closed", "Units / Contracts"] * -1
+def _cumulative_deposits(activity: pd.DataFrame, end: pd.Timestamp) -> pd.Series:
+    daily_deposits = activity[activity["Type"] == "Deposit"]["Amount"].astype(np.float32).resample("D").sum().fillna(0)
+    date_range = pd.date_range(start=daily_deposits.index.min(), end=end, freq="D")
+    return daily_deposits.cumsum().reindex(date_range).ffill().rename("Deposits")
+
+
+def _first_changed_day(
+    checkpoint: EvolutionCheckpoint | None,
+    activity: pd.DataFrame,
+    closed_profit: pd.Series,
+    splits: pd.DataFrame,
+) -> pd.Timestamp | None:
+    """Return the first day whose evolution may differ from the checkpoint one, None to recompute every day."""
+    if checkpoint is None or checkpoint.version != EVOLUTION_VERSION or checkpoint.frame.empty:
+        return None
+    frame = checkpoint.frame
+    # The last day was valued with the prices known at the time
+    first = pd.Timestamp(frame.index[-1])
+
+    # First account activity row that differs from the checkpoint statement
+    hashes = activity_hashes(activity)
+    common = min(len(hashes), len(checkpoint.activity_hashes))
+    differing = np.flatnonzero(hashes[:common] != checkpoint.activity_hashes[:common])
+    row = differing[0] if len(differing) else common
+    if row < len(hashes):
+        first = min(first, pd.Timestamp(activity["Date"].iloc[row]).floor("D"))
+    if row < len(checkpoint.activity_hashes):
+        first = min(first, pd.Timestamp(checkpoint.activity_dates[row]).floor("D"))
+
+    # Closed positions are listed apart, compare their cumulative profit
+    previous = frame.loc[frame.index < first, "Closed Positions"]
+    current = closed_profit.reindex(previous.index).ffill().fillna(0)
+    changed = previous.index[previous.to_numpy() != current.to_numpy()]
+    if len(changed):
+        first = min(first, changed[0])
+
+    # A new split changes the units held before it
+    if first <= frame.index[0] or (splits.index >= first).any():
+        return None
+    return first
+
+
+def _to_evolution(frame: pd.DataFrame) -> models.EtoroEvolutionInner:
+    return models.EtoroEvolutionInner(
+        dates=pd.DatetimeIndex(frame.index).strftime("%Y-%m-%d").to_list(),
+        parts={str(column): [float(x) for x in values] for column, values in frame.items()},
     )
 
-    shares_per_ticker = {}
-    for tick in still_open["Details"].unique():
-        _ticker_positions = still_open[still_open["Details"] == tick].copy()
-        _ticker_positions = _ticker_positions.sort_values(by="Date")
-        _ticker_positions["Units / Contracts"] = _ticker_positions["Units / Contracts"].astype(np.float32)
-        _ticker_positions = _ticker_positions.resample("D").agg({"Units / Contracts": "sum"}).fillna(0)
 
-        # Create date range for the ticker
-        date_range = pd.date_range(_ticker_positions.index.min(), pd.Timestamp.today())
-        _ticker_positions = _ticker_positions.reindex(date_range, fill_value=0)
-
-        # Apply split adjustments for this ticker
-        if not splits.empty:
-            ticker_splits = splits[splits["Details"].str.startswith(tick)].copy()
-            if not ticker_splits.empty:
-                # Create daily split factor series, starting with 1.0
-                split_factors_df = pd.Series(1.0, index=date_range, name="split_factor")
-
-                # Process splits in reverse chronological order to build cumulative factors
-                ticker_splits = ticker_splits.sort_index(ascending=False)
-
-                for split_date, split_row in ticker_splits.iterrows():
-                    split_factor = split_row["Factor"]
-                    # For dates before this split, multiply by the split factor to get equivalent post-split shares
-                    mask = split_factors_df.index < split_date
-                    split_factors_df.loc[mask] = split_factors_df.loc[mask] * split_factor
+def extract_portfolio_evolution(
+    etoro_statement_file: Path, progress_callback: Callable[[TaskProgress], None]
+) -> models.EtoroEvolutionInner:
+    """Extract portfolio evolution with optional progress reporting.
 
-                # Apply split adjustments to shares
-                _ticker_positions["split_factor"] = split_factors_df
-                _ticker_positions["Units / Contracts"] = (
-                    _ticker_positions["Units / Contracts"] * _ticker_positions["split_factor"]
-                )
+    When an earlier statement of the same account was analyzed from the same upload folder, only
+    the days from the first one that differs from it are recomputed, the previous days are reused. Statements without an
+    account only extend their own previous evolution. The result is stored with the date of the
+    last bar it was valued with, see ``stored_portfolio_evolution``.
+    """
+    total_steps = 6
 
-        # Calculate cumulative shares
-        _ticker_positions["shares_sum"] = _ticker_positions["Units / Contracts"].cumsum()
+    progress_callback(TaskProgress("Reading statement", 1, total_steps))
 
-        shares_per_ticker[tick] = _ticker_positions
+    statement = statement_store.load(etoro_statement_file)
+    end = pd.Timestamp.today()
 
-    progress_callback(TaskProgress("Fetching market data", 4, total_steps))
+    progress_callback(TaskProgress("Processing closed positions", 2, total_steps))
 
-    # Pre-process all tickers to get Yahoo Finance symbols and metadata
-    tickers_to_fetch = still_open["Details"].unique()
-    ticker_metadata = {}
-    yahoo_symbols = []
-    crypto_symbols = []
+    closed_profit = _cumulative_closed_profit(statement.closed_positions)
 
-    for _details in tickers_to_fetch:
-        first_open_date = still_open[still_open["Details"] == _details].index.min()
-        is_crypto = still_open.loc[still_open["Details"] == _details, "Asset type"].iloc[0] == "Crypto"
+    progress_callback(TaskProgress("Processing open positions", 3, total_steps))
 
-        yahoo_ticker, scale = _map_etoro_ticker_to_yahoo(_details, is_crypto=is_crypto)
+    activity = statement.account_activity.set_index("Date")
+    splits = parse_splits(activity[activity["Type"] == "corp action: Split"])
 
-        if yahoo_ticker is not None:
-            ticker_metadata[_details] = {
-                "yahoo_symbol": yahoo_ticker,
-                "scale": scale,
-                "is_crypto": is_crypto,
-                "first_open_date": first_open_date,
-            }
-            if is_crypto:
-                crypto_symbols.append(yahoo_ticker)
-            else:
-                yahoo_symbols.append(yahoo_ticker)
-
-    # Find the earliest start date across all tickers
-    if ticker_metadata:
-        earliest_date = min(meta["first_open_date"] for meta in ticker_metadata.values())
-        years_to_fetch = pd.Timestamp.now().year - earliest_date.year + 1
-        period = f"{years_to_fetch}y"
-
-        # Bulk fetch all non-crypto tickers at once using yf.Tickers()
-        bulk_histories = {}
-        if yahoo_symbols:
-            try:
-                # Use bulk fetch for non-crypto symbols with yfinance_cache
-                bulk_data = yf.Tickers(yahoo_symbols).history(period=period)
-                for symbol in yahoo_symbols:
-                    try:
-                        symbol = symbol.upper()
-                        symbol_data = bulk_data.xs(symbol, level=1, axis=1)
-                        bulk_histories[symbol] = symbol_data[["Close"]]
-                    except KeyError:
-                        # Symbol not found in bulk data
-                        print(f"Could not find {symbol} in bulk_data. Skipping.")
-                        continue
-            except Exception as e:
-                print(f"Bulk fetch failed, falling back to individual fetches: {e}")
-
-        # Fetch crypto symbols individually (they need different handling)
-        for symbol in crypto_symbols:
-            try:
-                ticker_data = yf.Ticker(symbol)
-                history = ticker_data.history(period=period)
-                if not history.empty:
-                    bulk_histories[symbol] = history[["Close"]]
-            except Exception as e:
-                print(f"Could not fetch crypto data for {symbol}: {e}")
-
-        # Process the bulk data to create yahoo_data with original eToro details as keys
-        yahoo_data = {}
-        for _details, metadata in ticker_metadata.items():
-            yahoo_symbol = metadata["yahoo_symbol"].upper()
-            scale = metadata["scale"]
-            first_open_date = metadata["first_open_date"]
-
-            if yahoo_symbol in bulk_histories:
-                history = bulk_histories[yahoo_symbol].copy()
-                # Filter to only include data from the ticker's first open date
-                # Ensure both dates are timezone-naive for proper comparison
-                history_index_naive = pd.to_datetime(history.index).tz_localize(None)
-                first_open_date_naive = (
-                    pd.to_datetime(first_open_date).tz_localize(None) if first_open_date.tz else first_open_date
-                )
-                history = history[history_index_naive >= first_open_date_naive]
-                if not history.empty:
-                    # Apply scaling
-                    history.loc[:, "Close"] = history.loc[:, "Close"] * scale
-                    yahoo_data[_details] = history
-                else:
-                    print(f"No data found for {yahoo_symbol} after filtering")
+    # Checkpoints are only shared by the statements of an account uploaded by the same user (upload folder)
+    checkpoint_key = (
+        statement.digest
+        if statement.account is None
+        else f"{etoro_statement_file.parent.resolve()}:{statement.account}"
+    )
+    checkpoint = evolution_store.load(checkpoint_key)
+    start = _first_changed_day(checkpoint, statement.account_activity, closed_profit, splits)
+    previous = None if start is None or checkpoint is None else checkpoint.frame[checkpoint.frame.index < start]
+    # Values on the eve of the recomputed days, carried over the following days without prices
+    seed = None if previous is None else previous.iloc[-1]
+
+    positions = activity[activity["Type"].isin(POSITION_TYPES)]
+    ticker_metadata = resolve_tickers(positions)
+    instruments = list(ticker_metadata)
+    # Instruments without market data are left out of the evolution
+    positions = positions[positions["Details"].isin(ticker_metadata.keys())]
+    holdings = build_holdings(positions, splits, end, start)
+    if seed is not None:
+        # Instruments neither held since the start nor valued on its eve stay at zero, their prices are not needed
+        held = dict(zip(holdings.instruments, np.any(holdings.shares != 0, axis=0), strict=True))
+        ticker_metadata = {
+            details: meta for details, meta in ticker_metadata.items() if held[details] or seed.get(details, 0) != 0
+        }
+
+    step = TaskProgress("Fetching market data", 4, total_steps)
+    progress_callback(step)
+
+    # Each ticker is fetched from its own first open date, only what the bar store misses goes upstream
+    bulk_histories, usd_rates = _load_market_data(ticker_metadata, step, progress_callback, since=start)
+    yahoo_data = {}
+    # Process the bulk data to create yahoo_data with original eToro details as keys
+    for _details, metadata in ticker_metadata.items():
+        yahoo_symbol = metadata["yahoo_symbol"].upper()
+        first_open_date = metadata["first_open_date"]
+
+        if yahoo_symbol in bulk_histories:
+            closes = bulk_histories[yahoo_symbol].set_index("Date")["Close"]
+            # Ensure both dates are timezone-naive for proper comparison
+            closes = closes.set_axis(pd.to_datetime(closes.index).tz_localize(None))
+            first_open_date_naive = (
+                pd.to_datetime(first_open_date).tz_localize(None) if first_open_date.tz else first_open_date
+            )
+            # Filter to only include data from the ticker's first open date
+            closes = closes[closes.index >= first_open_date_naive]
+            if not closes.empty:
+                closes = closes * metadata["scale"]
+                if metadata["currency"] != "USD":
+                    closes = fx_rates.to_usd(closes, usd_rates[metadata["currency"]])
+                yahoo_data[_details] = closes
             else:
-                print(f"No data found for {yahoo_symbol}")
-    else:
-        yahoo_data = {}
+                print(f"No data found for {yahoo_symbol} after filtering")
+        else:
+            print(f"No data found for {yahoo_symbol}")
 
     progress_callback(TaskProgress("Combining portfolio data", 5, total_steps))
 
-    all_combined_data = {}
-    for _ticker_name, _ticker in shares_per_ticker.items():
-        if _ticker_name in yahoo_data:
-            _yahoo_data = yahoo_data[_ticker_name]
-            _ticker.index = pd.to_datetime(_ticker.index).tz_localize(None)
-            _yahoo_data.index = pd.to_datetime(_yahoo_data.index).tz_localize(None)
-            combined = _ticker.join(_yahoo_data, how="left")
-            combined["net_value"] = combined["Close"] * combined["shares_sum"]
-            all_combined_data[_ticker_name] = combined
-
-    all_combined_data_filled = {}
-    for _stock, _df in all_combined_data.items():
-        all_combined_data_filled[_stock] = _df.ffill()
+    # Net value of every instrument: daily close times the shares held, carried over the days without a close
+    shares = holdings.frame()
+    net_values = {details: closes.reindex(holdings.dates) * shares[details] for details, closes in yahoo_data.items()}
 
     progress_callback(TaskProgress("Finalizing evolution", 6, total_steps))
 
-    _all_data = pd.DataFrame()
-    all_profits = dict(all_combined_data_filled)
-    all_profits["Closed Positions"] = closed.rename(columns={"Cumulative Profit": "net_value"})
-    for _stock, _df in all_profits.items():
-        _all_data = _all_data.join(
-            _df[["net_value"]].rename(columns={"net_value": _stock}),
-            how="outer",
-        )
-    daily_deposits = activity[activity["Type"] == "Deposit"]["Amount"].astype(np.float32).resample("D").sum().fillna(0)
-    cumulative_deposits = daily_deposits.cumsum()
-    start_date = daily_deposits.index.min()
-    end_date = pd.Timestamp.today()
-    date_range = pd.date_range(start=start_date, end=end_date, freq="D")
-    cumulative_deposits = cumulative_deposits.reindex(date_range).ffill()
-
+    _all_data = pd.DataFrame(net_values, index=holdings.dates).join(closed_profit, how="outer")
+    if seed is not None:
+        # Previous instruments missing from the recomputed ones keep their value on the eve of the start
+        missing = [column for column in seed.index if column in instruments and column not in _all_data]
+        _all_data = _all_data.reindex(columns=[*_all_data.columns, *missing])
+        _all_data = _all_data[_all_data.index >= start].ffill().fillna(seed)
     _all_data = _all_data.ffill().fillna(0)
-    _all_data["total"] = _all_data.loc[:, ~_all_data.columns.str.contains("Closed Positions")].sum(axis=1)
-    _all_data = _all_data.join(cumulative_deposits, how="outer")
-    _all_data.index = pd.to_datetime(_all_data.index).strftime("%Y-%m-%d")
-    _all_data = _all_data.rename(columns={"Amount": "Deposits", "total": "Total"})
-
+    _all_data["Total"] = _all_data.drop(columns="Closed Positions").sum(axis=1)
+    _all_data = _all_data.join(_cumulative_deposits(activity, end), how="outer")
     _all_data["P&L"] = _all_data["Total"] - _all_data["Deposits"]
     _all_data = _all_data.fillna(0)
-
-    parts = {
-        str(k): [float(x) for x in v]
-        for k, v in _all_data.reset_index().drop(columns=["index"]).to_dict("list").items()
-    }
-    return models.EtoroEvolutionInner(
-        dates=_all_data.index.astype(str).to_list(),
-        parts=parts,
+    if previous is not None:
+        _all_data = pd.concat([previous, _all_data[_all_data.index >= start]]).fillna(0)
+    _all_data = _all_data[[column for column in instruments if column in _all_data] + SUMMARY_COLUMNS]
+
+    evolution_store.save(
+        checkpoint_key,
+        EvolutionCheckpoint(
+            frame=_all_data,
+            activity_hashes=activity_hashes(statement.account_activity),
+            activity_dates=statement.account_activity["Date"].to_numpy(),
+            version=EVOLUTION_VERSION,
+        ),
+    )
+    evolution = _to_evolution(_all_data)
+    symbols = sorted({metadata["yahoo_symbol"] for metadata in ticker_metadata.values()})
+    evolution_store.save_result(
+        statement.digest,
+        EvolutionResult(
+            evolution=evolution.model_dump(),
+            symbols=symbols,
+            market_date=stocks_repository.get_last_bar_date(symbols),
+            version=EVOLUTION_VERSION,
+        ),
     )
+    return evolution
+
+
+def stored_portfolio_evolution(etoro_statement_file: Path) -> models.EtoroEvolutionInner | None:
+    """Return the stored evolution of the statement if no bar arrived since it was valued, else None.
+
+    Stale tails of the symbols it was valued with are refreshed first, results of another version
+    of the computation or valued without market data are never served.
+    """
+    stored = evolution_store.load_result(file_digest(etoro_statement_file))
+    if stored is None or stored.version != EVOLUTION_VERSION or stored.market_date is None:
+        return None
+    if stocks_repository.get_last_bar_date(stored.symbols) != stored.market_date:
+        return None
+    return models.EtoroEvolutionInner.model_validate(stored.evolution)
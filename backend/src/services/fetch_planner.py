@@ -0,0 +1,130 @@
+"""Fetch planning for ticker charts.
+
+A chart needs candles over a window, daily closes reaching far enough back to warm up the SMAs
+and, for ``period=max``, the first trade date. Instead of fetching each of them separately, the
+planner works out the base series covering all of them (usually a single daily series spanning
+the SMA warm-up plus the window), loads each base series once through the repository (and so
+through the local bar store) and derives everything else from it.
+"""
+
+import datetime as dt
+import math
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from src.database import stocks_repository
+
+from .intervals import duration_to_interval, interval_to_duration, now
+
+# Number of candles targeted when the interval is "auto"
+N_POINTS = 20
+
+
+@dataclass
+class TickerPlan:
+    # First candle, None to start at the first trade
+    window_start: pd.Timestamp | None
+    # Candle interval, None until the first trade date is known ("auto" interval with period=max)
+    interval: str | None
+    # Start of the daily base series, None for the full history
+    daily_start: pd.Timestamp | None
+
+
+@dataclass
+class TickerSeries:
+    interval: str
+    candles: pd.DataFrame
+    daily: pd.DataFrame
+
+
+def sma_warmup(max_window: int) -> dt.timedelta:
+    """Calendar days holding ``max_window`` trading days, with some slack for holidays."""
+    return dt.timedelta(days=math.ceil(max_window * 7 / 5) + 10)
+
+
+def date_column(history: pd.DataFrame) -> str:
+    return "Datetime" if "Datetime" in history else "Date"
+
+
+def _naive(moment: pd.Timestamp) -> pd.Timestamp:
+    return moment.tz_localize(None) if moment.tzinfo is not None else moment
+
+
+def plan_ticker(period: str, interval: str | None, sma_windows: list[int]) -> TickerPlan:
+    requested_interval = None if interval in (None, "auto") else interval
+    if period == "max":
+        # The full daily history gives the first trade date and warms up the SMAs at once
+        return TickerPlan(window_start=None, interval=requested_interval, daily_start=None)
+
+    duration = interval_to_duration(period)
+    window_start = pd.Timestamp(_naive(pd.Timestamp(now() - duration)).date())
+    return TickerPlan(
+        window_start=window_start,
+        interval=requested_interval or duration_to_interval(duration / N_POINTS),
+        daily_start=window_start - sma_warmup(max(sma_windows, default=0)),
+    )
+
+
+@dataclass
+class SeriesLoader:
+    """Load each base series of a ticker at most once, serving narrower requests from it."""
+
+    ticker_name: str
+    _loaded: dict[str, tuple[pd.Timestamp | None, pd.DataFrame]] = field(default_factory=dict)
+
+    def get(self, interval: str, start: pd.Timestamp | None) -> pd.DataFrame:
+        loaded = self._loaded.get(interval)
+        if loaded is None or (loaded[0] is not None and (start is None or start < loaded[0])):
+            if start is None:
+                history = stocks_repository.get_ticker_history(self.ticker_name, "max", interval)
+            else:
+                history = stocks_repository.get_ticker_history_from_start(
+                    self.ticker_name, start.strftime("%Y-%m-%d"), interval
+                )
+            self._loaded[interval] = (start, history)
+        else:
+            history = loaded[1]
+        if start is None or history.empty:
+            return history
+        dates = history[date_column(history)]
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        return history[dates >= start].reset_index(drop=True)
+
+
+def prefetch_ticker_series(ticker_names: list[str], period: str, interval: str | None, sma_windows: list[int]) -> None:
+    """Warm the bar store for several charts sharing a period and interval, with one bulk fetch per base series."""
+    plan = plan_ticker(period, interval, sma_windows)
+    stocks_repository.prefetch_history(ticker_names, "1d", plan.daily_start)
+    if plan.interval is not None and plan.interval != "1d":
+        stocks_repository.prefetch_history(ticker_names, plan.interval, plan.window_start)
+
+
+def load_ticker_series(
+    ticker_name: str, period: str, interval: str | None, sma_windows: list[int]
+) -> TickerSeries | None:
+    """Load the candles and daily closes of a chart with as few base series as possible."""
+    plan = plan_ticker(period, interval, sma_windows)
+    loader = SeriesLoader(ticker_name)
+    daily = loader.get("1d", plan.daily_start)
+
+    window_start = plan.window_start
+    candle_interval = plan.interval
+    if window_start is None and candle_interval is None:
+        if daily.empty:
+            return None
+        duration = now().replace(tzinfo=None) - daily["Date"].iloc[0].to_pydatetime()
+        candle_interval = duration_to_interval(duration / N_POINTS)
+    assert candle_interval is not None
+
+    candles = loader.get(candle_interval, window_start)
+    if candles.empty and window_start is not None:
+        # Nothing traded in the window (e.g. delisted ticker): fall back to the full history
+        candles = loader.get(candle_interval, None)
+        if not candles.empty:
+            first_candle = _naive(candles[date_column(candles)].iloc[0])
+            daily = loader.get("1d", first_candle - sma_warmup(max(sma_windows, default=0)))
+    if candles.empty:
+        return None
+    return TickerSeries(interval=candle_interval, candles=candles, daily=daily)
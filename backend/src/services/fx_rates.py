@@ -0,0 +1,50 @@
+"""Daily USD exchange rates of the currencies that positions are priced in.
+
+The daily history of each currency pair ("EURUSD=X") is fetched once, with one bulk request for
+all the pairs, and kept in the local bar store like any other symbol, so later conversions only
+read it. Prices are converted with the rate of their own date rather than with today's rate.
+"""
+
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.database import stocks_repository
+
+
+def fx_symbol(currency: str, to_currency: str = "USD") -> str:
+    return f"{currency}{to_currency}=X"
+
+
+def get_usd_rates(currencies: Iterable[str], start: str) -> dict[str, pd.Series]:
+    """Return the daily USD rates of the non-USD ``currencies`` since ``start``, indexed by naive date.
+
+    Currencies without a rate history fall back on their latest rate.
+    """
+    pairs = {fx_symbol(currency): currency for currency in set(currencies) - {"USD"}}
+    histories = {}
+    if pairs:
+        try:
+            histories = stocks_repository.get_tickers_history_from_start(list(pairs), start, "1d")
+        except Exception as e:
+            print(f"FX history fetch failed: {e}")
+
+    rates = {}
+    for symbol, currency in pairs.items():
+        history = histories.get(symbol)
+        if history is not None:
+            history = history.dropna(subset=["Close"])
+        if history is None or history.empty:
+            print(f"No FX history for {currency}, using the latest rate")
+            rates[currency] = pd.Series([stocks_repository.get_fx_rate(currency)], index=pd.DatetimeIndex([start]))
+        else:
+            dates = pd.DatetimeIndex(history["Date"]).tz_localize(None)
+            rates[currency] = pd.Series(history["Close"].to_numpy(), index=dates).sort_index()
+    return rates
+
+
+def to_usd(prices: pd.Series, rates: pd.Series) -> pd.Series:
+    """Convert prices (indexed by naive date) with the rate of their date, or else the last rate before it."""
+    positions = np.searchsorted(rates.index.to_numpy(), prices.index.to_numpy(), side="right") - 1
+    return prices * rates.to_numpy()[np.clip(positions, 0, None)]
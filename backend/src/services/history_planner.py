@@ -0,0 +1,69 @@
+"""Fetch planning for the daily histories of many symbols, each needed from its own start.
+
+Instead of fetching every symbol from the earliest start of them all, symbols are sorted by start
+and grouped while their starts stay within ``GROUP_SPAN`` of the group's first one. Each group is
+loaded through the repository (so only what the bar store misses goes upstream, in one bulk
+request per group) from its earliest start. The groups are loaded concurrently, the provider
+serializes the bulk requests that cannot run concurrently.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.database import stocks_repository
+
+# Symbols starting within this span of each other are fetched together
+GROUP_SPAN = pd.Timedelta(days=92)
+MAX_GROUP_SIZE = 40
+FETCH_WORKERS = 4
+
+
+@dataclass
+class FetchGroup:
+    start: pd.Timestamp
+    symbols: list[str]
+
+
+def plan_groups(starts: dict[str, pd.Timestamp]) -> list[FetchGroup]:
+    """Group the symbols with close history starts, each group starting at the day of its earliest start."""
+    groups: list[FetchGroup] = []
+    for symbol, start in sorted(starts.items(), key=lambda item: item[1]):
+        day = start.normalize()
+        if not groups or day - groups[-1].start > GROUP_SPAN or len(groups[-1].symbols) >= MAX_GROUP_SIZE:
+            groups.append(FetchGroup(day, []))
+        groups[-1].symbols.append(symbol)
+    return groups
+
+
+def load_daily_histories(
+    starts: dict[str, pd.Timestamp], progress_callback: Callable[[str, int, int], None] | None = None
+) -> dict[str, pd.DataFrame]:
+    """Return the daily history of every symbol that has data, from the group start of the symbol.
+
+    ``progress_callback`` is called with each loaded symbol, the number of symbols loaded so far
+    and the number of symbols.
+    """
+    groups = plan_groups(starts)
+    histories: dict[str, pd.DataFrame] = {}
+    loaded = 0
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {
+            pool.submit(
+                stocks_repository.get_tickers_history_from_start, group.symbols, group.start.strftime("%Y-%m-%d"), "1d"
+            ): group
+            for group in groups
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                histories.update(future.result())
+            except Exception as e:
+                print(f"Fetching the history of {', '.join(group.symbols)} failed: {e}")
+            for symbol in group.symbols:
+                loaded += 1
+                if progress_callback is not None:
+                    progress_callback(symbol, loaded, len(starts))
+    return histories
@@ -0,0 +1,90 @@
+"""Daily holdings of an eToro statement, as one date by instrument matrix of shares.
+
+The position activity is summed per day and instrument with a single groupby, spread over a
+daily calendar, split-adjusted and accumulated with one cumsum over the whole matrix, instead of
+filtering, resampling and reindexing the activity once per instrument. The split factor of every
+activity day is looked up with ``searchsorted`` in the reverse cumulative product of the
+instrument splits, so the adjustment is linear in days plus splits. Holdings can start at any
+day, carrying in the units traded before it, to extend a previous evolution.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# "NVDA/USD Split 10:1": the split ratio follows the "Split" word
+SPLIT_RATIO = r"(?:^| )Split ([^ :]+)"
+
+
+@dataclass
+class Holdings:
+    # Row dates, every day at midnight from the first position activity to the end date
+    dates: pd.DatetimeIndex
+    # Column instruments (eToro "Details"), in order of first activity
+    instruments: list[str]
+    # Split-adjusted units held at the end of each day, one row per date and one column per instrument
+    shares: np.ndarray
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.shares, index=self.dates, columns=self.instruments)
+
+
+def parse_splits(split_activity: pd.DataFrame) -> pd.DataFrame:
+    """Return the "Details" and split "Factor" of the split activity rows (indexed by date).
+
+    Factors are read from details like "NVDA/USD Split 10:1" or "Split 10:1", and default to 1.
+    """
+    splits = split_activity.reset_index().drop_duplicates(["Date", "Details"], keep="last")
+    details = splits["Details"].astype(str)
+    ratio = pd.to_numeric(details.str.extract(SPLIT_RATIO, expand=False), errors="coerce")
+    fallback = pd.to_numeric(details.str.split(" ").str[1].str.split(":").str[0], errors="coerce")
+    factors = ratio.fillna(fallback).fillna(1.0).astype(np.float64)
+    return pd.DataFrame(
+        {"Details": details.to_numpy(), "Factor": factors.to_numpy()}, index=pd.DatetimeIndex(splits["Date"])
+    )
+
+
+def build_holdings(
+    positions: pd.DataFrame, splits: pd.DataFrame, end: pd.Timestamp, start: pd.Timestamp | None = None
+) -> Holdings:
+    """Build the daily holdings of the position activity (indexed by date) from ``start`` up to ``end``.
+
+    ``positions`` holds "Open Position" and "Position closed" rows with their "Details" and
+    "Units / Contracts". ``splits`` holds the split "Details" and "Factor" indexed by date: the
+    units traded before a split of an instrument are multiplied by its factor. Without ``start``
+    the holdings start on the day of the first position activity, otherwise the units traded
+    before ``start`` are carried into its first day.
+    """
+    if positions.empty:
+        return Holdings(pd.DatetimeIndex([]), [], np.zeros((0, 0)))
+
+    units = positions["Units / Contracts"].astype(np.float32)
+    units = units.where(positions["Type"] != "Position closed", units * -1)
+    instruments = [str(details) for details in positions["Details"].unique()]
+    daily = pd.DataFrame(
+        {"day": pd.DatetimeIndex(positions.index).floor("D"), "details": positions["Details"], "units": units}
+    ).pivot_table(index="day", columns="details", values="units", aggfunc="sum", fill_value=0)
+    daily = daily.reindex(columns=instruments, fill_value=0)
+
+    # Split rows of every instrument: their details start with the instrument details
+    instrument_splits: dict[int, list[int]] = {}
+    for row, details in enumerate(splits["Details"]):
+        for column, instrument in enumerate(instruments):
+            if details.startswith(instrument):
+                instrument_splits.setdefault(column, []).append(row)
+
+    factors = np.ones(daily.shape)
+    split_dates = splits.index.to_numpy(dtype="datetime64[ns]")
+    split_factors = splits["Factor"].to_numpy(np.float64)
+    for column, rows in instrument_splits.items():
+        order = np.array(rows)[np.argsort(split_dates[rows], kind="stable")]
+        # Product of the factors of each split and all the later ones, 1 after the last split
+        later = np.append(np.cumprod(split_factors[order][::-1])[::-1], 1.0)
+        factors[:, column] = later[np.searchsorted(split_dates[order], daily.index.to_numpy(), side="right")]
+    adjusted = pd.DataFrame(daily.to_numpy(np.float64) * factors, index=daily.index, columns=instruments)
+
+    dates = pd.date_range(daily.index.min() if start is None else start.normalize(), end)
+    carried = adjusted[adjusted.index < dates[0]].to_numpy().sum(axis=0) if len(dates) else 0.0
+    shares = carried + np.cumsum(adjusted.reindex(dates, fill_value=0).to_numpy(), axis=0)
+    return Holdings(dates, instruments, shares)
@@ -0,0 +1,29 @@
+"""Vectorized technical indicators, read off the running state of ``indicator_store``.
+
+SMAs of any window are read off a single running sum of the closes, so the cost of a request
+does not depend on how many windows it asks for.
+"""
+
+import numpy as np
+
+
+def align(keys: np.ndarray, moments: np.ndarray) -> np.ndarray:
+    """Return the position of the last key at or before each moment (-1 when there is none)."""
+    return np.searchsorted(keys, moments, side="right") - 1
+
+
+def sma(sums: np.ndarray, window: int, positions: np.ndarray) -> np.ndarray:
+    """SMA of the ``window`` values ending at each position, from their running sums. NaN where undefined."""
+    padded = np.r_[0.0, sums]
+    values = np.full(len(positions), np.nan)
+    valid = positions >= window - 1
+    ends = positions[valid] + 1
+    values[valid] = (padded[ends] - padded[ends - window]) / window
+    return values
+
+
+def pick(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Return ``values`` at each position, NaN for -1."""
+    picked = values[np.maximum(positions, 0)].astype(np.float64)
+    picked[positions < 0] = np.nan
+    return picked
@@ -78,5 +78,10 @@ def duration_to_interval(duration: dt.timedelta) -> str:
     return "3mo"
 
 
+def is_intraday(interval: str) -> bool:
+    # "mo" (months) ends with "o", so this only matches minutes and hours
+    return interval.endswith(("m", "h"))
+
+
 def now() -> dt.datetime:
     return dt.datetime.now(TIMEZONE)
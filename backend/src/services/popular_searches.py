@@ -0,0 +1,114 @@
+"""Precomputed responses of the most frequent search queries.
+
+Every search query is counted. A background thread periodically recomputes the full quotes of
+the top queries (enrichment included), which are then served without any lookup. Counts decay
+at every refresh so that the hot set follows the recent traffic. The hot set and its responses
+are persisted in the popular search store, so that they are served right after a restart.
+"""
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+
+from src import models
+from src.database.popular_search_store import PopularSearchSnapshot, PopularSearchStore
+from src.database.search_cache import normalize
+
+TOP_QUERIES = 200
+# Queries searched fewer times than this are not precomputed
+MIN_COUNT = 2
+REFRESH_INTERVAL = 5 * 60
+# Counts are multiplied by this at every refresh, and forgotten below 1
+DECAY = 0.9
+MAX_TRACKED_QUERIES = 10_000
+# The tracked queries are trimmed back to the most frequent MAX_TRACKED_QUERIES once this many
+# more are tracked, so that the trimming cost is spread over many records
+TRIM_SLACK = 1_000
+
+
+class PopularSearches:
+    def __init__(self, store: PopularSearchStore | None = None, top: int = TOP_QUERIES) -> None:
+        self.store = PopularSearchStore() if store is None else store
+        self.top = top
+        self._counts: Counter[str] = Counter()
+        self._responses: dict[str, list[models.Quote]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "refreshes": 0}
+        self._thread: threading.Thread | None = None
+        self._load()
+
+    def record(self, query: str) -> None:
+        key = normalize(query)
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > MAX_TRACKED_QUERIES + TRIM_SLACK:
+                self._counts = Counter(dict(self._counts.most_common(MAX_TRACKED_QUERIES)))
+
+    def get(self, query: str) -> list[models.Quote] | None:
+        """Return the precomputed quotes of ``query``, if it is a popular one."""
+        with self._lock:
+            quotes = self._responses.get(normalize(query))
+            self._counters["misses" if quotes is None else "hits"] += 1
+            return quotes
+
+    def hot_queries(self) -> list[str]:
+        with self._lock:
+            ranked = self._counts.most_common(self.top)
+        return [query for query, count in ranked if count >= MIN_COUNT]
+
+    def refresh(self, search: Callable[[str], list[models.Quote]]) -> None:
+        """Recompute the quotes of the hot queries, then decay the counts and persist the hot set."""
+        responses = {}
+        for query in self.hot_queries():
+            try:
+                responses[query] = search(query)
+            except Exception as e:
+                print(f"Precomputing the search of {query!r} failed: {e}")
+        with self._lock:
+            self._responses = responses
+            self._counts = Counter(
+                {query: count * DECAY for query, count in self._counts.items() if count * DECAY >= 1}
+            )
+            self._counters["refreshes"] += 1
+        self._save(responses)
+
+    def start(self, search: Callable[[str], list[models.Quote]], interval: float = REFRESH_INTERVAL) -> None:
+        """Refresh the hot set in a background thread, right away and then every ``interval`` seconds.
+
+        The thread is only started once, later calls do nothing.
+        """
+
+        def run() -> None:
+            while True:
+                self.refresh(search)
+                time.sleep(interval)
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=run, name="popular-searches", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "tracked": len(self._counts), "precomputed": len(self._responses)}
+
+    def _load(self) -> None:
+        saved = self.store.load()
+        if saved is None:
+            return
+        self._counts = Counter(saved.counts)
+        self._responses = {
+            query: [models.Quote.model_validate(quote) for quote in quotes] for query, quotes in saved.responses.items()
+        }
+
+    def _save(self, responses: dict[str, list[models.Quote]]) -> None:
+        with self._lock:
+            counts = {query: float(count) for query, count in self._counts.items()}
+        self.store.save(
+            PopularSearchSnapshot(
+                counts=counts,
+                responses={query: [quote.model_dump() for quote in quotes] for query, quotes in responses.items()},
+            )
+        )
@@ -1,172 +1,162 @@
-import datetime as dt
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from flask import current_app
 from werkzeug.utils import secure_filename
 
 from src import models
-from src.database import bloomberg_repository, stocks_repository
+from src.database import bloomberg_repository, indicator_store, stocks_repository
 from src.services.task_manager import TaskProgress, task_manager
 
-from .etoro_data import extract_closed_position, extract_portfolio_evolution
-from .intervals import duration_to_interval, interval_to_duration, now
+from . import downsampling, fetch_planner, indicators
+from .etoro_data import (
+    extract_closed_position,
+    extract_portfolio_evolution,
+    ingest_statement,
+    stored_portfolio_evolution,
+)
+from .intervals import interval_to_duration
+from .popular_searches import PopularSearches
 
-STATIC_CRYPTO = pd.read_csv("data/search/top_cryptos.csv")
-STATIC_INDEX = pd.read_csv("data/search/top_indexes.csv")
+MAX_SEARCH_RESULTS = 10
+popular_searches = PopularSearches()
+# Seconds search waits for upstream to discover symbols, then for the info of the results
+SEARCH_UPSTREAM_DEADLINE = 1.0
+SEARCH_INFO_DEADLINE = 1.5
+MAX_BATCH_TICKERS = 50
 
 
 def get_ticker(query: models.TickerQuery) -> models.TickerResponse | None:
-    n_points = 20
-    history: pd.DataFrame
-    if query.period == "max":
-        dat = stocks_repository.get_ticker_history(
-            query.ticker_name, "max", "3mo"
-        )
-        history = pd.DataFrame(dat)
-        duration = now().replace(tzinfo=None) - history.iloc[0]["Date"].replace(
-            tzinfo=None
-        )
-    else:
-        duration = interval_to_duration(query.period)
-    if query.interval is None or query.interval == "auto":
-        query.interval = duration_to_interval(duration / n_points)
-
-    start = now() - duration
-    start = start.strftime("%Y-%m-%d")
-    if query.period == "max":
-        history = pd.DataFrame(
-            stocks_repository.get_ticker_history(
-                query.ticker_name, "max", query.interval
-            )
-        )
-    else:
-        history = pd.DataFrame(
-            stocks_repository.get_ticker_history_from_start(
-                query.ticker_name, start, query.interval
-            )
-        )
-        # Fallback: if no data, try 'max' period
-        if history.empty:
-            history = pd.DataFrame(
-                stocks_repository.get_ticker_history(
-                    query.ticker_name, "max", query.interval
-                )
-            )
-    if history.empty:
+    series = fetch_planner.load_ticker_series(
+        query.ticker_name, query.period, query.interval, [*query.smas, *query.emas]
+    )
+    if series is None:
         return None
-
-    if "Datetime" in history:
-        history["Date"] = history["Datetime"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    stocks_repository.remember_symbol(query.ticker_name)
+    query.interval = series.interval
+    history = series.candles
+
+    dates_column = fetch_planner.date_column(history)
+    main_dates = history[dates_column]
+    if main_dates.dt.tz is not None:
+        main_dates = main_dates.dt.tz_localize(None)
+    if dates_column == "Datetime":
+        dates = main_dates.dt.strftime("%Y-%m-%dT%H:%M:%S").tolist()
     else:
-        history["Date"] = history["Date"].dt.strftime("%Y-%m-%d")
-    if history.empty:
-        return None
-
+        dates = main_dates.dt.strftime("%Y-%m-%d").tolist()
+    candles = history["Close"].tolist()
     first_row = history.iloc[0]
     last_row = history.iloc[-1]
-
-    dates = history["Date"].tolist()
-    candles = history["Close"].tolist()
     delta = (last_row["Close"] - first_row["Open"]) / first_row["Open"]
 
-    smas_sizes = [30, 100]
-    max_sma_window = max(smas_sizes)
-
-    # Calculate how much daily data is needed to ensure all SMA values are valid
-    main_dates = pd.to_datetime(history["Date"])
-    n_main = len(main_dates)
-    # We need at least n_main + max_sma_window - 1 daily closes, starting from earliest main date - (max_sma_window-1)
-    first_main_date = main_dates.iloc[0]
-    extended_start = first_main_date - dt.timedelta(
-        days=max_sma_window + n_main
-    )
-    extended_start_str = extended_start.strftime("%Y-%m-%d")
-
-    try:
-        daily_history = pd.DataFrame(
-            stocks_repository.get_ticker_history_from_start(
-                query.ticker_name, extended_start_str, "1d"
-            )
-        )
-    except Exception:
-        daily_history = pd.DataFrame()
-
-    if not daily_history.empty and "Close" in daily_history.columns:
-        # Prepare daily closes with timezone-naive dates
-        if "Datetime" in daily_history:
-            daily_history["Date"] = daily_history["Datetime"].dt.normalize()
-        else:
-            daily_history["Date"] = pd.to_datetime(daily_history["Date"])
-        if hasattr(daily_history["Date"], "dt") and hasattr(
-            daily_history["Date"].dt, "tz_localize"
-        ):
-            daily_history["Date"] = daily_history["Date"].dt.tz_localize(None)
-        daily_history = daily_history.sort_values("Date")
-        daily_history = daily_history.set_index("Date")
-
-        # Compute rolling SMAs on daily closes
-        sma_df = pd.DataFrame(
-            {
-                size: daily_history["Close"].rolling(window=size).mean()
-                for size in smas_sizes
-            }
+    state = stocks_repository.get_indicator_state(query.ticker_name, "1d", query.emas)
+    if state.empty:
+        # If no SMA history is available, provide empty values
+        return models.TickerResponse(
+            query=query, smas={size: [] for size in query.smas}, candles=[], dates=[], delta=delta
         )
 
-        # Only keep main_dates for which a full SMA window is available (i.e., drop first max_sma_window-1)
-        valid_mask = main_dates >= (
-            extended_start + dt.timedelta(days=max_sma_window - 1)
-        )
-        filtered_dates = main_dates[valid_mask]
-        filtered_indices = [i for i, v in enumerate(valid_mask) if v]
-
-        smas = {}
-        for size in smas_sizes:
-            # For each filtered main date, get the SMA value for that date
-            aligned = sma_df[size].reindex(filtered_dates, method="ffill")
-            smas[size] = [float(x) for x in aligned.tolist()]
-
-        # Also filter candles and dates to only those with valid SMA
-        candles = [candles[i] for i in filtered_indices]
-        dates = [dates[i] for i in filtered_indices]
-    else:
-        # If no SMA history is available, provide empty/zero values
-        smas = {size: [] for size in smas_sizes}
-        candles = []
-        dates = []
+    # Indicators on the daily closes, aligned on the candles
+    positions = indicators.align(state["Date"].to_numpy(), main_dates.to_numpy())
+    sums = state[indicator_store.SUM_COLUMN].to_numpy()
+    sma_values = {size: indicators.sma(sums, size, positions) for size in query.smas}
+    ema_values = {
+        size: indicators.pick(state[indicator_store.ema_column(size)].to_numpy(), positions) for size in query.emas
+    }
+    # Only candles with a full window for every average are kept (NaN is not valid JSON)
+    complete = np.ones(len(positions), dtype=bool)
+    for values in [*sma_values.values(), *ema_values.values()]:
+        complete &= np.isfinite(values)
+    candles = np.asarray(candles)[complete].tolist()
+    dates = np.asarray(dates)[complete].tolist()
+    smas = {size: values[complete].tolist() for size, values in sma_values.items()}
+    emas = {size: values[complete].tolist() for size, values in ema_values.items()}
+
+    if query.max_points is not None:
+        kept = downsampling.downsample_indices(np.asarray(candles), query.max_points)
+        candles = downsampling.take(candles, kept)
+        dates = downsampling.take(dates, kept)
+        smas = {size: downsampling.take(values, kept) for size, values in smas.items()}
+        emas = {size: downsampling.take(values, kept) for size, values in emas.items()}
 
     return models.TickerResponse(
         query=query,
         smas=smas,
+        emas=emas,
         candles=candles,
         dates=dates,
         delta=delta,
     )
 
 
+def get_tickers(query: models.TickersQuery) -> models.TickersResponse:
+    if len(query.ticker_names) == 1:
+        query.ticker_names = query.ticker_names[0].split(",")
+    ticker_names = list(dict.fromkeys(name for name in query.ticker_names if name))
+    if len(ticker_names) > MAX_BATCH_TICKERS:
+        msg = f"At most {MAX_BATCH_TICKERS} tickers can be requested at once"
+        raise ValueError(msg)
+
+    try:
+        fetch_planner.prefetch_ticker_series(ticker_names, query.period, query.interval, [*query.smas, *query.emas])
+    except Exception as e:
+        # Each ticker is loaded (and its error reported) on its own below
+        print(f"Bulk prefetch failed: {e}")
+
+    tickers = {}
+    errors = {}
+    for ticker_name in ticker_names:
+        ticker_query = models.TickerQuery(
+            ticker_name=ticker_name,
+            interval=query.interval,
+            period=query.period,
+            smas=query.smas,
+            emas=query.emas,
+            max_points=query.max_points,
+        )
+        try:
+            result = get_ticker(ticker_query)
+        except Exception as e:
+            errors[ticker_name] = str(e) or type(e).__name__
+            continue
+        if result is None:
+            errors[ticker_name] = "Not found"
+        else:
+            tickers[ticker_name] = result
+    return models.TickersResponse(query=query, tickers=tickers, errors=errors)
+
+
 def get_compare_growth(
     query: models.CompareGrowthQuery,
 ) -> models.CompareGrowthResponse:
     if len(query.ticker_names) == 1:
         query.ticker_names = query.ticker_names[0].split(",")
 
-    hist = stocks_repository.get_tickers_history(
-        query.ticker_names, query.period
-    )
+    matrix = stocks_repository.get_close_matrix(query.ticker_names)
+    closes = matrix.closes
+    dates = matrix.dates
+    if query.period != "max":
+        start = (pd.Timestamp.now() - interval_to_duration(query.period)).normalize()
+        first = np.searchsorted(dates, start.as_unit("ns").value)
+        closes = closes[first:]
+        dates = dates[first:]
 
-    close_df = hist.xs("Close", level="Price", axis=1)
-    base_prices = close_df.iloc[0]
-    ratios_df = close_df.divide(base_prices)
+    # Rebase on the first date every ticker traded on
+    complete = np.isfinite(closes).all(axis=1)
+    closes = closes[complete]
+    dates = dates[complete]
+    ratios = closes / closes[0] if len(closes) else closes
 
-    candles = {
-        ticker: ratios_df.loc[:, ticker].tolist()
-        for ticker in query.ticker_names
-    }
-    dates = [index.strftime("%Y-%m-%d") for index in ratios_df.index]
+    if query.max_points is not None:
+        kept = downsampling.downsample_indices(ratios.T, query.max_points)
+        ratios = ratios[kept]
+        dates = dates[kept]
 
-    return models.CompareGrowthResponse(
-        query=query, candles=candles, dates=dates
-    )
+    candles = {ticker: ratios[:, column].tolist() for column, ticker in enumerate(matrix.tickers)}
+    dates = pd.to_datetime(dates, unit="ns").strftime("%Y-%m-%d").tolist()
+
+    return models.CompareGrowthResponse(query=query, candles=candles, dates=dates)
 
 
 def get_kpis(query: models.KPIQuery) -> models.KPIResponse | None:
@@ -191,14 +181,12 @@ def get_kpis(query: models.KPIQuery) -> models.KPIResponse | None:
     else:
         main = None
 
-    analyst_price_targets = stocks_repository.get_ticker_analyst_price_targets(
-        query.ticker_name
-    )
+    analyst_price_targets = stocks_repository.get_ticker_analyst_price_targets(query.ticker_name)
 
     return models.KPIResponse(
         query=query,
-        analyst_price_targets=analyst_price_targets,
-        info=info,
+        analyst_price_targets=models.AnalystPriceTargets.model_validate(analyst_price_targets),
+        info=models.Info.model_validate(info),
         main=main,
     )
 
@@ -208,83 +196,83 @@ def get_historical_kpis(query: models.KPIQuery) -> models.HistoricalKPIs | None:
 
 
 def search_ticker(query: models.SearchQuery) -> models.SearchResponse:
-    raw_quotes: list[models.RawQuote] = list(
-        map(
-            models.RawQuote.model_validate,
-            stocks_repository.search(query.query),
-        ),
-    )
-    quotes_names = [quote.symbol for quote in raw_quotes]
-    tickers = stocks_repository.get_tickers(quotes_names)
-    infos: list[models.Info] = [
-        models.Info.model_validate(t.info) for t in tickers.values()
-    ]
-    deltas = [
-        (
-            ((i.currentPrice - i.open) / i.currentPrice)
-            if i.currentPrice and i.open
-            else None
-        )
-        for i in infos
-    ]
+    popular_searches.record(query.query)
+    quotes = popular_searches.get(query.query)
+    if quotes is None:
+        quotes = search_quotes(query.query)
+    return models.SearchResponse(quotes=quotes, query=query)
 
-    cryptos_filtered = STATIC_CRYPTO[
-        STATIC_CRYPTO.apply(
-            lambda row: row.astype(str).str.contains(
-                query.query, case=False, na=False
-            )
-        ).any(axis=1)
-    ]
-    index_filtered = STATIC_INDEX[
-        STATIC_INDEX.apply(
-            lambda row: row.astype(str).str.contains(
-                query.query, case=False, na=False
-            )
-        ).any(axis=1)
-    ]
 
-    quotes_classic = [
-        models.Quote(
-            symbol=raw.symbol,
-            long_name=raw.longname or raw.shortname or "MISSING!!",
-            icon_url=(
-                None
-                if info.website is None
-                else f"https://financialmodelingprep.com/image-stock/{info.symbol}.png"
-            ),
-            today_change=today_change,
-        )
-        for (raw, info, today_change) in zip(
-            raw_quotes, infos, deltas, strict=True
-        )
-        if info.currentPrice is not None
-    ]
-    quotes_cryptos = [
+def start_search_warmer() -> None:
+    popular_searches.start(search_quotes)
+
+
+def search_quotes(query: str) -> list[models.Quote]:
+    # The local directory answers first, upstream is only asked to discover the symbols it misses
+    entries = stocks_repository.search_symbols(query, MAX_SEARCH_RESULTS, fuzzy=False)
+    raw_quotes: list[models.RawQuote] = []
+    if len(entries) < MAX_SEARCH_RESULTS:
+        upstream = stocks_repository.discover_symbols(query, timeout=SEARCH_UPSTREAM_DEADLINE) or []
+        known = {entry.symbol for entry in entries}
+        raw_quotes = [
+            raw_quote for raw_quote in map(models.RawQuote.model_validate, upstream) if raw_quote.symbol not in known
+        ][: MAX_SEARCH_RESULTS - len(entries)]
+    if not entries and not raw_quotes:
+        # Typos: closest local symbols
+        entries = stocks_repository.search_symbols(query, MAX_SEARCH_RESULTS)
+
+    # Quotes whose info misses the deadline are still returned, without today_change
+    symbols = [entry.symbol for entry in entries] + [raw.symbol for raw in raw_quotes]
+    tickers_info = stocks_repository.get_tickers_info(symbols, timeout=SEARCH_INFO_DEADLINE)
+    infos = {
+        symbol: None if info is None else models.Info.model_validate(info) for symbol, info in tickers_info.items()
+    }
+
+    def today_change(info: models.Info | None) -> float | None:
+        if info is None or not info.currentPrice or not info.open:
+            return None
+        return (info.currentPrice - info.open) / info.currentPrice
+
+    def icon_url(info: models.Info | None) -> str | None:
+        if info is None or info.website is None:
+            return None
+        return f"https://financialmodelingprep.com/image-stock/{info.symbol}.png"
+
+    quotes_local = [
         models.Quote(
-            symbol=row["Ticker"],
-            long_name=row["Name"],
-            icon_url=(
-                f"https://financialmodelingprep.com/image-stock/{row['Ticker'].removesuffix('-USD')}.png"
-            ),
-            today_change=None,
+            symbol=entry.symbol,
+            long_name=entry.name,
+            icon_url=entry.icon_url or icon_url(infos[entry.symbol]),
+            today_change=today_change(infos[entry.symbol]),
         )
-        for (_, row) in cryptos_filtered.iterrows()
+        for entry in entries
     ]
-    quotes_indexes = [
+    quotes_upstream = [
         models.Quote(
-            symbol=row["Ticker"],
-            long_name=row["Name"],
-            icon_url=f"https://flagcdn.com/{row['CountryCode']}.svg",
-            today_change=None,
+            symbol=raw.symbol,
+            long_name=raw.longname or raw.shortname or "MISSING!!",
+            icon_url=icon_url(infos[raw.symbol]),
+            today_change=today_change(infos[raw.symbol]),
         )
-        for (_, row) in index_filtered.iterrows()
+        for raw in raw_quotes
+        # Upstream also finds symbols without a quote (expired contracts, delisted equities...)
+        if (info := infos[raw.symbol]) is None or info.currentPrice is not None
     ]
-    # take at most 5 of crypto/indexes
-    quotes = quotes_classic + (quotes_cryptos + quotes_indexes)[:5]
-    return models.SearchResponse(quotes=quotes, query=query)
+    return quotes_local + quotes_upstream
 
 
-def create_etoro_excel(form: models.EtoroForm, user_email: str) -> None:
+def get_metrics() -> models.MetricsResponse:
+    return models.MetricsResponse(
+        counters={
+            "upstream_history": stocks_repository.get_upstream_stats(),
+            **stocks_repository.get_cache_stats(),
+            "popular_searches": popular_searches.stats(),
+        }
+    )
+
+
+def create_etoro_excel(form: models.EtoroForm, user_email: str) -> str:
+    """Save an uploaded statement and start its ingest. Returns the ingest task ID."""
     etoro_upload_folder = Path(current_app.config["UPLOAD_FOLDER"]) / user_email
     etoro_upload_folder.mkdir(exist_ok=True, parents=True)
     assert form.file.filename is not None
@@ -292,23 +280,28 @@ def create_etoro_excel(form: models.EtoroForm, user_email: str) -> None:
     file_path = Path(etoro_upload_folder) / filename
     form.file.save(str(file_path))
 
+    task_id = task_manager.create_task()
+
+    def _run_ingest(task_id: str) -> dict:
+        def progress_callback(new_progress: TaskProgress) -> None:
+            task_manager.update_progress(task_id, new_progress)
+
+        return ingest_statement(file_path, progress_callback=progress_callback)
+
+    task_manager.run_task(task_id, _run_ingest)
+    return task_id
+
 
 def list_etoro_reports(user_email: str) -> models.EtoroReportsResponse:
     user_etoro_folder = Path(current_app.config["UPLOAD_FOLDER"]) / user_email
     if not Path.exists(user_etoro_folder):
         return models.EtoroReportsResponse(reports=[])
 
-    reports = [
-        f.name
-        for f in user_etoro_folder.iterdir()
-        if (Path(user_etoro_folder) / f).exists()
-    ]
+    reports = [f.name for f in user_etoro_folder.iterdir() if (Path(user_etoro_folder) / f).exists()]
     return models.EtoroReportsResponse(reports=reports)
 
 
-def analyze_etoro_excel_by_name_async(
-    query: models.EtoroTradeCountQuery, user_email: str
-) -> str:
+def analyze_etoro_excel_by_name_async(query: models.EtoroTradeCountQuery, user_email: str) -> str:
     """Start async analysis and return task ID."""
     user_etoro_folder = Path(current_app.config["UPLOAD_FOLDER"]) / user_email
     file_path = Path(user_etoro_folder) / query.filename
@@ -320,12 +313,8 @@ def analyze_etoro_excel_by_name_async(
     task_id = task_manager.create_task()
 
     def _run_analysis(task_id: str) -> dict[str, list[str]]:
-        def progress_callback(
-            step_name: str, step_number: int, step_count: int
-        ) -> None:
-            task_manager.update_progress(
-                task_id, TaskProgress(step_name, step_number, step_count)
-            )
+        def progress_callback(step_name: str, step_number: int, step_count: int) -> None:
+            task_manager.update_progress(task_id, TaskProgress(step_name, step_number, step_count))
 
         return extract_closed_position(
             file_path,
@@ -337,9 +326,17 @@ def analyze_etoro_excel_by_name_async(
     return task_id
 
 
-def analyze_etoro_evolution_by_name_async(
-    query: models.EtoroEvolutionQuery, user_email: str
-) -> str:
+def downsample_evolution(evolution: models.EtoroEvolutionInner, max_points: int) -> models.EtoroEvolutionInner:
+    """Keep at most ``max_points`` dates, preserving the extremes of the portfolio totals."""
+    totals = [evolution.parts[name] for name in ("Total", "P&L", "Deposits") if name in evolution.parts]
+    kept = downsampling.downsample_indices(np.asarray(totals or list(evolution.parts.values())), max_points)
+    return models.EtoroEvolutionInner(
+        dates=downsampling.take(evolution.dates, kept),
+        parts={name: downsampling.take(values, kept) for name, values in evolution.parts.items()},
+    )
+
+
+def analyze_etoro_evolution_by_name_async(query: models.EtoroEvolutionQuery, user_email: str) -> str:
     """Start async evolution analysis and return task ID."""
     user_etoro_folder = Path(current_app.config["UPLOAD_FOLDER"]) / user_email
     file_path = Path(user_etoro_folder) / query.filename
@@ -350,14 +347,21 @@ def analyze_etoro_evolution_by_name_async(
 
     task_id = task_manager.create_task()
 
+    def _response(evolution: models.EtoroEvolutionInner) -> models.EtoroEvolutionResponse:
+        if query.max_points is not None:
+            evolution = downsample_evolution(evolution, query.max_points)
+        return models.EtoroEvolutionResponse(evolution=evolution)
+
     def _run_analysis(task_id: str) -> models.EtoroEvolutionResponse:
         def progress_callback(new_progress: TaskProgress) -> None:
             task_manager.update_progress(task_id, new_progress)
 
-        evolution = extract_portfolio_evolution(
-            file_path, progress_callback=progress_callback
-        )
-        return models.EtoroEvolutionResponse(evolution=evolution)
+        # An evolution valued with the latest bars is returned as is
+        progress_callback(TaskProgress("Looking up the stored evolution", 1, 1))
+        stored = stored_portfolio_evolution(file_path)
+        if stored is not None:
+            return _response(stored)
+        return _response(extract_portfolio_evolution(file_path, progress_callback=progress_callback))
 
     task_manager.run_task(task_id, _run_analysis)
     return task_id
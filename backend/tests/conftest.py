@@ -0,0 +1,40 @@
+"""Shared fixtures."""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.database import stocks_repository
+from src.database.bar_store import BarStore
+from src.database.close_matrix import CloseMatrixCache
+from src.database.offline_provider import OfflineProvider
+from src.database.single_flight import SingleFlight
+
+OFFLINE_FOLDER = Path("data/offline")
+
+
+class CountingProvider(OfflineProvider):
+    def __init__(self, root: Path) -> None:
+        super().__init__(root)
+        self.calls: list[tuple[str, str]] = []
+
+    def bulk_history(
+        self,
+        ticker_names: list[str],
+        interval: str,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        self.calls.extend((ticker_name, interval) for ticker_name in ticker_names)
+        return super().bulk_history(ticker_names, interval, start, end)
+
+
+@pytest.fixture
+def provider(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> CountingProvider:
+    counting = CountingProvider(OFFLINE_FOLDER)
+    monkeypatch.setattr(stocks_repository, "provider", counting)
+    monkeypatch.setattr(stocks_repository, "bar_store", BarStore(tmp_path))
+    monkeypatch.setattr(stocks_repository, "upstream_flights", SingleFlight())
+    monkeypatch.setattr(stocks_repository, "close_matrices", CloseMatrixCache())
+    return counting
@@ -1,14 +1,20 @@
 """Test the new async eToro endpoints with progress tracking."""
 
 import time
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 from flask import Flask
 
 from src import models
-from src.services import stocks_service
-from src.services.task_manager import task_manager
+from src.database.statement_store import StatementStore
+from src.services import etoro_data, stocks_service
+from src.services.task_manager import TaskProgress, task_manager
+
+from .conftest import CountingProvider
+
+STATEMENT_FILE = Path("tests/data/etoro-account-statement-12-31-2014-7-5-2025_TEST.xlsx")
 
 
 @pytest.fixture
@@ -57,8 +63,9 @@ def test_async_etoro_analysis_success(mock_extract, mock_path, fake_app) -> None
 
 
 @patch("src.services.stocks_service.Path")
+@patch("src.services.stocks_service.stored_portfolio_evolution", return_value=None)
 @patch("src.services.stocks_service.extract_portfolio_evolution")
-def test_async_etoro_evolution_success(mock_extract, mock_path, fake_app) -> None:
+def test_async_etoro_evolution_success(mock_extract, mock_stored, mock_path, fake_app) -> None:
     mock_path.exists.return_value = True
     mock_evolution = models.EtoroEvolutionInner(dates=["2023-01-01"], parts={"test": [1.0]})
     mock_extract.return_value = mock_evolution
@@ -78,3 +85,47 @@ def test_async_etoro_evolution_success(mock_extract, mock_path, fake_app) -> Non
     args, kwargs = mock_extract.call_args
     assert "progress_callback" in kwargs
     assert callable(kwargs["progress_callback"])
+    mock_stored.assert_called_once()
+
+
+@patch("src.services.stocks_service.Path")
+@patch("src.services.stocks_service.stored_portfolio_evolution")
+@patch("src.services.stocks_service.extract_portfolio_evolution")
+def test_async_etoro_evolution_stored(mock_extract, mock_stored, mock_path, fake_app) -> None:
+    """An evolution valued with the latest bars is returned without recomputing."""
+    mock_path.exists.return_value = True
+    mock_stored.return_value = models.EtoroEvolutionInner(dates=["2023-01-01"], parts={"test": [1.0]})
+
+    with fake_app.app_context():
+        task_id = stocks_service.analyze_etoro_evolution_by_name_async(
+            models.EtoroEvolutionQuery(filename="test.xlsx"), "test@example.com"
+        )
+
+    time.sleep(0.1)
+
+    task = task_manager.get_task(task_id)
+    assert task is not None
+    assert task.status.value == "completed"
+    assert task.progress is not None
+    assert task.result == models.EtoroEvolutionResponse(evolution=mock_stored.return_value)
+    mock_extract.assert_not_called()
+
+
+def test_ingest_statement(provider: CountingProvider, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Ingesting parses the statement, resolves its tickers and prefetches their daily history and FX rates in bulk."""
+    monkeypatch.setattr(etoro_data, "statement_store", StatementStore(tmp_path / "statements"))
+    steps: list[TaskProgress] = []
+    summary = etoro_data.ingest_statement(STATEMENT_FILE, steps.append)
+    assert list(dict.fromkeys(step.step_name for step in steps)) == [
+        "Reading statement",
+        "Resolving tickers",
+        "Fetching market data",
+    ]
+    # Every fetched symbol is reported as a sub-task of the last step
+    symbols = [step.sub_task for step in steps if step.sub_task is not None]
+    assert symbols[-1].step_number == symbols[-1].step_count == len(symbols)
+    assert summary["prefetched"] > 0
+    assert summary["prefetched"] <= summary["instruments"] - len(summary["unresolved"]) + len(summary["currencies"])
+    assert {interval for _, interval in provider.calls} == {"1d"}
+    assert "EURUSD=X" in {ticker_name for ticker_name, _ in provider.calls}
+    assert (tmp_path / "statements" / summary["digest"]).is_dir()
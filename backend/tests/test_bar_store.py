@@ -0,0 +1,124 @@
+"""Tests for the local OHLCV bar store."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database import stocks_repository
+from src.database.bar_store import BAR_COLUMNS, TIMESTAMP_COLUMN, BarStore
+
+from .conftest import OFFLINE_FOLDER, CountingProvider
+
+
+def _bars(dates: list[str], close: list[float]) -> pd.DataFrame:
+    bars = pd.DataFrame({TIMESTAMP_COLUMN: pd.DatetimeIndex(dates).as_unit("ns").to_numpy().view(np.int64)})
+    for column in BAR_COLUMNS:
+        bars[column] = np.asarray(close, dtype=np.float64)
+    return bars
+
+
+def test_write_and_read_roundtrip(tmp_path: Path) -> None:
+    """Bars are partitioned per year and read back sorted with their dtypes."""
+    store = BarStore(tmp_path)
+    store.write("aapl", "1d", _bars(["2024-12-31", "2023-01-02", "2025-01-02"], [2.0, 1.0, 3.0]), start=None)
+
+    assert sorted(p.name for p in (tmp_path / "AAPL" / "1d").glob("*.parquet")) == [
+        "2023.parquet",
+        "2024.parquet",
+        "2025.parquet",
+    ]
+    bars = store.read("AAPL", "1d")
+    assert bars["Close"].tolist() == [1.0, 2.0, 3.0]
+    assert bars[TIMESTAMP_COLUMN].dtype == np.int64
+    assert all(bars[column].dtype == np.float64 for column in BAR_COLUMNS)
+
+
+def test_append_replaces_partial_last_bar(tmp_path: Path) -> None:
+    """Appending a tail overwrites bars with the same timestamp instead of duplicating them."""
+    store = BarStore(tmp_path)
+    store.write("AAPL", "1d", _bars(["2025-01-02", "2025-01-03"], [1.0, 2.0]), start=None)
+    store.write("AAPL", "1d", _bars(["2025-01-03", "2025-01-06"], [2.5, 3.0]), start=0)
+
+    bars = store.read("AAPL", "1d")
+    assert bars["Close"].tolist() == [1.0, 2.5, 3.0]
+
+
+def test_read_range(tmp_path: Path) -> None:
+    """Only the requested range is returned."""
+    store = BarStore(tmp_path)
+    store.write("AAPL", "1d", _bars(["2023-06-01", "2024-06-01", "2025-06-01"], [1.0, 2.0, 3.0]), start=None)
+
+    start = pd.Timestamp("2024-01-01").value
+    end = pd.Timestamp("2024-12-31").value
+    assert store.read("AAPL", "1d", start=start, end=end)["Close"].tolist() == [2.0]
+    assert store.read("MSFT", "1d").empty
+
+
+def test_coverage_tracks_requested_start(tmp_path: Path) -> None:
+    """Coverage keeps the earliest requested start and the latest stored bar."""
+    store = BarStore(tmp_path)
+    assert store.coverage("AAPL", "1d") is None
+
+    start = pd.Timestamp("2024-01-01").value
+    store.write("AAPL", "1d", _bars(["2024-01-02"], [1.0]), start=start, timezone="America/New_York")
+    coverage = store.coverage("AAPL", "1d")
+    assert coverage is not None
+    assert coverage.timezone == "America/New_York"
+    assert coverage.covers(pd.Timestamp("2024-06-01").value)
+    assert not coverage.covers(pd.Timestamp("2023-06-01").value)
+    assert not coverage.covers(None)
+
+    tail = _bars(["2024-01-03"], [2.0])
+    coverage = store.write("AAPL", "1d", tail, start=pd.Timestamp("2024-01-02").value)
+    assert coverage.start == start
+    assert coverage.last_bar == tail[TIMESTAMP_COLUMN].iloc[0]
+
+    coverage = store.write("AAPL", "1d", _bars(["2020-01-02"], [0.5]), start=None)
+    assert coverage.covers(None)
+
+
+class AdjustingProvider(CountingProvider):
+    """Offline provider whose prices are all scaled by ``factor``, like upstream adjusting them for a split."""
+
+    factor = 1.0
+
+    def bulk_history(
+        self,
+        ticker_names: list[str],
+        interval: str,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        histories = super().bulk_history(ticker_names, interval, start, end)
+        prices = ["Open", "High", "Low", "Close"]
+        return {
+            ticker_name: history.assign(**{column: history[column] * self.factor for column in prices})
+            for ticker_name, history in histories.items()
+        }
+
+
+@pytest.mark.usefixtures("provider")
+def test_adjusted_history_replaces_stored_bars(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Prices adjusted upstream since the last fetch replace the whole stored history instead of mixing bases."""
+    adjusting = AdjustingProvider(OFFLINE_FOLDER)
+    monkeypatch.setattr(stocks_repository, "provider", adjusting)
+    history = stocks_repository.get_ticker_history("AAPL", "max", "1d")
+    matrix = stocks_repository.get_close_matrix(["AAPL"])
+
+    # A 10:1 split, with every stored tail being stale
+    adjusting.factor = 0.1
+    adjusting.calls.clear()
+    monkeypatch.setattr(stocks_repository, "_tail_age", lambda _interval: -1.0)
+    adjusted = stocks_repository.get_ticker_history("AAPL", "max", "1d")
+    assert adjusting.calls == [("AAPL", "1d"), ("AAPL", "1d")]
+    np.testing.assert_allclose(adjusted["Close"], history["Close"] * 0.1)
+
+    rebuilt = stocks_repository.get_close_matrix(["AAPL"])
+    np.testing.assert_allclose(rebuilt.closes[:, 0], matrix.closes[:, 0] * 0.1)
+
+    # Unchanged prices only fetch the tail
+    adjusting.calls.clear()
+    stocks_repository.get_ticker_history("AAPL", "max", "1d")
+    assert adjusting.calls == [("AAPL", "1d")]
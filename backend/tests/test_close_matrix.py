@@ -0,0 +1,71 @@
+"""Tests for the cached close-price matrices."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src import models
+from src.database import close_matrix, stocks_repository
+from src.database.bar_store import BAR_COLUMNS, TIMESTAMP_COLUMN
+from src.services import stocks_service
+
+from .conftest import CountingProvider
+
+
+def _bars(dates: list[str], close: list[float]) -> pd.DataFrame:
+    bars = pd.DataFrame({TIMESTAMP_COLUMN: pd.DatetimeIndex(dates).as_unit("ns").to_numpy().view(np.int64)})
+    for column in BAR_COLUMNS:
+        bars[column] = close
+    return bars
+
+
+def test_build_extends_previous_matrix() -> None:
+    """New bars replace the last known day and append the following ones, dates are aligned across symbols."""
+    previous = close_matrix.build(
+        {"A": _bars(["2025-01-02", "2025-01-03"], [1.0, 2.0]), "B": _bars(["2025-01-03"], [10.0])}
+    )
+    assert np.isnan(previous.closes[0, 1])
+
+    matrix = close_matrix.build(
+        {"A": _bars(["2025-01-03", "2025-01-06"], [2.5, 3.0]), "B": _bars(["2025-01-03"], [11.0])}, previous
+    )
+    assert pd.to_datetime(matrix.dates).strftime("%Y-%m-%d").tolist() == ["2025-01-02", "2025-01-03", "2025-01-06"]
+    np.testing.assert_array_equal(matrix.closes[:, 0], [1.0, 2.5, 3.0])
+    np.testing.assert_array_equal(matrix.closes[1:, 1], [11.0, np.nan])
+
+
+def test_matrix_is_persisted(tmp_path: Path) -> None:
+    """Matrices evicted from memory are read back from disk."""
+    cache = close_matrix.CloseMatrixCache(max_entries=1)
+    matrix = close_matrix.build({"A": _bars(["2025-01-02"], [1.0])})
+    cache.put(tmp_path, "a", matrix)
+    cache.put(tmp_path, "b", close_matrix.build({"B": _bars(["2025-01-02"], [2.0])}))
+
+    restored = close_matrix.CloseMatrixCache().get(tmp_path, "a")
+    assert restored is not None
+    assert restored.tickers == ["A"]
+    np.testing.assert_array_equal(restored.dates, matrix.dates)
+    np.testing.assert_array_equal(restored.closes, matrix.closes)
+
+
+def test_compare_views_reuse_the_matrix(provider: CountingProvider) -> None:
+    """Period switches are served from the cached matrix, stale matrices only read the new bars."""
+    responses = {
+        period: stocks_service.get_compare_growth(
+            models.CompareGrowthQuery(ticker_names=["AAPL,MSFT,INVALIDTICKER"], period=period)
+        )
+        for period in ("1y", "5y", "max", "1mo")
+    }
+    assert sorted(provider.calls) == [("AAPL", "1d"), ("INVALIDTICKER", "1d"), ("MSFT", "1d")]
+    for response in responses.values():
+        assert sorted(response.candles) == ["AAPL", "MSFT"]
+        assert response.candles["AAPL"][0] == 1.0
+        assert len(response.dates) == len(response.candles["MSFT"])
+    assert len(responses["1mo"].dates) < len(responses["1y"].dates) < len(responses["5y"].dates)
+
+    matrix = stocks_repository.get_close_matrix(["AAPL", "MSFT"])
+    matrix.refreshed_at = 0
+    refreshed = stocks_repository.get_close_matrix(["AAPL", "MSFT"])
+    np.testing.assert_array_equal(refreshed.dates, matrix.dates)
+    np.testing.assert_array_equal(refreshed.closes, matrix.closes)
@@ -0,0 +1,31 @@
+"""Tests for the point-budget downsampler."""
+
+import numpy as np
+
+from src.services.downsampling import downsample_indices
+
+
+def test_short_series_are_kept() -> None:
+    """Series within the budget are returned untouched."""
+    assert downsample_indices(np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_budget_and_extremes() -> None:
+    """The budget is respected, the ends and every series' extremes are kept."""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(2, 20_000)).cumsum(axis=1)
+    values[0, 12_345] = 1e6
+    values[1, 777] = -1e6
+
+    kept = downsample_indices(values, 500)
+    assert len(kept) <= 500  # noqa: PLR2004
+    assert (np.diff(kept) > 0).all()
+    assert {0, 19_999, 12_345, 777} <= set(kept.tolist())
+    assert values[0, kept].max() == values[0].max()
+    assert values[1, kept].min() == values[1].min()
+
+
+def test_more_series_than_budget() -> None:
+    """The budget holds even when it cannot fit the extremes of every series."""
+    values = np.random.default_rng(1).normal(size=(50, 1_000))
+    assert len(downsample_indices(values, 20)) == 20  # noqa: PLR2004
@@ -2,8 +2,11 @@ import io
 import json
 import time
 
+import numpy as np
 import requests
 
+from src.services.compare_to_index_service import CompareToIndexService
+
 BASE_URL = "http://localhost:5000/api"
 
 
@@ -42,19 +45,38 @@ def test_compare_to_index_works_end_to_end():
     assert len(filenames) > 0
     filename = filenames[-1]
 
-    # Call compare_to_index
-    payload = {"filename": filename, "index_ticker": "^GSPC"}
+    # Start the comparison to two indexes, then wait for its task
+    payload = {"filename": filename, "index_tickers": ["^GSPC", "^NDX"]}
     cmp = session.post(f"{BASE_URL}/etoro/compare_to_index", params=payload)
     assert cmp.status_code == 200, f"Compare failed: {cmp.text}"
-    data = cmp.json()
-    assert "dates" in data and "index_values" in data
-    assert len(data["dates"]) == len(data["index_values"]) > 10
-    assert any(v > 0 for v in data["index_values"])  # some value accumulated
+    task_id = cmp.json()["task_id"]
+    for _ in range(60):
+        status = session.get(f"{BASE_URL}/task_status/{task_id}").json()
+        if status["status"] in ("completed", "failed"):
+            break
+        time.sleep(1)
+    assert status["status"] == "completed", status.get("error")
+
+    data = session.get(f"{BASE_URL}/task_result/{task_id}").json()["result"]
+    assert data["query"]["index_tickers"] == ["^GSPC", "^NDX"]
+    assert set(data["index_values"]) == {"^GSPC", "^NDX"}
+    for index_values in data["index_values"].values():
+        assert len(data["dates"]) == len(index_values) > 10
+        assert any(v > 0 for v in index_values)  # some value accumulated
 
 
 def test_compare_to_index_not_found():
     session = _register_and_login_session()
-    payload = {"filename": "non-existent-file.xlsx", "index_ticker": "^GSPC"}
+    payload = {"filename": "non-existent-file.xlsx", "index_tickers": ["^GSPC"]}
     cmp = session.post(f"{BASE_URL}/etoro/compare_to_index", params=payload)
     assert cmp.status_code == 404, f"Expected 404 but got {cmp.status_code}"
     assert "not found" in cmp.json().get("message", "").lower()
+
+
+def test_index_investment_simulation():
+    """Each deposit buys index units at the price of its day, withdrawals are ignored."""
+    deposits = np.array([100.0, 100.0, 300.0, 250.0, 450.0])
+    prices = np.array([10.0, 20.0, 40.0, 40.0, 50.0])
+    values = CompareToIndexService.simulate_index_investment(deposits, prices)
+    # 10 units, then 5 more on the third day and 4 on the last one
+    np.testing.assert_allclose(values, [100.0, 200.0, 600.0, 600.0, 950.0])
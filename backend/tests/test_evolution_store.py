@@ -0,0 +1,120 @@
+"""Tests for the stored and incremental portfolio evolutions."""
+
+import shutil
+from dataclasses import replace
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.database import stocks_repository
+from src.database.evolution_store import EvolutionStore
+from src.database.statement_store import Statement, StatementStore, file_digest
+from src.services import etoro_data
+from src.services.holdings import Holdings
+
+STATEMENT_FILE = Path("tests/data/etoro-account-statement-12-31-2014-7-5-2025_TEST.xlsx")
+CUTOFF = pd.Timestamp(2025, 6, 1)
+
+
+class FixedStatements:
+    def __init__(self, statement: Statement) -> None:
+        self.statement = statement
+
+    def load(self, _path: Path) -> Statement:
+        return self.statement
+
+
+def record_holdings_starts(monkeypatch: pytest.MonkeyPatch) -> list[pd.Timestamp | None]:
+    """Record the start every evolution builds its holdings from (None for a full computation)."""
+    starts: list[pd.Timestamp | None] = []
+    build_holdings = etoro_data.build_holdings
+
+    def recording_build_holdings(
+        positions: pd.DataFrame, splits: pd.DataFrame, end: pd.Timestamp, start: pd.Timestamp | None = None
+    ) -> Holdings:
+        starts.append(start)
+        return build_holdings(positions, splits, end, start)
+
+    monkeypatch.setattr(etoro_data, "build_holdings", recording_build_holdings)
+    return starts
+
+
+@pytest.mark.usefixtures("provider")
+def test_newer_statement_extends_the_previous_evolution(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A newer statement of the account is only recomputed from its first new day, to the same values."""
+    statement = StatementStore(tmp_path / "statements").load(STATEMENT_FILE)
+    activity = statement.account_activity
+    closed = statement.closed_positions
+    older = replace(
+        statement,
+        account_activity=activity[activity["Date"] < CUTOFF].reset_index(drop=True),
+        closed_positions=closed[closed["Close Date"] < CUTOFF].reset_index(drop=True),
+    )
+    starts = record_holdings_starts(monkeypatch)
+    monkeypatch.setattr(etoro_data, "evolution_store", EvolutionStore(tmp_path / "evolutions"))
+
+    monkeypatch.setattr(etoro_data, "statement_store", FixedStatements(older))
+    etoro_data.extract_portfolio_evolution(STATEMENT_FILE, lambda _: None)
+    monkeypatch.setattr(etoro_data, "statement_store", FixedStatements(statement))
+    extended = etoro_data.extract_portfolio_evolution(STATEMENT_FILE, lambda _: None)
+
+    monkeypatch.setattr(etoro_data, "evolution_store", EvolutionStore(tmp_path / "other"))
+    full = etoro_data.extract_portfolio_evolution(STATEMENT_FILE, lambda _: None)
+
+    assert starts[0] is None
+    assert starts[1] is not None
+    assert starts[1] >= CUTOFF.floor("D") - pd.Timedelta(days=1)
+    assert starts[2] is None
+    assert extended.dates == full.dates
+    assert list(extended.parts) == list(full.parts)
+    for name, values in full.parts.items():
+        assert extended.parts[name] == pytest.approx(values, abs=1e-6), name
+
+
+@pytest.mark.usefixtures("provider")
+def test_users_do_not_share_account_evolutions(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A statement of the same account uploaded by another user is computed in full."""
+    statement = StatementStore(tmp_path / "statements").load(STATEMENT_FILE)
+    activity = statement.account_activity
+    older = replace(statement, account_activity=activity[activity["Date"] < CUTOFF].reset_index(drop=True))
+    files = {}
+    for user in ["alice", "bob"]:
+        (tmp_path / user).mkdir()
+        files[user] = shutil.copy(STATEMENT_FILE, tmp_path / user / STATEMENT_FILE.name)
+    starts = record_holdings_starts(monkeypatch)
+    monkeypatch.setattr(etoro_data, "evolution_store", EvolutionStore(tmp_path / "evolutions"))
+
+    monkeypatch.setattr(etoro_data, "statement_store", FixedStatements(older))
+    etoro_data.extract_portfolio_evolution(files["alice"], lambda _: None)
+    monkeypatch.setattr(etoro_data, "statement_store", FixedStatements(statement))
+    etoro_data.extract_portfolio_evolution(files["bob"], lambda _: None)
+    etoro_data.extract_portfolio_evolution(files["alice"], lambda _: None)
+
+    assert statement.account is not None
+    assert starts[0] is None
+    assert starts[1] is None
+    assert starts[2] is not None
+
+
+@pytest.mark.usefixtures("provider")
+def test_evolution_result_is_stored_until_new_bars(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The evolution of a statement is served again until its symbols get a newer bar or the computation changes."""
+    store = EvolutionStore(tmp_path / "evolutions")
+    monkeypatch.setattr(etoro_data, "evolution_store", store)
+    monkeypatch.setattr(etoro_data, "statement_store", StatementStore(tmp_path / "statements"))
+    assert etoro_data.stored_portfolio_evolution(STATEMENT_FILE) is None
+
+    evolution = etoro_data.extract_portfolio_evolution(STATEMENT_FILE, lambda _: None)
+    assert etoro_data.stored_portfolio_evolution(STATEMENT_FILE) == evolution
+
+    digest = file_digest(STATEMENT_FILE)
+    result = store.load_result(digest)
+    assert result is not None
+    assert result.symbols
+    assert result.market_date == stocks_repository.get_last_bar_date(result.symbols)
+
+    store.save_result(digest, replace(result, market_date="2020-01-01"))
+    assert etoro_data.stored_portfolio_evolution(STATEMENT_FILE) is None
+    store.save_result(digest, replace(result, version=etoro_data.EVOLUTION_VERSION + 1))
+    assert etoro_data.stored_portfolio_evolution(STATEMENT_FILE) is None
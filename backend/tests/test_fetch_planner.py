@@ -0,0 +1,83 @@
+"""Tests for the ticker fetch planner."""
+
+import pandas as pd
+import pytest
+
+from src.database import stocks_repository
+from src.services import fetch_planner
+
+from .conftest import CountingProvider
+
+
+@pytest.mark.parametrize(("period", "interval"), [("max", "1d"), ("1y", "auto"), ("5y", "1d")])
+def test_daily_chart_uses_one_base_series(provider: CountingProvider, period: str, interval: str) -> None:
+    """Daily charts are served from a single daily fetch, and from the store once warm."""
+    series = fetch_planner.load_ticker_series("AAPL", period, interval, [30, 100])
+    assert series is not None
+    assert series.interval == "1d"
+    assert provider.calls == [("AAPL", "1d")]
+
+    warm = fetch_planner.load_ticker_series("AAPL", period, interval, [30, 100])
+    assert warm is not None
+    assert provider.calls == [("AAPL", "1d")]
+    pd.testing.assert_frame_equal(warm.candles, series.candles)
+
+
+@pytest.mark.usefixtures("provider")
+def test_daily_series_covers_sma_warmup() -> None:
+    """The daily base series starts early enough for the longest SMA to be defined on the first candle."""
+    series = fetch_planner.load_ticker_series("MSFT", "1y", "1d", [30, 100])
+    assert series is not None
+    first_candle = series.candles["Date"].iloc[0]
+    assert (series.daily["Date"] < first_candle).sum() >= 100  # noqa: PLR2004
+
+
+def test_intraday_chart(provider: CountingProvider) -> None:
+    """Intraday candles need their own series next to the daily one used for the SMAs."""
+    series = fetch_planner.load_ticker_series("AAPL", "5d", "auto", [30, 100])
+    assert series is not None
+    assert series.interval != "1d"
+    assert "Datetime" in series.candles
+    assert sorted(provider.calls) == sorted([("AAPL", "1d"), ("AAPL", series.interval)])
+
+
+def test_max_period_picks_interval_from_first_trade(provider: CountingProvider) -> None:
+    """The first trade date and the coarse candles both come from the full daily series."""
+    series = fetch_planner.load_ticker_series("AAPL", "max", "auto", [30, 100])
+    assert series is not None
+    assert series.interval in {"1mo", "3mo"}
+    assert provider.calls == [("AAPL", "1d")]
+
+
+@pytest.mark.usefixtures("provider")
+def test_unknown_ticker() -> None:
+    """Tickers without any data yield no series."""
+    assert fetch_planner.load_ticker_series("INVALIDTICKER", "max", "auto", [30, 100]) is None
+
+
+def test_coarse_intervals_are_resampled(provider: CountingProvider) -> None:
+    """4h candles come from hourly bars, other intraday intervals from finer bars already stored."""
+    series = fetch_planner.load_ticker_series("AAPL", "1mo", "4h", [30, 100])
+    assert series is not None
+    assert sorted(provider.calls) == [("AAPL", "1d"), ("AAPL", "1h")]
+
+    fetch_planner.load_ticker_series("AAPL", "5d", "5m", [30, 100])
+    provider.calls.clear()
+    series = fetch_planner.load_ticker_series("AAPL", "5d", "15m", [30, 100])
+    assert series is not None
+    assert provider.calls == []
+    minutes = series.candles["Datetime"].dt.minute
+    assert minutes.isin([0, 15, 30, 45]).all()
+
+
+def test_prefetch_uses_one_bulk_request(provider: CountingProvider) -> None:
+    """Charts sharing a period are warmed with one bulk request, then load without upstream calls."""
+    ticker_names = ["AAPL", "MSFT", "GOOG", "INVALIDTICKER"]
+    fetch_planner.prefetch_ticker_series(ticker_names, "1y", "auto", [30, 100])
+    assert stocks_repository.get_upstream_stats()["executed"] == 1
+    assert sorted(provider.calls) == sorted((ticker_name, "1d") for ticker_name in ticker_names)
+
+    provider.calls.clear()
+    for ticker_name in ticker_names[:3]:
+        assert fetch_planner.load_ticker_series(ticker_name, "1y", "auto", [30, 100]) is not None
+    assert provider.calls == []
@@ -0,0 +1,43 @@
+"""Tests for the daily FX rate histories."""
+
+import pandas as pd
+import pytest
+
+from src.services import fx_rates
+
+from .conftest import CountingProvider
+
+
+def test_rate_histories_are_fetched_once(provider: CountingProvider) -> None:
+    """Every currency pair is fetched once in one bulk request, then read from the bar store."""
+    rates = fx_rates.get_usd_rates(["EUR", "EUR", "GBP", "USD"], "2024-01-01")
+    assert set(rates) == {"EUR", "GBP"}
+    assert sorted(provider.calls) == [("EURUSD=X", "1d"), ("GBPUSD=X", "1d")]
+    assert rates["EUR"].index.is_monotonic_increasing
+    assert rates["EUR"].index.tz is None
+
+    provider.calls.clear()
+    fx_rates.get_usd_rates(["EUR"], "2024-01-01")
+    assert provider.calls == []
+
+
+def test_prices_are_converted_with_the_rate_of_their_date() -> None:
+    """Each price takes the rate of its date, or the last one before it."""
+    rates = pd.Series([1.0, 2.0, 4.0], index=pd.DatetimeIndex(["2024-01-02", "2024-01-03", "2024-01-05"]))
+    prices = pd.Series(
+        [10.0, 10.0, 10.0, 10.0, 10.0],
+        index=pd.DatetimeIndex(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]),
+    )
+    assert fx_rates.to_usd(prices, rates).tolist() == [10.0, 10.0, 20.0, 20.0, 40.0]
+
+
+@pytest.mark.usefixtures("provider")
+def test_past_prices_are_not_converted_with_the_latest_rate() -> None:
+    """A price of a past day is converted with the rate of that day, read from the pair's history."""
+    rates = fx_rates.get_usd_rates(["EUR"], "2024-01-01")["EUR"]
+    day = pd.Timestamp("2024-06-03")
+    assert rates[day] != rates.iloc[-1]
+
+    usd = fx_rates.to_usd(pd.Series([100.0], index=pd.DatetimeIndex([day])), rates)
+    assert usd[day] == pytest.approx(100.0 * rates[day])
+    assert usd[day] != pytest.approx(100.0 * rates.iloc[-1])
@@ -0,0 +1,83 @@
+"""Tests for the per-symbol history fetch planning."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.database import market_data_provider, stocks_repository
+from src.database.market_data_provider import YahooProvider
+from src.services import history_planner
+
+from .conftest import CountingProvider
+
+
+def test_symbols_with_close_starts_are_grouped() -> None:
+    """Groups start at the earliest day of their symbols and never span more than GROUP_SPAN."""
+    starts = {
+        "MSFT": pd.Timestamp("2020-01-15 10:30"),
+        "AAPL": pd.Timestamp("2020-02-01 09:00"),
+        "NVDA": pd.Timestamp("2024-05-01 15:00"),
+        "BTC-USD": pd.Timestamp("2024-06-01 00:00"),
+    }
+    groups = history_planner.plan_groups(starts)
+    assert [(group.start, group.symbols) for group in groups] == [
+        (pd.Timestamp("2020-01-15"), ["MSFT", "AAPL"]),
+        (pd.Timestamp("2024-05-01"), ["NVDA", "BTC-USD"]),
+    ]
+
+
+def test_histories_start_at_their_group(provider: CountingProvider) -> None:
+    """Each symbol is fetched once from its group start, and reported as loaded."""
+    today = pd.Timestamp.today().normalize()
+    starts = {"AAPL": today - pd.Timedelta(days=3000), "MSFT": today - pd.Timedelta(days=30)}
+    progress: list[tuple[str, int, int]] = []
+
+    histories = history_planner.load_daily_histories(starts, lambda *args: progress.append(args))
+
+    assert sorted(provider.calls) == [("AAPL", "1d"), ("MSFT", "1d")]
+    assert histories["MSFT"]["Date"].min().tz_localize(None) >= starts["MSFT"]
+    assert histories["AAPL"]["Date"].min().tz_localize(None) < starts["MSFT"]
+    assert sorted(symbol for symbol, _, _ in progress) == ["AAPL", "MSFT"]
+    assert [(loaded, count) for _, loaded, count in progress] == [(1, 2), (2, 2)]
+
+
+class ExclusiveTickers:
+    """Stand-in for ``yf.Tickers`` whose bulk downloads fail when they overlap, like yfinance's shared globals."""
+
+    active = 0
+    lock = threading.Lock()
+
+    def __init__(self, ticker_names: list[str]) -> None:
+        self.ticker_names = ticker_names
+
+    def history(self, **_kwargs: object) -> pd.DataFrame:
+        with ExclusiveTickers.lock:
+            ExclusiveTickers.active += 1
+            overlapping = ExclusiveTickers.active > 1
+        try:
+            if overlapping:
+                msg = "concurrent bulk download"
+                raise RuntimeError(msg)
+            time.sleep(0.05)
+            dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=5)
+            columns = pd.MultiIndex.from_product([["Open", "High", "Low", "Close", "Volume"], self.ticker_names])
+            return pd.DataFrame(1.0, index=dates, columns=columns)
+        finally:
+            with ExclusiveTickers.lock:
+                ExclusiveTickers.active -= 1
+
+
+@pytest.mark.usefixtures("provider")
+def test_bulk_downloads_do_not_overlap(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Groups are loaded concurrently, but the yfinance bulk downloads run one at a time."""
+    monkeypatch.setattr(market_data_provider.yf, "Tickers", ExclusiveTickers)
+    monkeypatch.setattr(stocks_repository, "provider", YahooProvider())
+    today = pd.Timestamp.today().normalize()
+    starts = {f"T{group}{index}": today - pd.Timedelta(days=200 * group) for group in range(4) for index in range(2)}
+
+    histories = history_planner.load_daily_histories(starts)
+
+    assert len(history_planner.plan_groups(starts)) == 4  # noqa: PLR2004
+    assert sorted(histories) == sorted(starts)
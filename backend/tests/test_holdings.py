@@ -0,0 +1,72 @@
+"""Tests for the daily holdings matrix."""
+
+import numpy as np
+import pandas as pd
+
+from src.services.holdings import build_holdings, parse_splits
+
+
+def test_holdings_are_cumulative_split_adjusted_shares() -> None:
+    """Units are summed per day, split-adjusted before the split and accumulated by instrument."""
+    positions = pd.DataFrame(
+        {
+            "Type": ["Open Position", "Open Position", "Open Position", "Position closed"],
+            "Details": ["NVDA/USD", "AAPL/USD", "NVDA/USD", "NVDA/USD"],
+            "Units / Contracts": [1.0, 2.0, 3.0, 4.0],
+        },
+        index=pd.DatetimeIndex(
+            ["2024-06-01 10:00", "2024-06-02 11:00", "2024-06-02 15:00", "2024-06-05 09:00"], name="Date"
+        ),
+    )
+    splits = pd.DataFrame(
+        {"Details": ["NVDA/USD Split 10:1"], "Factor": [10.0]},
+        index=pd.DatetimeIndex(["2024-06-03 08:00"], name="Date"),
+    )
+
+    holdings = build_holdings(positions, splits, pd.Timestamp("2024-06-06"))
+
+    assert holdings.instruments == ["NVDA/USD", "AAPL/USD"]
+    assert list(holdings.dates) == list(pd.date_range("2024-06-01", "2024-06-06"))
+    np.testing.assert_allclose(holdings.shares[:, 0], [10, 40, 40, 40, 36, 36])
+    np.testing.assert_allclose(holdings.shares[:, 1], [0, 2, 2, 2, 2, 2])
+
+
+def test_no_positions() -> None:
+    """A statement without positions has empty holdings."""
+    positions = pd.DataFrame(
+        {"Type": [], "Details": [], "Units / Contracts": []}, index=pd.DatetimeIndex([], name="Date")
+    )
+    splits = pd.DataFrame({"Details": [], "Factor": []}, index=pd.DatetimeIndex([], name="Date"))
+    holdings = build_holdings(positions, splits, pd.Timestamp("2024-06-06"))
+    assert holdings.instruments == []
+    assert holdings.frame().empty
+
+
+def test_parse_splits() -> None:
+    """Split ratios are read from the details, repeated rows are counted once."""
+    activity = pd.DataFrame(
+        {"Details": ["NVDA/USD Split 10:1", "NVDA/USD Split 10:1", "Split 4:1", "AAPL/USD Split"]},
+        index=pd.DatetimeIndex(["2024-06-10", "2024-06-10", "2020-08-31", "2020-08-31"], name="Date"),
+    )
+    splits = parse_splits(activity)
+    assert splits["Details"].tolist() == ["NVDA/USD Split 10:1", "Split 4:1", "AAPL/USD Split"]
+    assert splits["Factor"].tolist() == [10.0, 4.0, 1.0]
+
+
+def test_successive_splits() -> None:
+    """Units are multiplied by the factors of all the splits after their day."""
+    positions = pd.DataFrame(
+        {"Type": ["Open Position"] * 3, "Details": ["TSLA/USD"] * 3, "Units / Contracts": [1.0, 1.0, 1.0]},
+        index=pd.DatetimeIndex(["2020-01-01", "2021-01-01", "2023-01-01"], name="Date"),
+    )
+    splits = parse_splits(
+        pd.DataFrame(
+            {"Details": ["TSLA/USD Split 3:1", "TSLA/USD Split 5:1"]},
+            index=pd.DatetimeIndex(["2022-08-25", "2020-08-31"], name="Date"),
+        )
+    )
+    holdings = build_holdings(positions, splits, pd.Timestamp("2023-01-01"))
+    shares = holdings.frame()["TSLA/USD"]
+    assert shares["2020-01-01"] == 15  # noqa: PLR2004
+    assert shares["2021-01-01"] == 18  # noqa: PLR2004
+    assert shares["2023-01-01"] == 19  # noqa: PLR2004
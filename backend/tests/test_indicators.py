@@ -0,0 +1,58 @@
+"""Tests for the indicator engine and its stored state."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.database import indicator_store
+from src.database.bar_store import BAR_COLUMNS, TIMESTAMP_COLUMN, BarStore
+from src.services import indicators
+
+
+def _bars(dates: pd.DatetimeIndex, close: np.ndarray) -> pd.DataFrame:
+    bars = pd.DataFrame({TIMESTAMP_COLUMN: dates.as_unit("ns").to_numpy().view(np.int64)})
+    for column in BAR_COLUMNS:
+        bars[column] = close
+    return bars
+
+
+def test_sma_and_ema_match_pandas() -> None:
+    """Running-sum SMAs and continued EMAs match pandas rolling / ewm results."""
+    closes = np.random.default_rng(0).uniform(50, 150, 500)
+    positions = np.arange(-1, 500)
+    sums = indicator_store.running_sum(closes)
+    for window in (1, 30, 100):
+        expected = pd.Series(closes).rolling(window).mean().to_numpy()
+        np.testing.assert_allclose(indicators.sma(sums, window, positions)[1:], expected)
+    assert np.isnan(indicators.sma(sums, 30, positions)[0])
+
+    full = indicator_store.ema(closes, 20)
+    np.testing.assert_allclose(full, pd.Series(closes).ewm(span=20, adjust=False).mean().to_numpy())
+    np.testing.assert_allclose(indicator_store.ema(closes[300:], 20, full[299]), full[300:])
+
+
+def test_align() -> None:
+    """Each moment is matched with the last key at or before it."""
+    keys = np.array([10, 20, 30])
+    assert indicators.align(keys, np.array([5, 10, 25, 40])).tolist() == [-1, 0, 1, 2]
+
+
+def test_state_is_extended_incrementally(tmp_path: Path) -> None:
+    """New and revised bars extend the stored state to what a full recomputation gives."""
+    store = BarStore(tmp_path)
+    dates = pd.bdate_range("2024-01-01", periods=300)
+    closes = np.random.default_rng(1).uniform(50, 150, 300)
+    store.write("AAPL", "1d", _bars(dates[:250], closes[:250]), start=None)
+    first = indicator_store.load_state(store, "AAPL", "1d", [20])
+    assert len(first) == 250  # noqa: PLR2004
+
+    # A revised last bar and 50 new ones
+    closes[249] += 1
+    store.write("AAPL", "1d", _bars(dates[249:], closes[249:]), start=None)
+    extended = indicator_store.load_state(store, "AAPL", "1d", [20, 50])
+
+    np.testing.assert_allclose(extended[indicator_store.SUM_COLUMN], np.cumsum(closes))
+    for window in (20, 50):
+        np.testing.assert_allclose(extended[indicator_store.ema_column(window)], indicator_store.ema(closes, window))
+    pd.testing.assert_frame_equal(indicator_store.load_state(store, "AAPL", "1d", [20]), extended)
@@ -0,0 +1,107 @@
+"""Tests for the offline market data provider."""
+
+from pathlib import Path
+
+import pandas as pd
+
+from src.database.offline_provider import OfflineProvider, RecordingProvider, synthetic_history
+
+OFFLINE_FOLDER = Path("data/offline")
+
+
+def test_synthetic_history_is_deterministic() -> None:
+    """The same request returns the same bars, and overlapping ranges agree."""
+    provider = OfflineProvider(OFFLINE_FOLDER)
+    first = provider.history("AAPL", "1d", pd.Timestamp("2024-01-01"), pd.Timestamp("2024-06-01"))
+    second = provider.history("AAPL", "1d", pd.Timestamp("2024-01-01"), pd.Timestamp("2024-06-01"))
+    later = provider.history("AAPL", "1d", pd.Timestamp("2024-03-01"), pd.Timestamp("2024-06-01"))
+
+    assert not first.empty
+    pd.testing.assert_frame_equal(first, second)
+    pd.testing.assert_frame_equal(first.loc[later.index], later)
+    assert (first["High"] >= first[["Open", "Close"]].max(axis=1)).all()
+    assert (first["Low"] <= first[["Open", "Close"]].min(axis=1)).all()
+
+
+def test_unknown_symbols_have_no_data() -> None:
+    """Symbols outside symbols.csv behave like unknown Yahoo tickers."""
+    provider = OfflineProvider(OFFLINE_FOLDER)
+    assert provider.history("INVALIDTICKER", "1d").empty
+    assert provider.info("INVALIDTICKER") == {}
+    assert provider.bulk_history(["AAPL", "INVALIDTICKER"], "1d", pd.Timestamp("2025-01-01")).keys() == {"AAPL"}
+
+
+def test_info_search_and_fx() -> None:
+    """Info, search and FX answers have the shape the services expect."""
+    provider = OfflineProvider(OFFLINE_FOLDER)
+    info = provider.info("AAPL")
+    assert info["longName"] == "Apple Inc."
+    assert info["currentPrice"] > 0
+    assert info["marketCap"] > 0
+
+    quotes = provider.search("apple")
+    assert [quote["symbol"] for quote in quotes] == ["AAPL"]
+
+    assert 0.5 < provider.fx_rate("EUR") < 2  # noqa: PLR2004
+    assert provider.fx_rate("USD") == 1.0
+
+
+def test_intraday_history_is_limited_to_sessions() -> None:
+    """Synthetic intraday bars only exist during US trading hours."""
+    provider = OfflineProvider(OFFLINE_FOLDER)
+    history = provider.history("AAPL", "1h", pd.Timestamp.now() - pd.Timedelta(days=10))
+    local = history.index.tz_convert("America/New_York")
+    assert not history.empty
+    assert (local.dayofweek < 5).all()  # noqa: PLR2004
+
+
+def test_recorded_data_is_replayed(tmp_path: Path) -> None:
+    """Data recorded through RecordingProvider is served back by OfflineProvider."""
+    recorder = RecordingProvider(OfflineProvider(OFFLINE_FOLDER), tmp_path)
+    history = recorder.history("MSFT", "1d", pd.Timestamp("2025-01-01"), pd.Timestamp("2025-02-01"))
+    info = recorder.info("MSFT")
+    quotes = recorder.search("micro")
+    rate = recorder.fx_rate("GBP")
+
+    replay = OfflineProvider(tmp_path)
+    replayed = replay.history("MSFT", "1d")
+    assert replayed["Close"].tolist() == history["Close"].tolist()
+    assert replay.info("MSFT") == info
+    assert replay.search("micro") == quotes
+    assert replay.fx_rate("GBP") == rate
+
+
+def test_intraday_prices_match_daily_prices() -> None:
+    """Intraday and daily bars of a symbol follow the same price path."""
+    provider = OfflineProvider(OFFLINE_FOLDER)
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=10)
+    daily = provider.history("AAPL", "1d", start)
+    hourly = provider.history("AAPL", "1h", start)
+    assert abs(hourly["Close"].mean() / daily["Close"].mean() - 1) < 0.1  # noqa: PLR2004
+
+
+class AnyTickerProvider(OfflineProvider):
+    """Answer for any ticker name, like a permissive upstream."""
+
+    def history(
+        self, ticker_name: str, interval: str, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None
+    ) -> pd.DataFrame:
+        return synthetic_history(ticker_name, interval, start, end)
+
+    def info(self, ticker_name: str) -> dict:
+        return {"symbol": ticker_name}
+
+
+def test_ticker_names_are_not_joined_into_paths(tmp_path: Path) -> None:
+    """Ticker names outside the symbol pattern have no data and are never recorded."""
+    root = tmp_path / "offline"
+    (tmp_path / "SECRET.json").write_text('{"symbol": "SECRET"}')
+    provider = OfflineProvider(root)
+    assert provider.info("../../secret") == {}
+    assert provider.history("..", "1d").empty
+    assert provider.analyst_price_targets("../../etc/passwd") == {}
+
+    recorder = RecordingProvider(AnyTickerProvider(OFFLINE_FOLDER), root)
+    assert not recorder.history("../../escaped", "1d", pd.Timestamp("2025-01-01")).empty
+    assert recorder.info("../escaped") == {"symbol": "../escaped"}
+    assert sorted(path.name for path in tmp_path.rglob("*")) == ["SECRET.json"]
@@ -0,0 +1,89 @@
+"""Tests for the precomputed popular search responses."""
+
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from src import models
+from src.database.popular_search_store import PopularSearchStore
+from src.services import popular_searches
+from src.services.popular_searches import PopularSearches
+
+
+def search(calls: list[str]) -> Callable[[str], list[models.Quote]]:
+    def run(query: str) -> list[models.Quote]:
+        calls.append(query)
+        return [models.Quote(symbol=query.upper(), long_name=f"{query} Inc.", today_change=0.01)]
+
+    return run
+
+
+def test_hot_queries_are_precomputed(tmp_path: Path) -> None:
+    """Queries searched often enough are served from the refreshed responses."""
+    popular = PopularSearches(PopularSearchStore(tmp_path / "popular.json"), top=2)
+    for query in ["btc", "BTC ", "aapl", "aapl", "aapl", "msft", "msft", "tsla"]:
+        popular.record(query)
+    assert popular.hot_queries() == ["aapl", "btc"]
+    assert popular.get("aapl") is None
+
+    calls: list[str] = []
+    popular.refresh(search(calls))
+    assert calls == ["aapl", "btc"]
+    assert popular.get(" AAPL")[0].symbol == "AAPL"
+    assert popular.get("msft") is None
+    assert popular.stats() == {"hits": 1, "misses": 2, "refreshes": 1, "tracked": 3, "precomputed": 2}
+
+
+def test_hot_set_survives_restarts(tmp_path: Path) -> None:
+    """The hot set and its responses are loaded back, and served before the first refresh."""
+    popular = PopularSearches(PopularSearchStore(tmp_path / "popular.json"))
+    for _ in range(5):
+        popular.record("bitcoin")
+    popular.refresh(search([]))
+
+    restarted = PopularSearches(PopularSearchStore(tmp_path / "popular.json"))
+    assert restarted.get("bitcoin") == popular.get("bitcoin")
+    assert restarted.hot_queries() == ["bitcoin"]
+
+
+def test_counts_decay(tmp_path: Path) -> None:
+    """Queries no longer searched leave the hot set."""
+    popular = PopularSearches(PopularSearchStore(tmp_path / "popular.json"))
+    popular.record("gme")
+    popular.record("gme")
+    calls: list[str] = []
+    popular.refresh(search(calls))
+    popular.refresh(search(calls))
+    assert calls == ["gme"]
+    assert popular.get("gme") is None
+
+
+def test_warmer_is_started_once(tmp_path: Path) -> None:
+    """Starting the refresh thread again, e.g. on every request, does not start another one."""
+    popular = PopularSearches(PopularSearchStore(tmp_path / "popular.json"))
+    popular.record("nvda")
+    popular.record("nvda")
+    calls: list[str] = []
+    for _ in range(3):
+        popular.start(search(calls), interval=3600)
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert calls == ["nvda"]
+
+
+def test_least_searched_queries_are_trimmed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Past the tracking limit and its slack, only the most searched queries are kept tracked."""
+    monkeypatch.setattr(popular_searches, "MAX_TRACKED_QUERIES", 3)
+    monkeypatch.setattr(popular_searches, "TRIM_SLACK", 2)
+    popular = PopularSearches(PopularSearchStore(tmp_path / "popular.json"))
+    for query in ["aapl", "aapl", "msft", "msft", "tsla", "tsla", "a", "b"]:
+        popular.record(query)
+    assert popular.stats()["tracked"] == 5  # noqa: PLR2004
+
+    popular.record("c")
+    assert popular.stats()["tracked"] == 3  # noqa: PLR2004
+    assert popular.hot_queries() == ["aapl", "msft", "tsla"]
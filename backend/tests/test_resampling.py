@@ -0,0 +1,76 @@
+"""Tests for the resampling of stored bars into coarser intervals."""
+
+import numpy as np
+import pandas as pd
+
+from src.database.bar_store import BAR_COLUMNS, TIMESTAMP_COLUMN
+from src.database.resampling import period_start, resample
+
+
+def _bars(dates: pd.DatetimeIndex) -> pd.DataFrame:
+    close = np.arange(1, len(dates) + 1, dtype=np.float64)
+    return pd.DataFrame(
+        {
+            TIMESTAMP_COLUMN: dates.as_unit("ns").to_numpy().view(np.int64),
+            "Open": close - 0.5,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Volume": np.full(len(dates), 10.0),
+        }
+    )
+
+
+def _dates(resampled: pd.DataFrame) -> list[str]:
+    return pd.to_datetime(resampled[TIMESTAMP_COLUMN], unit="ns").dt.strftime("%Y-%m-%d %H:%M").tolist()
+
+
+def test_weekly_and_monthly_ohlc() -> None:
+    """Weekly bars start on Monday, monthly bars on the 1st, with OHLCV aggregated per bucket."""
+    bars = _bars(pd.bdate_range("2025-01-29", "2025-02-11"))
+
+    weekly = resample(bars, "1wk")
+    assert _dates(weekly) == ["2025-01-27 00:00", "2025-02-03 00:00", "2025-02-10 00:00"]
+    assert weekly["Open"].tolist() == [0.5, 3.5, 8.5]
+    assert weekly["High"].tolist() == [4.0, 9.0, 11.0]
+    assert weekly["Low"].tolist() == [0.0, 3.0, 8.0]
+    assert weekly["Close"].tolist() == [3.0, 8.0, 10.0]
+    assert weekly["Volume"].tolist() == [30.0, 50.0, 20.0]
+
+    monthly = resample(bars, "1mo")
+    assert _dates(monthly) == ["2025-01-01 00:00", "2025-02-01 00:00"]
+    assert monthly["Close"].tolist() == [3.0, 10.0]
+
+    quarterly = resample(_bars(pd.bdate_range("2025-03-28", "2025-04-02")), "3mo")
+    assert _dates(quarterly) == ["2025-01-01 00:00", "2025-04-01 00:00"]
+    assert list(quarterly.columns) == [TIMESTAMP_COLUMN, *BAR_COLUMNS]
+
+
+def test_5d_buckets_do_not_depend_on_the_first_bar_read() -> None:
+    """5d bars group the sessions of each week, whichever session the read range starts on."""
+    dates = pd.bdate_range("2025-01-29", "2025-02-18")
+    full = resample(_bars(dates), "5d")
+    later = resample(_bars(dates[4:]), "5d")
+    assert _dates(full) == ["2025-01-27 00:00", "2025-02-03 00:00", "2025-02-10 00:00", "2025-02-17 00:00"]
+    assert _dates(later) == _dates(full)[1:]
+    assert full["Close"].tolist() == [3.0, 8.0, 13.0, 15.0]
+    assert later["Close"].tolist() == [4.0, 9.0, 11.0]
+    assert period_start(pd.Timestamp("2025-02-05"), "5d") == pd.Timestamp("2025-02-03")
+
+
+def test_intraday_buckets_follow_sessions() -> None:
+    """4h bars are anchored on each session open, in the exchange timezone."""
+    sessions = [pd.date_range(f"2025-07-0{day} 09:30", periods=7, freq="1h", tz="America/New_York") for day in (1, 2)]
+    hourly = pd.DatetimeIndex(sessions[0].append(sessions[1])).tz_convert("UTC").tz_localize(None)
+
+    four_hours = resample(_bars(hourly), "4h", "America/New_York")
+    assert _dates(four_hours) == ["2025-07-01 13:30", "2025-07-01 17:30", "2025-07-02 13:30", "2025-07-02 17:30"]
+    assert four_hours["Open"].tolist() == [0.5, 4.5, 7.5, 11.5]
+    assert four_hours["Close"].tolist() == [4.0, 7.0, 11.0, 14.0]
+
+
+def test_period_start() -> None:
+    """Resampled ranges are widened to the start of the bucket holding the requested start."""
+    assert period_start(pd.Timestamp("2025-07-10 15:00"), "1wk") == pd.Timestamp("2025-07-07")
+    assert period_start(pd.Timestamp("2025-08-20"), "3mo") == pd.Timestamp("2025-07-01")
+    assert period_start(pd.Timestamp("2025-08-20 14:00", tz="UTC"), "4h") == pd.Timestamp("2025-08-20")
@@ -0,0 +1,56 @@
+"""Tests for the prefix-aware search cache."""
+
+from collections.abc import Callable
+
+from src.database.search_cache import UPSTREAM_PAGE_SIZE, SearchCache
+
+NAMES = [
+    "Apple Inc.",
+    "Applied Materials",
+    "AppLovin",
+    "Apollo Global",
+    "Appian",
+    "Apple Hospitality",
+    "Appen",
+    "AppFolio",
+]
+
+
+def upstream(calls: list[str]) -> Callable[[str], list[dict]]:
+    def load(query: str) -> list[dict]:
+        calls.append(query)
+        matches = [name for name in NAMES if query.lower() in name.lower()]
+        return [{"symbol": name[:4].upper(), "longname": name} for name in matches][:UPSTREAM_PAGE_SIZE]
+
+    return load
+
+
+def test_longer_queries_are_refined_locally() -> None:
+    """Typing after a cached prefix is served from the cached quotes while enough of them match."""
+    cache = SearchCache()
+    calls: list[str] = []
+    load = upstream(calls)
+    assert len(cache.get("ap", load)) == UPSTREAM_PAGE_SIZE
+    assert [quote["longname"] for quote in cache.get("app", load)] == [name for name in NAMES if "app" in name.lower()]
+    assert len(cache.get("appl", load)) == 4
+    assert calls == ["ap"]
+
+    # Too few refined quotes out of a full page: upstream may know more
+    assert [quote["longname"] for quote in cache.get("apple", load)] == ["Apple Inc.", "Apple Hospitality"]
+    assert calls == ["ap", "apple"]
+    # Fewer quotes than a page are the complete answer, refining it is exact
+    assert [quote["longname"] for quote in cache.get("apple h", load)] == ["Apple Hospitality"]
+    assert cache.get("APPLE", load) == cache.get("apple", load)
+    assert calls == ["ap", "apple"]
+    assert cache.stats() == {"hits": 2, "prefix_hits": 3, "misses": 2, "entries": 2}
+
+
+def test_cache_is_bounded() -> None:
+    """The least recently used queries are evicted."""
+    cache = SearchCache(max_entries=2)
+    calls: list[str] = []
+    load = upstream(calls)
+    for query in ["zx", "zy", "zx", "zz", "zx", "zy"]:
+        cache.get(query, load)
+    assert calls == ["zx", "zy", "zz", "zy"]
+    assert cache.stats()["entries"] == 2
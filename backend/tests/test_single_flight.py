@@ -0,0 +1,92 @@
+"""Tests for single-flight call coalescing."""
+
+import threading
+import time
+
+import pytest
+
+from src.database.single_flight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced() -> None:
+    """Concurrent calls with the same key run the function once and share its result."""
+    flights = SingleFlight()
+    executions = 0
+    release = threading.Event()
+
+    def fetch() -> str:
+        nonlocal executions
+        executions += 1
+        release.wait()
+        return "bars"
+
+    results: list[str] = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("AAPL", fetch))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    while flights.stats()["calls"] < len(threads):
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert executions == 1
+    assert results == ["bars"] * 10
+    assert flights.stats() == {"calls": 10, "executed": 1, "coalesced": 9, "in_flight": 0}
+
+
+def test_different_keys_are_not_coalesced() -> None:
+    """Calls with different keys each run."""
+    flights = SingleFlight()
+    assert flights.do("AAPL", lambda: 1) == 1
+    assert flights.do("GOOG", lambda: 2) == 2
+    assert flights.do("AAPL", lambda: 3) == 3
+    assert flights.stats()["executed"] == 3
+
+
+def test_errors_are_shared_with_waiters() -> None:
+    """Waiters see the exception raised by the shared call, and the key can be retried afterwards."""
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing() -> None:
+        started.set()
+        release.wait()
+        msg = "rate limited"
+        raise RuntimeError(msg)
+
+    errors: list[Exception] = []
+
+    def waiter() -> None:
+        try:
+            flights.do("AAPL", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=waiter)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=waiter)
+    follower.start()
+    while flights.stats()["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    assert flights.do("AAPL", lambda: "ok") == "ok"
+
+
+def test_errors_propagate_to_leader() -> None:
+    """The caller that ran the function gets its exception."""
+    flights = SingleFlight()
+
+    def failing() -> None:
+        msg = "boom"
+        raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="boom"):
+        flights.do("AAPL", failing)
+    assert flights.stats()["in_flight"] == 0
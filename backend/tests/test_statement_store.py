@@ -0,0 +1,108 @@
+"""Tests for the parsed statement cache."""
+
+import shutil
+import zipfile
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+from defusedxml import EntitiesForbidden
+
+from src.database import statement_store
+from src.database.statement_store import StatementStore
+from src.database.xlsx_reader import XlsxReader
+
+STATEMENT_FILE = Path("tests/data/etoro-account-statement-12-31-2014-7-5-2025_TEST.xlsx")
+DATE = pd.Timestamp(2024, 1, 2, 3, 4, 5)
+
+
+def test_statement_is_parsed_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sheets are parsed into typed columns once per content, whatever the file name."""
+    store = StatementStore(tmp_path / "statements")
+    statement = store.load(STATEMENT_FILE)
+    activity = statement.account_activity
+    assert pd.api.types.is_datetime64_dtype(activity["Date"])
+    assert pd.api.types.is_float_dtype(activity["Units / Contracts"])
+    assert pd.api.types.is_datetime64_dtype(statement.closed_positions["Close Date"])
+    assert len(statement.closed_positions) > 0
+    assert statement.account == "test_user"
+
+    def read_statement(_path: Path) -> dict:
+        msg = "parsed again"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(statement_store, "read_statement", read_statement)
+    renamed = tmp_path / "renamed.xlsx"
+    shutil.copy(STATEMENT_FILE, renamed)
+    cached = store.load(renamed)
+    assert cached.digest == statement.digest
+    pd.testing.assert_frame_equal(cached.account_activity, activity)
+
+
+def test_other_workbooks_are_rejected(tmp_path: Path) -> None:
+    """Workbooks without the statement sheets fail with a readable error."""
+    workbook = tmp_path / "other.xlsx"
+    pd.DataFrame({"a": [1]}).to_excel(workbook, sheet_name="Sheet1")
+    with pytest.raises(ValueError, match="missing sheets: Account Activity, Closed Positions"):
+        StatementStore(tmp_path / "statements").load(workbook)
+
+
+def test_statement_matches_full_workbook_read() -> None:
+    """The streamed columns hold the same values as a full read of the workbook."""
+    sheets = statement_store.read_statement(STATEMENT_FILE)
+    full = pd.read_excel(STATEMENT_FILE, sheet_name=list(statement_store.SHEETS))
+    for name, (_, columns) in statement_store.SHEETS.items():
+        expected = full[name][list(columns)].dropna(how="all").reset_index(drop=True)
+        for column, kind in columns.items():
+            if kind == statement_store.DATE:
+                expected[column] = statement_store.column_date_to_timestamp(expected[column])
+            elif kind == statement_store.NUMBER:
+                expected[column] = pd.to_numeric(expected[column], errors="coerce")
+            else:
+                expected[column] = expected[column].map(lambda value: None if pd.isna(value) else str(value))
+        pd.testing.assert_frame_equal(sheets[name], expected, check_dtype=False)
+
+
+def test_xlsx_reader_cell_types(tmp_path: Path) -> None:
+    """Strings, numbers, dates and sparse cells are read by column."""
+    path = tmp_path / "cells.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    assert sheet is not None
+    sheet.title = "Data"
+    sheet.append(["Name", "Count", None, "Price", "Date"])
+    sheet.append(["AAPL", 3, "skipped", 1.5, DATE.to_pydatetime()])
+    sheet.append([None, None, "skipped", 2.0, None])
+    workbook.save(path)
+
+    with XlsxReader(path) as reader:
+        assert reader.sheet_names == ["Data"]
+        assert reader.header("Data") == ["Name", "Count", None, "Price", "Date"]
+        rows = list(reader.rows("Data", [4, 0, 1, 3]))
+    assert rows[0] == (DATE.to_pydatetime(), "AAPL", 3, 1.5)
+    assert rows[1] == (None, None, None, 2.0)
+
+
+def test_xlsx_reader_rejects_entities(tmp_path: Path) -> None:
+    """Sheets declaring XML entities (e.g. billion laughs) are not parsed."""
+    plain = tmp_path / "plain.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    assert sheet is not None
+    sheet.title = "Data"
+    sheet.append(["Name"])
+    sheet.append(["AAPL"])
+    workbook.save(plain)
+
+    path = tmp_path / "entities.xlsx"
+    with zipfile.ZipFile(plain) as source, zipfile.ZipFile(path, "w") as target:
+        for item in source.infolist():
+            data = source.read(item)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = data.replace(b"<worksheet", b'<!DOCTYPE worksheet [<!ENTITY a "aaaa">]><worksheet', 1)
+            target.writestr(item, data)
+
+    with pytest.raises(ValueError, match="Unable to read workbook") as error:
+        XlsxReader(path)
+    assert isinstance(error.value.__cause__, EntitiesForbidden)
@@ -1,9 +1,14 @@
 import io
+import json
 import time
 
 import pytest
 import requests
 
+from src.database.evolution_store import EvolutionStore
+from src.database.statement_store import StatementStore
+from src.services import etoro_data
+
 BASE_URL = "http://localhost:5000/api"
 
 
@@ -83,6 +88,73 @@ def test_sma_calculation_respects_period() -> None:
         assert sma_30_values[period] > 0, f"SMA value should be positive for period {period}"
 
 
+def test_get_ticker_custom_moving_averages() -> None:
+    """SMA and EMA windows can be picked with the smas / emas query parameters."""
+    response = requests.get(
+        f"{BASE_URL}/ticker/",
+        params={"ticker_name": "AAPL", "period": "1y", "smas": [10, 50, 200], "emas": [20]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(data["smas"]) == ["10", "200", "50"]
+    assert list(data["emas"]) == ["20"]
+    assert len(data["emas"]["20"]) == len(data["candles"])
+    assert all(value > 0 for value in data["smas"]["200"])
+
+
+def test_get_ticker_max_points() -> None:
+    """max_points bounds the number of candles while keeping the extremes."""
+    params = {"ticker_name": "AAPL", "period": "max", "interval": "1d"}
+    full = requests.get(f"{BASE_URL}/ticker/", params=params).json()
+    response = requests.get(f"{BASE_URL}/ticker/", params={**params, "max_points": 200})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["candles"]) <= 200 < len(full["candles"])  # noqa: PLR2004
+    assert len(data["dates"]) == len(data["smas"]["30"]) == len(data["candles"])
+    assert max(data["candles"]) == max(full["candles"])
+    assert min(data["candles"]) == min(full["candles"])
+
+
+def strict_json(text: str) -> dict:
+    def reject(constant: str) -> None:
+        msg = f"{constant} is not valid JSON"
+        raise ValueError(msg)
+
+    return json.loads(text, parse_constant=reject)
+
+
+def test_full_history_is_valid_json() -> None:
+    """Candles before the moving average warm-up are left out rather than sent with NaN averages."""
+    params = {"ticker_name": "AAPL", "period": "max", "interval": "1d", "smas": [30, 100], "emas": [20]}
+    response = requests.get(f"{BASE_URL}/ticker/", params=params)
+    assert response.status_code == 200
+    data = strict_json(response.text)
+    assert len(data["dates"]) == len(data["candles"]) == len(data["smas"]["100"]) == len(data["emas"]["20"]) > 0
+
+    response = requests.get(f"{BASE_URL}/tickers/", params={**params, "ticker_names": "AAPL,GOOG"})
+    assert response.status_code == 200
+    assert sorted(strict_json(response.text)["tickers"]) == ["AAPL", "GOOG"]
+
+
+def test_get_tickers_batch() -> None:
+    """Several tickers are returned at once, unknown ones are reported as errors."""
+    response = requests.get(
+        f"{BASE_URL}/tickers/",
+        params={"ticker_names": "AAPL,GOOG,INVALIDTICKER", "period": "1y", "max_points": 100},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(data["tickers"]) == ["AAPL", "GOOG"]
+    assert list(data["errors"]) == ["INVALIDTICKER"]
+    single = requests.get(f"{BASE_URL}/ticker/", params={"ticker_name": "AAPL", "period": "1y", "max_points": 100})
+    assert data["tickers"]["AAPL"]["candles"] == single.json()["candles"]
+
+
+def test_get_tickers_batch_too_large() -> None:
+    response = requests.get(f"{BASE_URL}/tickers/", params={"ticker_names": ",".join(f"T{i}" for i in range(51))})
+    assert response.status_code == 400
+
+
 def test_compare_growth() -> None:
     response = requests.get(f"{BASE_URL}/compare_growth/", params={"ticker_names": "AAPL,GOOG", "period": "1y"})
     assert response.status_code == 200
@@ -140,6 +212,20 @@ def test_search_ticker() -> None:
     assert any(q["symbol"] == "AAPL" for q in data["quotes"])
 
 
+def test_metrics() -> None:
+    response = requests.get(f"{BASE_URL}/metrics/")
+    assert response.status_code == 200
+    upstream = response.json()["counters"]["upstream_history"]
+    assert upstream["calls"] == upstream["executed"] + upstream["coalesced"]
+    assert {
+        "info_cache",
+        "analyst_targets_cache",
+        "info_batches",
+        "search_cache",
+        "popular_searches",
+    } <= response.json()["counters"].keys()
+
+
 def test_upload_etoro_report(logged_in_session, etoro_excel_file) -> None:
     files = {
         "file": (
@@ -154,6 +240,17 @@ def test_upload_etoro_report(logged_in_session, etoro_excel_file) -> None:
     response_data = response.json()
     assert response_data["result"] == "OK"
 
+    # The statement is ingested in the background
+    task_id = response_data["task_id"]
+    for _ in range(30):
+        status = logged_in_session.get(f"{BASE_URL}/task_status/{task_id}").json()["status"]
+        if status in ("completed", "failed"):
+            break
+        time.sleep(1)
+    assert status == "completed"
+    result = logged_in_session.get(f"{BASE_URL}/task_result/{task_id}").json()["result"]
+    assert result["prefetched"] > 0
+
 
 def test_list_etoro_reports(logged_in_session, etoro_excel_file) -> None:
     filename = "my_report_for_listing.xlsx"
@@ -235,7 +332,7 @@ def test_analyze_etoro_excel_by_name_not_found(logged_in_session) -> None:
     assert response.status_code == 404
 
 
-def test_analyze_etoro_evolution_by_name(logged_in_session, etoro_excel_file) -> None:
+def test_analyze_etoro_evolution_by_name(logged_in_session, etoro_excel_file, tmp_path, monkeypatch) -> None:
     filename = "my_evolution_report.xlsx"
     files = {"file": (filename, etoro_excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
     data = {"precision": "D"}
@@ -294,11 +391,16 @@ def test_analyze_etoro_evolution_by_name(logged_in_session, etoro_excel_file) ->
     assert "evolution" in response_data
     assert isinstance(response_data["evolution"], dict)
     assert "2025-08-01" in response_data["evolution"]["dates"]
-    # Value is not fixed because we use today's price for forex convertion atm
-    # FIXME: use precise day-to-day forex prices
-    assert round(
-        response_data["evolution"]["parts"]["Total"][response_data["evolution"]["dates"].index("2025-08-01")]
-    ) in range(1190, 1210)
+    total = response_data["evolution"]["parts"]["Total"][response_data["evolution"]["dates"].index("2025-08-01")]
+
+    # The expected value is recomputed in-process, with the same market data provider as the server
+    # and prices converted with the exchange rate of their own day
+    statement_file = tmp_path / filename
+    statement_file.write_bytes(etoro_excel_file.getvalue())
+    monkeypatch.setattr(etoro_data, "statement_store", StatementStore(tmp_path / "statements"))
+    monkeypatch.setattr(etoro_data, "evolution_store", EvolutionStore(tmp_path / "evolutions"))
+    expected = etoro_data.extract_portfolio_evolution(statement_file, lambda _: None)
+    assert total == pytest.approx(expected.parts["Total"][expected.dates.index("2025-08-01")], rel=1e-6)
 
 
 def test_split_factor_calculation() -> None:
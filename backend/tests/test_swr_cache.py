@@ -0,0 +1,79 @@
+"""Tests for the stale-while-revalidate cache."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.database.swr_cache import StaleWhileRevalidateCache
+
+
+def test_stale_values_are_served_while_refreshing() -> None:
+    """A stale entry is returned right away and refreshed once in the background."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    cache = StaleWhileRevalidateCache(ttl=0.05, executor=executor)
+    release = threading.Event()
+    calls = []
+
+    def load() -> int:
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(timeout=5)
+        return len(calls)
+
+    assert cache.get("AAPL", load) == 1
+    assert cache.get("AAPL", load) == 1
+    time.sleep(0.1)
+    started = time.perf_counter()
+    # Stale: served immediately even though the refresh blocks, and refreshed only once
+    assert [cache.get("AAPL", load) for _ in range(5)] == [1] * 5
+    assert time.perf_counter() - started < 0.5  # noqa: PLR2004
+    release.set()
+    executor.shutdown(wait=True)
+    assert cache.get("AAPL", load) == 2  # noqa: PLR2004
+    assert len(calls) == 2  # noqa: PLR2004
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_failed_refresh_keeps_stale_value() -> None:
+    """A failing refresh keeps the previous value and is not retried before the next TTL."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    cache = StaleWhileRevalidateCache(ttl=0.05, executor=executor)
+    cache.get("AAPL", lambda: "old")
+    time.sleep(0.1)
+
+    def fail() -> str:
+        raise ConnectionError
+
+    assert cache.get("AAPL", fail) == "old"
+    executor.shutdown(wait=True)
+    assert cache.get("AAPL", fail) == "old"
+    assert cache.stats()["refresh_errors"] == 1
+
+
+def test_first_load_errors_are_raised() -> None:
+    """Without a cached value the caller gets the upstream error, and nothing is cached."""
+    cache = StaleWhileRevalidateCache(ttl=60)
+
+    def fail() -> str:
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        cache.get("AAPL", fail)
+    assert cache.get("AAPL", lambda: "value") == "value"
+
+
+def test_cache_is_bounded() -> None:
+    """The least recently used keys are evicted."""
+    cache = StaleWhileRevalidateCache(ttl=60, max_entries=2)
+    calls: list[str] = []
+
+    def load(key: str) -> str:
+        calls.append(key)
+        return key
+
+    for key in ["AAPL", "MSFT", "AAPL", "TSLA", "AAPL", "MSFT"]:
+        cache.get(key, lambda key=key: load(key))
+    assert calls == ["AAPL", "MSFT", "TSLA", "MSFT"]
+    assert cache.stats()["entries"] == 2  # noqa: PLR2004
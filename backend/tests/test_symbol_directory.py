@@ -0,0 +1,130 @@
+"""Tests for the SQLite symbol directory."""
+
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from src.database import stocks_repository
+from src.database.symbol_directory import SymbolDirectory
+from src.database.symbol_index import SymbolEntry, default_entries
+
+from .conftest import CountingProvider
+
+
+def _directory(tmp_path: Path) -> SymbolDirectory:
+    directory = SymbolDirectory(tmp_path / "symbols.db")
+    directory.add_many(
+        [
+            SymbolEntry("APLE", "Apple Hospitality REIT", "equity"),
+            SymbolEntry("AAPL", "Apple Inc.", "equity", exchange="NMS", currency="USD"),
+            SymbolEntry("PINE", "Alpine Income Property Trust", "equity"),
+            SymbolEntry("APP", "AppLovin Corporation", "equity"),
+            SymbolEntry("BTC-USD", "Bitcoin", "crypto"),
+        ]
+    )
+    return directory
+
+
+def test_ranking(tmp_path: Path) -> None:
+    """Exact matches come first, then symbol prefixes, name word prefixes and substrings."""
+    directory = _directory(tmp_path)
+    assert [entry.symbol for entry in directory.search("app")] == ["APP", "APLE", "AAPL"]
+    assert [entry.symbol for entry in directory.search("apple inc.")] == ["AAPL"]
+    assert [entry.symbol for entry in directory.search("pin")] == ["PINE"]
+    assert [entry.symbol for entry in directory.search("lpin")] == ["PINE"]
+    assert [entry.symbol for entry in directory.search("  BITCOIN ")] == ["BTC-USD"]
+    assert [entry.symbol for entry in directory.search("ap")] == ["APLE", "APP", "AAPL"]
+    assert directory.search("zzz") == []
+
+
+def test_typos(tmp_path: Path) -> None:
+    """Without any substring match, the entries sharing most trigrams with the query are returned."""
+    directory = _directory(tmp_path)
+    assert [entry.symbol for entry in directory.search("bitcion")] == ["BTC-USD"]
+    assert directory.search("aplovin")[0].symbol == "APP"
+    assert directory.search("bitcion", fuzzy=False) == []
+
+
+def test_limit_kinds_and_duplicates(tmp_path: Path) -> None:
+    directory = _directory(tmp_path)
+    assert len(directory.search("a", limit=2)) == 2  # noqa: PLR2004
+    assert [entry.symbol for entry in directory.search("usd", kinds={"crypto"})] == ["BTC-USD"]
+    assert not directory.add(SymbolEntry("aapl", "Apple again", "equity"))
+    assert directory.search("aapl")[0] == SymbolEntry("AAPL", "Apple Inc.", "equity", exchange="NMS", currency="USD")
+    assert "AAPL" in directory
+    assert len(directory) == 5  # noqa: PLR2004
+
+    # Replacing keeps the fields the new entry lacks
+    directory.add_many([SymbolEntry("AAPL", "Apple Incorporated", "EQUITY")], replace=True)
+    assert directory.search("aapl")[0] == SymbolEntry(
+        "AAPL", "Apple Incorporated", "equity", exchange="NMS", currency="USD"
+    )
+    assert [entry.symbol for entry in directory.search("incorporated")] == ["AAPL"]
+    assert directory.search("apple inc.", fuzzy=False) == []
+
+
+def test_default_entries(tmp_path: Path) -> None:
+    """The static lists are stored, with index countries searchable."""
+    directory = SymbolDirectory(tmp_path / "symbols.db")
+    assert directory.add_many(default_entries()) == len(directory)
+    assert directory.add_many(default_entries()) == 0
+    assert directory.search("bitcoin")[0].symbol == "BTC-USD"
+    assert directory.search("s&p")[0].symbol == "^GSPC"
+    assert "^FCHI" in [entry.symbol for entry in directory.search("france")]
+
+
+def test_discovered_and_viewed_symbols_are_stored(
+    tmp_path: Path, provider: CountingProvider, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Upstream search results and viewed symbols are added to the directory."""
+    directory = SymbolDirectory(tmp_path / "symbols.db")
+    monkeypatch.setattr(stocks_repository, "symbol_directory", directory)
+    quotes = stocks_repository.discover_symbols("microsoft", timeout=5)
+    assert quotes
+    assert "MSFT" in directory
+
+    stocks_repository.remember_symbol("AAPL")
+    deadline = time.monotonic() + 5
+    while "AAPL" not in directory and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert directory.search("aapl")[0].name == provider.info("AAPL")["longName"]
+
+
+def test_lookups_scale_to_large_directories(tmp_path: Path) -> None:
+    """Lookups stay in the millisecond range with tens of thousands of symbols."""
+    syllables = ["ka", "lo", "mi", "tra", "ven", "dor", "sel", "qui", "bar", "nix", "tech", "fin", "gen", "zu"]
+    directory = SymbolDirectory(tmp_path / "symbols.db")
+    directory.add_many(
+        SymbolEntry(
+            f"S{i:05d}",
+            f"{syllables[i % 14]}{syllables[i // 14 % 14]}{syllables[i // 196 % 14]} {syllables[i * 7 % 13]}{i} Inc.",
+            "equity",
+        )
+        for i in range(50_000)
+    )
+    queries = ["s1", "s0421", "kalo", "tramiven", "zutech qui", "12345", "kalomni"]
+    # The first search loads the in-memory index
+    assert len(directory) == 50_000  # noqa: PLR2004
+    started = time.perf_counter()
+    for _ in range(10):
+        for query in queries:
+            assert directory.search(query, limit=10)
+    elapsed = (time.perf_counter() - started) / (10 * len(queries))
+    assert elapsed < 20e-3  # noqa: PLR2004
+
+
+def test_directory_is_opened_once_on_first_use(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The database is only created and seeded on first use, and one connection serves every call."""
+    connects: list[tuple] = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, "connect", lambda *args, **kwargs: connects.append(args) or connect(*args, **kwargs))
+    directory = SymbolDirectory(tmp_path / "symbols.db", seed=lambda: [SymbolEntry("BTC-USD", "Bitcoin", "crypto")])
+    assert not (tmp_path / "symbols.db").exists()
+
+    assert "BTC-USD" in directory
+    assert directory.add(SymbolEntry("AAPL", "Apple Inc.", "equity"))
+    assert [entry.symbol for entry in directory.search("apple")] == ["AAPL"]
+    assert [entry.symbol for entry in directory.search("bitcion")] == ["BTC-USD"]
+    assert len(connects) == 1
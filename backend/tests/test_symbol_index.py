@@ -0,0 +1,60 @@
+"""Tests for the in-memory symbol search index."""
+
+import time
+
+from src.database.symbol_index import SymbolEntry, SymbolIndex, load_default_index
+
+
+def _index() -> SymbolIndex:
+    return SymbolIndex(
+        [
+            SymbolEntry("APLE", "Apple Hospitality REIT", "equity"),
+            SymbolEntry("AAPL", "Apple Inc.", "equity"),
+            SymbolEntry("PINE", "Alpine Income Property Trust", "equity"),
+            SymbolEntry("APP", "AppLovin Corporation", "equity"),
+            SymbolEntry("BTC-USD", "Bitcoin", "crypto"),
+        ]
+    )
+
+
+def test_ranking() -> None:
+    """Exact matches come first, then symbol prefixes, name word prefixes and substrings."""
+    index = _index()
+    assert [entry.symbol for entry in index.search("app")] == ["APP", "APLE", "AAPL"]
+    assert [entry.symbol for entry in index.search("apple inc.")] == ["AAPL"]
+    assert [entry.symbol for entry in index.search("pin")] == ["PINE"]
+    assert [entry.symbol for entry in index.search("lpin")] == ["PINE"]
+    assert [entry.symbol for entry in index.search("  BITCOIN ")] == ["BTC-USD"]
+    assert index.search("zzz") == []
+
+
+def test_limit_kinds_and_duplicates() -> None:
+    index = _index()
+    assert len(index.search("a", limit=2)) == 2  # noqa: PLR2004
+    assert [entry.symbol for entry in index.search("usd", kinds={"crypto"})] == ["BTC-USD"]
+    assert not index.add(SymbolEntry("aapl", "Apple again", "equity"))
+    assert "AAPL" in index
+    assert len(index) == 5  # noqa: PLR2004
+
+
+def test_default_index() -> None:
+    """The static lists are indexed, with index countries searchable."""
+    index = load_default_index()
+    assert index.search("bitcoin")[0].symbol == "BTC-USD"
+    assert index.search("s&p")[0].symbol == "^GSPC"
+    assert "^FCHI" in [entry.symbol for entry in index.search("france")]
+
+
+def test_lookups_scale_to_large_universes() -> None:
+    """Lookups stay well under a millisecond with tens of thousands of symbols."""
+    words = ["global", "capital", "energy", "holdings", "systems", "bank", "pharma", "mining"]
+    index = SymbolIndex(
+        SymbolEntry(f"S{i:05d}", f"{words[i % 8]} {words[(i // 8) % 8]} {i} Inc.", "equity") for i in range(50_000)
+    )
+    queries = ["s1", "s0421", "glob", "energy hold", "apital", "12345", "pharma mining 77"]
+    started = time.perf_counter()
+    for _ in range(100):
+        for query in queries:
+            assert index.search(query, limit=10)
+    elapsed = (time.perf_counter() - started) / (100 * len(queries))
+    assert elapsed < 1e-3  # noqa: PLR2004
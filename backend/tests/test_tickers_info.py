@@ -0,0 +1,63 @@
+"""Tests for the concurrent ticker info lookups."""
+
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from src.database import stocks_repository
+from src.database.swr_cache import StaleWhileRevalidateCache
+
+from .conftest import CountingProvider
+
+
+class SlowInfoProvider(CountingProvider):
+    def __init__(self, root: Path) -> None:
+        super().__init__(root)
+        self.release = threading.Event()
+        self.threads: set[int] = set()
+
+    def info(self, ticker_name: str) -> dict:
+        self.threads.add(threading.get_ident())
+        if ticker_name == "SLOW":
+            self.release.wait(timeout=5)
+        if ticker_name == "BROKEN":
+            msg = "upstream error"
+            raise RuntimeError(msg)
+        time.sleep(0.01)
+        return {"symbol": ticker_name, "currentPrice": 10.0, "open": 9.0}
+
+
+@pytest.fixture
+def slow_provider(provider: CountingProvider, monkeypatch: pytest.MonkeyPatch) -> Iterator[SlowInfoProvider]:
+    slow = SlowInfoProvider(provider.root)
+    monkeypatch.setattr(stocks_repository, "provider", slow)
+    monkeypatch.setattr(stocks_repository, "info_cache", StaleWhileRevalidateCache(60))
+    yield slow
+    slow.release.set()
+
+
+def test_tickers_info_respects_deadline(slow_provider: SlowInfoProvider) -> None:
+    """Slow and failing lookups map to None without delaying the others past the deadline."""
+    started = time.perf_counter()
+    infos = stocks_repository.get_tickers_info(["AAPL", "SLOW", "MSFT", "BROKEN"], timeout=0.2)
+    assert time.perf_counter() - started < 1
+    assert list(infos) == ["AAPL", "SLOW", "MSFT", "BROKEN"]
+    assert infos["AAPL"] == {"symbol": "AAPL", "currentPrice": 10.0, "open": 9.0}
+    assert infos["SLOW"] is None
+    assert infos["BROKEN"] is None
+
+    # The late lookup completes in the background and is cached for the next request
+    slow_provider.release.set()
+    time.sleep(0.1)
+    assert stocks_repository.get_tickers_info(["SLOW"], timeout=1)["SLOW"] is not None
+
+
+def test_tickers_info_runs_concurrently(slow_provider: SlowInfoProvider) -> None:
+    """Lookups run on several pool threads, not one after the other."""
+    names = [f"T{i}" for i in range(stocks_repository.INFO_WORKERS * 4)]
+    infos = stocks_repository.get_tickers_info(names)
+    assert all(info is not None for info in infos.values())
+    assert len(slow_provider.threads) > 1
@@ -30,8 +30,8 @@ export interface paths {
 		get?: never;
 		put?: never;
 		/**
-		 * Compare eToro portfolio to index
-		 * @description Compare eToro portfolio performance to a selected index.
+		 * Compare eToro portfolio to indexes
+		 * @description Start the comparison of the eToro portfolio deposits invested in each selected index.
 		 */
 		post: operations['compare_compare_to_index_compare_to_index_post'];
 		delete?: never;
@@ -168,6 +168,22 @@ export interface paths {
 		patch?: never;
 		trace?: never;
 	};
+	'/api/metrics/': {
+		parameters: {
+			query?: never;
+			header?: never;
+			path?: never;
+			cookie?: never;
+		};
+		get: operations['stocks_get_metrics_metrics__get'];
+		put?: never;
+		post?: never;
+		delete?: never;
+		options?: never;
+		head?: never;
+		patch?: never;
+		trace?: never;
+	};
 	'/api/profile/picture': {
 		parameters: {
 			query?: never;
@@ -296,6 +312,22 @@ export interface paths {
 		patch?: never;
 		trace?: never;
 	};
+	'/api/tickers/': {
+		parameters: {
+			query?: never;
+			header?: never;
+			path?: never;
+			cookie?: never;
+		};
+		get: operations['stocks_get_tickers_tickers__get'];
+		put?: never;
+		post?: never;
+		delete?: never;
+		options?: never;
+		head?: never;
+		patch?: never;
+		trace?: never;
+	};
 	'/api/user': {
 		parameters: {
 			query?: never;
@@ -394,6 +426,11 @@ export interface components {
 		};
 		/** CompareGrowthQuery */
 		CompareGrowthQuery: {
+			/**
+			 * Max Points
+			 * @default null
+			 */
+			max_points: number | null;
 			/**
 			 * Period
 			 * @default ytd
@@ -412,21 +449,6 @@ export interface components {
 			dates: string[];
 			query: components['schemas']['CompareGrowthQuery'];
 		};
-		/** CompareToIndexQuery */
-		CompareToIndexQuery: {
-			/** Filename */
-			filename: string;
-			/** Index Ticker */
-			index_ticker: string;
-		};
-		/** CompareToIndexResponse */
-		CompareToIndexResponse: {
-			/** Dates */
-			dates: string[];
-			/** Index Values */
-			index_values: number[];
-			query: components['schemas']['CompareToIndexQuery'];
-		};
 		/** EtoroForm */
 		EtoroForm: {
 			/**
@@ -441,6 +463,16 @@ export interface components {
 			/** Reports */
 			reports: string[];
 		};
+		/** EtoroUploadResponse */
+		EtoroUploadResponse: {
+			/**
+			 * Result
+			 * @default OK
+			 */
+			result: string;
+			/** Task Id */
+			task_id: string;
+		};
 		/** HistoricalKPI */
 		HistoricalKPI: {
 			/** Dates */
@@ -1382,6 +1414,15 @@ export interface components {
 			 */
 			ratioPE: number | null;
 		};
+		/** MetricsResponse */
+		MetricsResponse: {
+			/** Counters */
+			counters: {
+				[key: string]: {
+					[key: string]: number;
+				};
+			};
+		};
 		/** NotFoundResponse */
 		NotFoundResponse: {
 			/**
@@ -1498,16 +1539,34 @@ export interface components {
 		};
 		/** TickerQuery */
 		TickerQuery: {
+			/**
+			 * Emas
+			 * @default []
+			 */
+			emas: number[];
 			/**
 			 * Interval
 			 * @default null
 			 */
 			interval: string | null;
+			/**
+			 * Max Points
+			 * @default null
+			 */
+			max_points: number | null;
 			/**
 			 * Period
 			 * @default ytd
 			 */
 			period: string;
+			/**
+			 * Smas
+			 * @default [
+			 *       30,
+			 *       100
+			 *     ]
+			 */
+			smas: number[];
 			/** Ticker Name */
 			ticker_name: string;
 		};
@@ -1519,12 +1578,64 @@ export interface components {
 			dates: string[];
 			/** Delta */
 			delta: number;
+			/**
+			 * Emas
+			 * @default {}
+			 */
+			emas: {
+				[key: string]: number[];
+			};
 			query: components['schemas']['TickerQuery'];
 			/** Smas */
 			smas: {
 				[key: string]: number[];
 			};
 		};
+		/** TickersQuery */
+		TickersQuery: {
+			/**
+			 * Emas
+			 * @default []
+			 */
+			emas: number[];
+			/**
+			 * Interval
+			 * @default null
+			 */
+			interval: string | null;
+			/**
+			 * Max Points
+			 * @default null
+			 */
+			max_points: number | null;
+			/**
+			 * Period
+			 * @default ytd
+			 */
+			period: string;
+			/**
+			 * Smas
+			 * @default [
+			 *       30,
+			 *       100
+			 *     ]
+			 */
+			smas: number[];
+			/** Ticker Names */
+			ticker_names: string[];
+		};
+		/** TickersResponse */
+		TickersResponse: {
+			/** Errors */
+			errors: {
+				[key: string]: string;
+			};
+			query: components['schemas']['TickersQuery'];
+			/** Tickers */
+			tickers: {
+				[key: string]: components['schemas']['TickerResponse'];
+			};
+		};
 		/** UserResponse */
 		UserResponse: {
 			/** Email */
@@ -1578,6 +1689,7 @@ export interface operations {
 			query: {
 				ticker_names: string[];
 				period?: string;
+				max_points?: number | null;
 			};
 			header?: never;
 			path?: never;
@@ -1609,7 +1721,7 @@ export interface operations {
 		parameters: {
 			query: {
 				filename: string;
-				index_ticker: string;
+				index_tickers?: string[];
 			};
 			header?: never;
 			path?: never;
@@ -1623,16 +1735,7 @@ export interface operations {
 					[name: string]: unknown;
 				};
 				content: {
-					'application/json': components['schemas']['CompareToIndexResponse'];
-				};
-			};
-			/** @description Bad Request */
-			400: {
-				headers: {
-					[name: string]: unknown;
-				};
-				content: {
-					'application/json': components['schemas']['BadRequestResponse'];
+					'application/json': components['schemas']['TaskStartResponse'];
 				};
 			};
 			/** @description Not Found */
@@ -1688,6 +1791,15 @@ export interface operations {
 			};
 		};
 		responses: {
+			/** @description OK */
+			200: {
+				headers: {
+					[name: string]: unknown;
+				};
+				content: {
+					'application/json': components['schemas']['EtoroUploadResponse'];
+				};
+			};
 			/** @description Unprocessable Content */
 			422: {
 				headers: {
@@ -1744,6 +1856,7 @@ export interface operations {
 		parameters: {
 			query: {
 				filename: string;
+				max_points?: number | null;
 			};
 			header?: never;
 			path?: never;
@@ -1902,6 +2015,26 @@ export interface operations {
 			};
 		};
 	};
+	stocks_get_metrics_metrics__get: {
+		parameters: {
+			query?: never;
+			header?: never;
+			path?: never;
+			cookie?: never;
+		};
+		requestBody?: never;
+		responses: {
+			/** @description OK */
+			200: {
+				headers: {
+					[name: string]: unknown;
+				};
+				content: {
+					'application/json': components['schemas']['MetricsResponse'];
+				};
+			};
+		};
+	};
 	auth_upload_profile_picture_profile_picture_post: {
 		parameters: {
 			query?: never;
@@ -2148,6 +2281,9 @@ export interface operations {
 				ticker_name: string;
 				interval?: string | null;
 				period?: string;
+				smas?: number[];
+				emas?: number[];
+				max_points?: number | null;
 			};
 			header?: never;
 			path?: never;
@@ -2184,6 +2320,51 @@ export interface operations {
 			};
 		};
 	};
+	stocks_get_tickers_tickers__get: {
+		parameters: {
+			query: {
+				ticker_names: string[];
+				interval?: string | null;
+				period?: string;
+				smas?: number[];
+				emas?: number[];
+				max_points?: number | null;
+			};
+			header?: never;
+			path?: never;
+			cookie?: never;
+		};
+		requestBody?: never;
+		responses: {
+			/** @description OK */
+			200: {
+				headers: {
+					[name: string]: unknown;
+				};
+				content: {
+					'application/json': components['schemas']['TickersResponse'];
+				};
+			};
+			/** @description Bad Request */
+			400: {
+				headers: {
+					[name: string]: unknown;
+				};
+				content: {
+					'application/json': components['schemas']['BadRequestResponse'];
+				};
+			};
+			/** @description Unprocessable Content */
+			422: {
+				headers: {
+					[name: string]: unknown;
+				};
+				content: {
+					'application/json': components['schemas']['ValidationErrorModel'][];
+				};
+			};
+		};
+	};
 	auth_get_user_user_get: {
 		parameters: {
 			query?: never;